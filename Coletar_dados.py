@@ -3,74 +3,995 @@
 import requests
 import bs4 # beautifulsoup4
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import os
-import io
+import shutil
+import json
+import hashlib
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlparse
+
+from dados_energia import (abrir_cubo, abrir_ipc, atualizar_analises, atualizar_cubo, caminho_cubo, caminho_ipc,
+                           gravar_cubo, gravar_ipc, grupos_na_janela, pasta_cache_analises, versao_dos_dados)
 
 # --- Constantes ---
 ONS_URL = "https://dados.ons.org.br/dataset/balanco-energia-subsistema"
 CONSOLIDATED_FILE = "balanco_energia_consolidado.parquet"
+CONSOLIDATED_DATASET_DIR = "balanco_energia_particionado"  # Mesmo conteúdo, particionado (hive) por ano e subsistema (opcional, --particionado)
+COLUNAS_PARTICAO = ['ano', 'nom_subsistema']
+CHAVE_CONSOLIDADO = ['din_instante', 'nom_subsistema']  # Uma linha por instante e subsistema
 REQUEST_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
+MAX_DOWNLOADS_SIMULTANEOS = 8  # Limite de downloads em paralelo (e de conexões keep-alive no pool)
+RAW_DATA_DIR = "dados_ons_parquet"  # Espelho local dos arquivos anuais da ONS
+CLEAN_DATA_DIR = "dados_ons_limpos"  # Arquivos anuais já limpos, no esquema do consolidado
+MANIFESTO_FILE = "manifesto.json"   # Nome do manifesto dentro da pasta do espelho
+TAMANHO_BLOCO_DOWNLOAD = 1024 * 1024  # Bytes gravados no disco por vez durante o download
+TENTATIVAS_DOWNLOAD = 5  # Tentativas por arquivo antes de desistir dele
+ESPERA_BASE_S = 1.0      # Teto da espera antes da 2ª tentativa; dobra a cada falha (com jitter)
+ESPERA_MAXIMA_S = 30.0
+STATUS_TEMPORARIOS = {408, 429, 500, 502, 503, 504}
+SUFIXO_PARCIAL = '.parcial'  # Download em andamento; só vira o arquivo final depois de conferido
+COLUNAS_VALORES = [
+    'val_gerhidraulica', 'val_gertermica', 'val_gereolica',
+    'val_gersolar', 'val_carga', 'val_intercambio'
+]
+# Esquema de armazenamento do consolidado (fixo, para que todos os anos sejam gravados iguais):
+# subsistemas como dicionário, medidas sempre em float32 e instantes em milissegundos (o dado é horário).
+# O float32 guarda ~7 algarismos: abaixo de 262.144 MWmed o arredondamento fica em menos de
+# TOLERANCIA_FLOAT32, e conferir_gravacao confere as somas relidas com essa tolerância.
+ESQUEMA_CONSOLIDADO = pa.schema(
+    [('din_instante', pa.timestamp('ms')),
+     ('id_subsistema', pa.dictionary(pa.int8(), pa.string())),
+     ('nom_subsistema', pa.dictionary(pa.int8(), pa.string()))]
+    + [(col, pa.float32()) for col in COLUNAS_VALORES]
+)
+# Opções do ParquetWriter: zstd, estatísticas de din_instante (cada row group é gravado ordenado)
+# e codificações que combinam com cada coluna (delta para o tempo, byte-stream-split para as medidas)
+OPCOES_PARQUET = {
+    'compression': 'zstd',
+    'use_dictionary': ['id_subsistema', 'nom_subsistema'],
+    'column_encoding': {'din_instante': 'DELTA_BINARY_PACKED', **{col: 'BYTE_STREAM_SPLIT' for col in COLUNAS_VALORES}},
+    'write_statistics': True,
+    'sorting_columns': [pq.SortingColumn(0)],
+}
+LINHAS_POR_GRUPO_MAX = 1_000_000  # Cada ano vira um row group; o limite só protege contra anos muito densos
+TOLERANCIA_FLOAT32 = 0.01  # Erro por linha (MWmed) aceito nas somas relidas por conferir_gravacao
+FORMATO_DATA_ONS = '%Y-%m-%d %H:%M:%S'
+REGEX_NUMERO = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+LINHAS_POR_LOTE = 100_000  # Tamanho dos lotes ao copiar o consolidado antigo no modo streaming
 
-def run_full_etl():
-    """Função principal que executa todo o pipeline de ETL."""
-    print(">>> INICIANDO PROCESSO DE ETL DO BALANÇO ENERGÉTICO DA ONS <<<")
+# ==============================================================================
+# DOWNLOAD
+# ==============================================================================
+def criar_sessao(max_conexoes=MAX_DOWNLOADS_SIMULTANEOS):
+    """Cria uma sessão HTTP reutilizável (keep-alive), com pool de conexões do tamanho do paralelismo."""
+    sessao = requests.Session()
+    sessao.headers.update(REQUEST_HEADERS)
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes)
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    return sessao
 
-    try:
-        print(f"[ETAPA 1/4] Buscando links de arquivos em: {ONS_URL}")
-        response = requests.get(ONS_URL, headers=REQUEST_HEADERS, timeout=15)
-        response.raise_for_status()
-        soup = bs4.BeautifulSoup(response.text, 'html.parser')
-        
-        file_urls = [link.get('href') for link in soup.select("ul.resource-list a.resource-url-analytics") if link.get('href', '').endswith('.parquet')]
-        
-        if not file_urls:
-            print("[ERRO] Nenhum arquivo .parquet encontrado na página. O site pode ter mudado.")
-            return
-        
-        print(f"--- Encontrados {len(file_urls)} arquivos para baixar.")
-    except Exception as e:
-        print(f"[ERRO] Falha ao buscar informações no site da ONS: {e}")
-        return
+def buscar_links_parquet(sessao, url=ONS_URL):
+    """Lê a página do dataset e devolve as URLs absolutas dos arquivos .parquet."""
+    response = sessao.get(url, timeout=15)
+    response.raise_for_status()
+    soup = bs4.BeautifulSoup(response.text, 'html.parser')
+    links = soup.select("ul.resource-list a.resource-url-analytics")
+    return [urljoin(url, link.get('href')) for link in links if link.get('href', '').endswith('.parquet')]
+
+class DownloadCorrompido(IOError):
+    """O arquivo baixado não confere com o tamanho anunciado ou com o hash registrado no manifesto."""
+
+def _erro_temporario(erro):
+    """Falhas de rede, respostas 5xx/429 e downloads corrompidos valem nova tentativa; 404 e afins, não."""
+    if isinstance(erro, requests.HTTPError) and erro.response is not None:
+        return erro.response.status_code in STATUS_TEMPORARIOS
+    return isinstance(erro, (requests.ConnectionError, requests.Timeout,
+                             requests.exceptions.ChunkedEncodingError, DownloadCorrompido))
+
+def _espera_com_jitter(tentativa, erro=None):
+    """
+    Espera antes da próxima tentativa: backoff exponencial com jitter total (sorteio entre 0 e
+    ESPERA_BASE_S * 2^(tentativa-1), limitado a ESPERA_MAXIMA_S). Respeita o Retry-After numérico.
+    """
+    resposta = getattr(erro, 'response', None)
+    if resposta is not None and resposta.headers.get('Retry-After', '').isdigit():
+        return min(float(resposta.headers['Retry-After']), ESPERA_MAXIMA_S)
+    return random.uniform(0, min(ESPERA_MAXIMA_S, ESPERA_BASE_S * 2 ** (tentativa - 1)))
+
+def _caminhos_parciais(destino):
+    """Arquivo parcial do download e o JSON com a versão (ETag/Last-Modified) a que ele pertence."""
+    parcial = destino + SUFIXO_PARCIAL
+    return parcial, parcial + '.json'
+
+def _versao_parcial(destino):
+    """Versão do download parcial que pode ser retomado com Range, ou None se não houver."""
+    parcial, arquivo_versao = _caminhos_parciais(destino)
+    if not (os.path.exists(parcial) and os.path.exists(arquivo_versao)):
+        return None
+    with open(arquivo_versao, encoding='utf-8') as f:
+        versao = json.load(f)
+    return versao if versao.get('etag') or versao.get('last_modified') else None
+
+def _descartar_parcial(destino):
+    for caminho in _caminhos_parciais(destino):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+def _tamanho_anunciado(resposta):
+    """Tamanho total do arquivo segundo o servidor (Content-Range num 206, Content-Length num 200)."""
+    if resposta.status_code == 206:
+        total = resposta.headers.get('Content-Range', '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+    tamanho = resposta.headers.get('Content-Length')
+    return int(tamanho) if tamanho and tamanho.isdigit() else None
+
+def _baixar_uma_vez(sessao, url, destino, validadores=None, referencia=None):
+    """
+    Uma tentativa de download para `destino + SUFIXO_PARCIAL`. Se já existe um parcial de uma
+    tentativa anterior, pede só o restante (Range + If-Range; se a versão mudou, o servidor
+    manda o arquivo inteiro). O parcial só é renomeado para `destino` depois de conferido.
+    """
+    parcial, arquivo_versao = _caminhos_parciais(destino)
+    versao_parcial = _versao_parcial(destino)
+    ja_baixado = os.path.getsize(parcial) if versao_parcial else 0
+
+    headers = {}
+    if validadores:
+        if validadores.get('etag'):
+            headers['If-None-Match'] = validadores['etag']
+        if validadores.get('last_modified'):
+            headers['If-Modified-Since'] = validadores['last_modified']
+    if ja_baixado:
+        headers['Range'] = f'bytes={ja_baixado}-'
+        headers['If-Range'] = versao_parcial.get('etag') or versao_parcial['last_modified']
+
+    with sessao.get(url, headers=headers, timeout=90, stream=True) as resposta:
+        if resposta.status_code == 304:
+            _descartar_parcial(destino)
+            return None
+        resposta.raise_for_status()
+        versao = {'etag': resposta.headers.get('ETag'), 'last_modified': resposta.headers.get('Last-Modified')}
+        retomando = (resposta.status_code == 206 and ja_baixado > 0
+                     and resposta.headers.get('Content-Range', '').startswith(f'bytes {ja_baixado}-'))
+        sha256 = hashlib.sha256()
+        if retomando:
+            with open(parcial, 'rb') as f:
+                for bloco in iter(lambda: f.read(TAMANHO_BLOCO_DOWNLOAD), b''):
+                    sha256.update(bloco)
+        else:
+            if resposta.status_code == 206:
+                # Faixa diferente da pedida: descarta e recomeça do zero na próxima tentativa
+                _descartar_parcial(destino)
+                raise DownloadCorrompido(f"{os.path.basename(destino)}: faixa inesperada {resposta.headers.get('Content-Range')}")
+            with open(arquivo_versao, 'w', encoding='utf-8') as f:
+                json.dump(versao, f)
+        tamanho_esperado = _tamanho_anunciado(resposta)
+        with open(parcial, 'ab' if retomando else 'wb') as f:
+            for bloco in resposta.iter_content(TAMANHO_BLOCO_DOWNLOAD):
+                f.write(bloco)
+                sha256.update(bloco)
+
+    tamanho = os.path.getsize(parcial)
+    if tamanho_esperado is not None and tamanho < tamanho_esperado:
+        # Conexão caiu no meio: o parcial fica para ser retomado
+        raise DownloadCorrompido(f"{os.path.basename(destino)}: recebidos {tamanho} de {tamanho_esperado} bytes")
+    mesma_versao = referencia and any(versao[k] and versao[k] == referencia.get(k) for k in ('etag', 'last_modified'))
+    if (tamanho_esperado is not None and tamanho != tamanho_esperado) or (
+            mesma_versao and sha256.hexdigest() != referencia.get('sha256')):
+        _descartar_parcial(destino)
+        raise DownloadCorrompido(f"{os.path.basename(destino)}: tamanho ou sha256 não confere com o esperado")
+
+    os.replace(parcial, destino)
+    os.remove(arquivo_versao)
+    return {'url': url, **versao, 'tamanho': tamanho, 'sha256': sha256.hexdigest()}
+
+def baixar_arquivo(sessao, url, destino, validadores=None, referencia=None, tentativas=None):
+    """
+    Baixa um único arquivo para `destino`, em blocos, sem guardar o conteúdo na memória.
+    Se `validadores` (entrada do manifesto) for informado, faz um GET condicional
+    (If-None-Match / If-Modified-Since). `referencia` é a entrada conhecida do manifesto: se o
+    servidor devolver a mesma versão, o sha256 baixado precisa bater com o registrado.
+    Falhas temporárias são repetidas até `tentativas` vezes (TENTATIVAS_DOWNLOAD por padrão), com
+    backoff exponencial e jitter, retomando do ponto em que pararam.
+    Retorna (url, entrada do manifesto, segundos); a entrada é None quando o servidor responde
+    304 e a cópia local continua válida.
+    """
+    tentativas = tentativas or TENTATIVAS_DOWNLOAD
+    inicio = time.perf_counter()
+    for tentativa in range(1, tentativas + 1):
+        try:
+            entrada = _baixar_uma_vez(sessao, url, destino, validadores, referencia)
+            return url, entrada, time.perf_counter() - inicio
+        except OSError as erro:
+            if tentativa == tentativas or not _erro_temporario(erro):
+                raise
+            espera = _espera_com_jitter(tentativa, erro)
+            print(f"--- {os.path.basename(destino)}: falha na tentativa {tentativa}/{tentativas} "
+                  f"({type(erro).__name__}); nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+
+def baixar_arquivos(urls, destinos, sessao=None, max_workers=MAX_DOWNLOADS_SIMULTANEOS, validadores=None, referencias=None):
+    """
+    Baixa os arquivos em paralelo, com no máximo `max_workers` downloads simultâneos
+    sobre a mesma sessão, gravando cada um em `destinos[url]`. Mostra o progresso e o
+    tempo de cada arquivo. `validadores` é um dicionário opcional {url: entrada do manifesto}
+    para GETs condicionais; `referencias`, {url: entrada do manifesto} para conferir o sha256.
+    Um arquivo que falha (depois das novas tentativas) não interrompe os outros.
+    Devolve ({url: entrada do manifesto ou None} dos que deram certo, {url: exceção} dos que falharam).
+    """
+    sessao = sessao or criar_sessao(max_workers)
+    validadores = validadores or {}
+    referencias = referencias or {}
+    entradas, falhas = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {
+            executor.submit(baixar_arquivo, sessao, url, destinos[url], validadores.get(url), referencias.get(url)): url
+            for url in urls
+        }
+        for i, futuro in enumerate(as_completed(futuros), start=1):
+            url = futuros[futuro]
+            try:
+                _, entrada, segundos = futuro.result()
+            except OSError as erro:
+                falhas[url] = erro
+                print(f"--- [{i}/{len(urls)}] {os.path.basename(url)}: FALHOU ({erro})")
+                continue
+            entradas[url] = entrada
+            if entrada is None:
+                print(f"--- [{i}/{len(urls)}] {os.path.basename(url)}: sem alterações (304) em {segundos:.2f}s")
+            else:
+                print(f"--- [{i}/{len(urls)}] {os.path.basename(url)}: {entrada['tamanho'] / 1024 / 1024:.2f} MB em {segundos:.2f}s")
+    return {url: entradas[url] for url in urls if url in entradas}, falhas
+
+# ==============================================================================
+# ESPELHO LOCAL E MANIFESTO
+# ==============================================================================
+def carregar_manifesto(pasta=RAW_DATA_DIR):
+    """Lê o manifesto do espelho local ({nome do arquivo: url, etag, last_modified, tamanho, sha256})."""
+    caminho = os.path.join(pasta, MANIFESTO_FILE)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+def salvar_manifesto(manifesto, pasta=RAW_DATA_DIR):
+    with open(os.path.join(pasta, MANIFESTO_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False, sort_keys=True)
 
+def calcular_hash(caminho):
+    """sha256 de um arquivo local, lido em blocos."""
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_DOWNLOAD), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+def copia_local_valida(caminho, entrada):
+    """Confere se a cópia local existe e bate com o tamanho e o hash registrados no manifesto."""
+    if not entrada or not os.path.exists(caminho) or os.path.getsize(caminho) != entrada.get('tamanho'):
+        return False
+    return calcular_hash(caminho) == entrada.get('sha256')
+
+def sincronizar_espelho(urls, sessao=None, pasta=RAW_DATA_DIR, max_workers=MAX_DOWNLOADS_SIMULTANEOS):
+    """
+    Atualiza o espelho local com GETs condicionais: só baixa de novo o que mudou no servidor.
+    Retorna (caminhos locais na ordem de `urls`, lista dos caminhos alterados nesta execução).
+    """
+    os.makedirs(pasta, exist_ok=True)
+    manifesto = carregar_manifesto(pasta)
+    caminhos = {url: os.path.join(pasta, os.path.basename(urlparse(url).path)) for url in urls}
+    validadores = {
+        url: manifesto[os.path.basename(caminho)] for url, caminho in caminhos.items()
+        if copia_local_valida(caminho, manifesto.get(os.path.basename(caminho)))
+    }
+
+    referencias = {url: manifesto[os.path.basename(caminho)] for url, caminho in caminhos.items()
+                   if os.path.basename(caminho) in manifesto}
+
+    entradas, falhas = baixar_arquivos(urls, caminhos, sessao, max_workers, validadores, referencias)
+
+    alterados = []
+    for url, entrada in entradas.items():
+        if entrada is None:
+            continue
+        manifesto[os.path.basename(caminhos[url])] = entrada
+        alterados.append(caminhos[url])
+    salvar_manifesto(manifesto, pasta)
+
+    # Quem falhou segue com a cópia local anterior, se ela for válida; sem cópia, não há como consolidar
+    sem_copia = [url for url in falhas if url not in validadores]
+    for url in falhas:
+        if url in validadores:
+            print(f"--- AVISO: mantendo a cópia local anterior de {os.path.basename(caminhos[url])}.")
+    if sem_copia:
+        raise RuntimeError(
+            f"Falha ao baixar {len(sem_copia)} arquivo(s) sem cópia local válida: "
+            + ", ".join(os.path.basename(url) for url in sem_copia)
+            + ". Os demais ficaram salvos no espelho; rode de novo para tentar só esses."
+        )
+    return list(caminhos.values()), alterados
+
+# ==============================================================================
+# LIMPEZA E CONSOLIDAÇÃO
+# ==============================================================================
+def _converter_datas(serie):
+    """
+    Datas já tipadas passam direto. Texto no formato da ONS é convertido pelo Arrow; só as
+    entradas em outro formato (se houver) passam pelo `pd.to_datetime`. Inválidas viram NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        return serie
     try:
-        print("\n[ETAPA 2/4] Baixando e lendo os arquivos parquet...")
-        lista_dfs = [pd.read_parquet(io.BytesIO(requests.get(url, headers=REQUEST_HEADERS, timeout=90).content)) for url in file_urls]
-        print("--- Download de todos os arquivos concluído.")
-    except Exception as e:
-        print(f"[ERRO] Falha durante o download de um dos arquivos: {e}")
-        return
+        texto = pa.array(serie, from_pandas=True).cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pd.to_datetime(serie, errors='coerce')
+    datas = pc.strptime(texto, format=FORMATO_DATA_ONS, unit='ns', error_is_null=True)
+    resultado = pd.Series(datas.to_numpy(zero_copy_only=False), index=serie.index)
+    fora_do_formato = pc.and_(pc.is_null(datas), pc.is_valid(texto)).to_numpy(zero_copy_only=False)
+    if fora_do_formato.any():
+        resultado[fora_do_formato] = pd.to_datetime(serie[fora_do_formato], errors='coerce')
+    return resultado
 
+def _converter_valores(serie):
+    """
+    Converte uma coluna de medida para número sem passar por strings Python: colunas já numéricas
+    só têm os nulos zerados; texto com vírgula decimal é tratado pelos kernels de string do Arrow.
+    Valores inválidos viram 0, como no `pd.to_numeric(errors='coerce')` + `fillna(0)` de antes.
+    """
+    if pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype):
+        valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        return np.where(np.isnan(valores), 0.0, valores)
     try:
-        print("\n[ETAPA 3/4] Consolidando e limpando os dados...")
-        df = pd.concat(lista_dfs, ignore_index=True)
-        
-        df['din_instante'] = pd.to_datetime(df['din_instante'], errors='coerce')
-        
-        # ===== A CORREÇÃO ESTÁ AQUI =====
-        colunas_valores = [
-            'val_gerhidraulica', 'val_gertermica', 'val_gereolica', 
-            'val_gersolar', 'val_carga', 'val_intercambio'  # <-- Adicionada a coluna que faltava
-        ]
-        
-        for col in colunas_valores:
-            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.', regex=False), errors='coerce')
-        
-        df[colunas_valores] = df[colunas_valores].fillna(0)
-        df.dropna(subset=['din_instante'], inplace=True)
-        print("--- Limpeza e consolidação concluídas.")
-    except Exception as e:
-        print(f"[ERRO] Falha ao consolidar e limpar os dados: {e}")
-        return
+        texto = pa.array(serie, from_pandas=True).cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Coluna mista (números e textos no mesmo objeto): volta ao caminho do pandas
+        texto = pa.array(serie.astype(str))
+    texto = pc.replace_substring(pc.utf8_trim_whitespace(texto), ',', '.')
+    texto = pc.if_else(pc.match_substring_regex(texto, REGEX_NUMERO), texto, pa.scalar(None, pa.string()))
+    return pc.fill_null(texto.cast(pa.float64()), 0.0).to_numpy()
+
+def limpar_dados(df):
+    """
+    Converte datas e valores (que podem vir com vírgula decimal) e descarta instantes inválidos.
+    A conversão respeita o tipo de origem de cada coluna e é toda vetorizada (veja
+    `_converter_datas` e `_converter_valores`); as medidas ficam em float32, o tipo em que o
+    consolidado as guarda (ESQUEMA_CONSOLIDADO), e `nom_subsistema` vira categoria.
+    """
+    df['din_instante'] = _converter_datas(df['din_instante'])
+
+    for col in COLUNAS_VALORES:
+        df[col] = _converter_valores(df[col]).astype(np.float32)
+
+    df['nom_subsistema'] = df['nom_subsistema'].astype('category')
+    df.dropna(subset=['din_instante'], inplace=True)
+    return df
+
+def deduplicar(df):
+    """Uma linha por (din_instante, nom_subsistema), ficando a última que apareceu (last-write-wins), em ordem de chave."""
+    df = df.drop_duplicates(subset=CHAVE_CONSOLIDADO, keep='last')
+    return df.sort_values(CHAVE_CONSOLIDADO, kind='stable', ignore_index=True)
+
+def mesclar_por_chave(df_existente, df_novos):
+    """
+    Mescla os dados novos no consolidado existente pela chave (din_instante, nom_subsistema):
+    linha nova com chave já existente substitui a antiga; linhas antigas sem correspondente ficam.
+    """
+    return deduplicar(pd.concat([df_existente, df_novos], ignore_index=True))
+
+def atualizar_consolidado(caminhos, alterados, arquivo_saida=CONSOLIDATED_FILE):
+    """
+    Gera o DataFrame consolidado. Se o consolidado já existe, só os arquivos alterados são
+    lidos, limpos e mesclados; senão, reconstrói a partir de todo o espelho.
+    Retorna None quando não há nada a atualizar.
+    """
+    if not os.path.exists(arquivo_saida):
+        return deduplicar(limpar_dados(pd.concat([pd.read_parquet(c) for c in caminhos], ignore_index=True)))
+    if not alterados:
+        return None
+    df_novos = limpar_dados(pd.concat([pd.read_parquet(c) for c in alterados], ignore_index=True))
+    return mesclar_por_chave(pd.read_parquet(arquivo_saida), df_novos)
+
+def para_tabela_arrow(df):
+    """Converte um DataFrame já limpo para uma tabela Arrow com o esquema fixo do consolidado."""
+    return pa.Table.from_pandas(df[ESQUEMA_CONSOLIDADO.names], preserve_index=False).cast(ESQUEMA_CONSOLIDADO)
+
+def anos_dos_arquivos(caminhos):
+    """Anos cobertos por um conjunto de arquivos anuais, lendo só a coluna de data."""
+    anos = set()
+    for caminho in caminhos:
+        instantes = pd.to_datetime(pd.read_parquet(caminho, columns=['din_instante'])['din_instante'], errors='coerce')
+        anos.update(instantes.dt.year.dropna().astype(int))
+    return anos
+
+# ==============================================================================
+# GRAVAÇÃO DO CONSOLIDADO
+# ==============================================================================
+def _ordenar(tabela):
+    """Ordena por instante e subsistema (o Arrow não ordena colunas-dicionário direto, então ordena pelos textos)."""
+    chaves = pa.table({'instante': tabela['din_instante'], 'subsistema': tabela['nom_subsistema'].cast(pa.string())})
+    return tabela.take(pc.sort_indices(chaves, sort_keys=[('instante', 'ascending'), ('subsistema', 'ascending')]))
+
+def _nomes(*tabelas):
+    """Nomes de subsistema presentes nas tabelas, em ordem alfabética (nulos viram '')."""
+    nomes = set()
+    for tabela in tabelas:
+        nomes.update(pc.unique(pc.fill_null(tabela['nom_subsistema'].cast(pa.string()), '')).to_pylist())
+    return pa.array(sorted(nomes), type=pa.string())
+
+def _chaves(tabela, nomes):
+    """
+    Chave (din_instante, nom_subsistema) como um único int64, na mesma ordem de `_ordenar`:
+    milissegundos * len(nomes) + posição do nome em `nomes`.
+    """
+    instantes = tabela['din_instante'].cast(pa.int64()).to_numpy()
+    posicoes = pc.index_in(pc.fill_null(tabela['nom_subsistema'].cast(pa.string()), ''), value_set=nomes)
+    return instantes * len(nomes) + posicoes.to_numpy()
+
+def _deduplicar(tabela):
+    """Ordena pela chave e deixa uma linha por chave: a última na ordem de chegada (last-write-wins)."""
+    if tabela.num_rows == 0:
+        return tabela
+    chaves = _chaves(tabela, _nomes(tabela))
+    ordem = np.argsort(chaves, kind='stable')
+    chaves = chaves[ordem]
+    ultima = np.append(chaves[1:] != chaves[:-1], True)
+    return tabela.take(ordem[ultima])
+
+def mesclar_ordenado(antigo, novo):
+    """
+    Sort-merge de duas tabelas ordenadas pela chave e sem chaves repetidas: cada linha de `novo`
+    substitui a de `antigo` com a mesma chave (last-write-wins) ou entra na posição certa. As
+    buscas são feitas só para as chaves novas (busca binária em `antigo`), sem reordenar `antigo`.
+    """
+    if antigo.num_rows == 0 or novo.num_rows == 0:
+        return novo if antigo.num_rows == 0 else antigo
+    nomes = _nomes(antigo, novo)
+    chaves_antigas, chaves_novas = _chaves(antigo, nomes), _chaves(novo, nomes)
+    if (np.diff(chaves_antigas) <= 0).any():
+        # Consolidado gravado por uma versão anterior: fora de ordem ou com chaves repetidas
+        antigo = _deduplicar(antigo)
+        chaves_antigas = _chaves(antigo, nomes)
 
+    posicao = np.searchsorted(chaves_antigas, chaves_novas)
+    ja_existe = chaves_antigas[np.minimum(posicao, len(chaves_antigas) - 1)] == chaves_novas
+    ja_existe &= posicao < len(chaves_antigas)
+    substituida = np.zeros(len(chaves_antigas), dtype=bool)
+    substituida[posicao[ja_existe]] = True
+
+    # Posição final de cada linha nova: antigas mantidas antes dela + novas antes dela
+    substituidas_antes = np.cumsum(ja_existe) - ja_existe
+    destino_novas = posicao - substituidas_antes + np.arange(len(chaves_novas))
+    indices = np.empty(len(chaves_antigas) - ja_existe.sum() + len(chaves_novas), dtype=np.int64)
+    e_nova = np.zeros(len(indices), dtype=bool)
+    e_nova[destino_novas] = True
+    indices[destino_novas] = antigo.num_rows + np.arange(len(chaves_novas))
+    indices[~e_nova] = np.flatnonzero(~substituida)
+    return pa.concat_tables([antigo, novo]).unify_dictionaries().take(indices)
+
+def _ano(tabela):
+    return tabela['din_instante'][0].as_py().year
+
+def _fatias_por_ano(tabelas, ordenar=True):
+    """
+    Reagrupa uma sequência de tabelas em tabelas de um único ano, ordenadas por instante e
+    subsistema, juntando lotes consecutivos do mesmo ano. Cada fatia vira um row group.
+    Com `ordenar=False` as tabelas já chegam ordenadas (ex.: lotes do consolidado) e só são fatiadas.
+    """
+    pendentes, ano_pendente = [], None
+    juntar = (lambda t: _ordenar(pa.concat_tables(t))) if ordenar else pa.concat_tables
+    for tabela in tabelas:
+        if ordenar:
+            tabela = _ordenar(tabela)
+        anos = pc.year(tabela['din_instante']).to_numpy(zero_copy_only=False)
+        cortes = [0, *(np.flatnonzero(np.diff(anos)) + 1), len(anos)]
+        for inicio, fim in zip(cortes[:-1], cortes[1:]):
+            if inicio == fim:
+                continue
+            if pendentes and anos[inicio] != ano_pendente:
+                yield juntar(pendentes)
+                pendentes = []
+            pendentes.append(tabela.slice(inicio, fim - inicio))
+            ano_pendente = anos[inicio]
+    if pendentes:
+        yield juntar(pendentes)
+
+def _gravar_por_ano(arquivo, tabelas, ja_por_ano=False):
+    """
+    Grava as tabelas em `arquivo` com o esquema e as opções de armazenamento, um row group por ano.
+    Com `ja_por_ano=True` cada tabela já é um ano inteiro, ordenado, e é gravada como veio.
+    """
+    linhas = 0
+    with pq.ParquetWriter(arquivo, ESQUEMA_CONSOLIDADO, **OPCOES_PARQUET) as writer:
+        for fatia in (tabelas if ja_por_ano else _fatias_por_ano(tabelas)):
+            if fatia.num_rows == 0:
+                continue
+            writer.write_table(fatia, row_group_size=LINHAS_POR_GRUPO_MAX)
+            linhas += fatia.num_rows
+    return linhas
+
+def resumo_de_controle(tabela):
+    """Linhas e soma de cada medida, por ano (em float64): permite conferir uma gravação sem guardar os dados."""
+    colunas = {'ano': pc.year(tabela['din_instante'])}
+    colunas.update({col: tabela[col].cast(pa.float64()) for col in COLUNAS_VALORES})
+    agregado = pa.table(colunas).group_by('ano').aggregate([('ano', 'count')] + [(col, 'sum') for col in COLUNAS_VALORES])
+    resumo = agregado.to_pandas().set_index('ano').sort_index()
+    return resumo.rename(columns={'ano_count': 'linhas', **{f'{col}_sum': col for col in COLUNAS_VALORES}})
+
+def somar_resumos(resumos):
+    resumos = [r for r in resumos if not r.empty]
+    if not resumos:
+        return pd.DataFrame(columns=['linhas'] + COLUNAS_VALORES)
+    return pd.concat(resumos).groupby(level=0).sum()
+
+def conferir_gravacao(arquivo, esperado):
+    """
+    Relê o arquivo gravado e confere, ano a ano, o número de linhas e a soma de cada medida.
+    As somas podem diferir no máximo TOLERANCIA_FLOAT32 por linha (arredondamento para float32).
+    """
+    colunas = ['din_instante'] + COLUNAS_VALORES
+    gravado = somar_resumos(
+        resumo_de_controle(pa.Table.from_batches([lote]))
+        for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=LINHAS_POR_LOTE, columns=colunas)
+    )
+    if not gravado.index.equals(esperado.index) or not (gravado['linhas'] == esperado['linhas']).all():
+        raise ValueError(f"A releitura de '{arquivo}' não bate em número de linhas por ano.")
+    diferenca = (gravado[COLUNAS_VALORES] - esperado[COLUNAS_VALORES]).abs()
+    fora_da_tolerancia = diferenca.gt(esperado['linhas'] * TOLERANCIA_FLOAT32, axis=0)
+    if fora_da_tolerancia.any().any():
+        problemas = [f"{ano}/{col}" for ano, col in fora_da_tolerancia.stack().loc[lambda x: x].index]
+        raise ValueError(f"A releitura de '{arquivo}' não bate nas somas de: {', '.join(problemas)}.")
+
+def gravar_consolidado(df, arquivo_saida=CONSOLIDATED_FILE):
+    """Grava o DataFrame consolidado no formato de armazenamento e confere a releitura antes de substituir o arquivo."""
+    esperado = resumo_de_controle(pa.Table.from_pandas(df[['din_instante'] + COLUNAS_VALORES], preserve_index=False))
+    arquivo_temporario = arquivo_saida + '.tmp'
+    linhas = _gravar_por_ano(arquivo_temporario, [para_tabela_arrow(df)])
+    conferir_gravacao(arquivo_temporario, esperado)
+    os.replace(arquivo_temporario, arquivo_saida)
+    return linhas
+
+def gravar_consolidado_streaming(caminhos, alterados, arquivo_saida=CONSOLIDATED_FILE, ja_limpos=False, reconstruir=False):
+    """
+    Versão em streaming de `atualizar_consolidado` + `gravar_consolidado`: trabalha um ano por vez
+    com um ParquetWriter de esquema fixo, sem nunca concatenar todos os anos na memória.
+    Os dados novos de cada ano (de todos os arquivos que o cobrem, na ordem dos arquivos) são
+    deduplicados pela chave (din_instante, nom_subsistema) com last-write-wins e intercalados
+    (`mesclar_ordenado`) com o mesmo ano do consolidado existente; anos sem dados novos são
+    copiados em lotes, sem reordenar. Retorna o número de linhas gravadas (None se nada mudou).
+    Com `ja_limpos=True` os arquivos já estão no esquema do consolidado (etapa 'clean') e são
+    lidos direto; com `reconstruir=True` o consolidado existente é ignorado.
+    """
+    existe = os.path.exists(arquivo_saida) and not reconstruir
+    if existe and not alterados:
+        return None
+    novos = sorted(alterados if existe else caminhos)
+    anos_por_arquivo = {caminho: anos_dos_arquivos([caminho]) for caminho in novos}
+    resumos = []
+
+    limpo = {}
+    def ler_ano(caminho, ano):
+        if ja_limpos:
+            filtro = (ds.field('din_instante') >= pd.Timestamp(ano, 1, 1)) & (ds.field('din_instante') < pd.Timestamp(ano + 1, 1, 1))
+            return pq.read_table(caminho, columns=ESQUEMA_CONSOLIDADO.names, filters=filtro).cast(ESQUEMA_CONSOLIDADO)
+        if caminho not in limpo:
+            # Um arquivo bruto que cobre mais de um ano é limpo uma vez só
+            limpo.clear()
+            limpo[caminho] = para_tabela_arrow(limpar_dados(pd.read_parquet(caminho)))
+        tabela = limpo[caminho]
+        return tabela.filter(pc.equal(pc.year(tabela['din_instante']), ano))
+
+    def anos_antigos():
+        if not existe:
+            return
+        arquivo = pq.ParquetFile(arquivo_saida)
+        if arquivo.metadata.num_row_groups and not arquivo.metadata.row_group(0).sorting_columns:
+            # Consolidado gravado antes do esquema ordenado: ordena e deduplica uma vez, na memória
+            antigo = _deduplicar(arquivo.read(columns=ESQUEMA_CONSOLIDADO.names).cast(ESQUEMA_CONSOLIDADO))
+            yield from _fatias_por_ano([antigo], ordenar=False)
+            return
+        lotes = (pa.Table.from_batches([lote]).cast(ESQUEMA_CONSOLIDADO)
+                 for lote in arquivo.iter_batches(batch_size=LINHAS_POR_LOTE, columns=ESQUEMA_CONSOLIDADO.names))
+        yield from _fatias_por_ano(lotes, ordenar=False)
+
+    def tabelas():
+        antigos = anos_antigos()
+        antigo = next(antigos, None)
+        for ano in sorted(set().union(*anos_por_arquivo.values())):
+            while antigo is not None and _ano(antigo) < ano:
+                yield antigo
+                antigo = next(antigos, None)
+            novo = _deduplicar(pa.concat_tables(
+                [ler_ano(caminho, ano) for caminho in novos if ano in anos_por_arquivo[caminho]]
+            ).unify_dictionaries())
+            if antigo is not None and _ano(antigo) == ano:
+                novo = mesclar_ordenado(antigo, novo)
+                antigo = next(antigos, None)
+            yield novo
+        while antigo is not None:
+            yield antigo
+            antigo = next(antigos, None)
+
+    def com_resumo(tabelas):
+        for tabela in tabelas:
+            resumos.append(resumo_de_controle(tabela))
+            yield tabela
+
+    arquivo_temporario = arquivo_saida + '.tmp'
+    linhas = _gravar_por_ano(arquivo_temporario, com_resumo(tabelas()), ja_por_ano=True)
+    conferir_gravacao(arquivo_temporario, somar_resumos(resumos))
+    os.replace(arquivo_temporario, arquivo_saida)
+    return linhas
+
+def atualizar_particoes(arquivo_consolidado=CONSOLIDATED_FILE, pasta=CONSOLIDATED_DATASET_DIR, anos=None):
+    """
+    Gera o dataset particionado (ano=.../nom_subsistema=...) a partir do consolidado, lendo-o em lotes.
+    Com `anos`, só as partições desses anos são regravadas, lendo só os row groups do consolidado
+    cujas estatísticas de `din_instante` caem nesses anos; sem `anos` (ou se o dataset ainda não
+    existe), o dataset é refeito do zero.
+    """
+    if anos is None or not os.path.exists(pasta):
+        shutil.rmtree(pasta, ignore_errors=True)
+        anos = None
+    esquema = ESQUEMA_CONSOLIDADO.append(pa.field('ano', pa.int16()))
+    grupos = None
+    if anos is not None:
+        grupos = sorted({grupo for ano in anos
+                         for grupo in grupos_na_janela(arquivo_consolidado, pd.Timestamp(ano, 1, 1), pd.Timestamp(ano, 12, 31, 23, 59, 59))})
+
+    def lotes():
+        if grupos == []:
+            return
+        for lote in pq.ParquetFile(arquivo_consolidado).iter_batches(batch_size=LINHAS_POR_LOTE, row_groups=grupos,
+                                                                     columns=ESQUEMA_CONSOLIDADO.names):
+            tabela = pa.Table.from_batches([lote]).cast(ESQUEMA_CONSOLIDADO)
+            tabela = tabela.append_column('ano', pc.year(tabela['din_instante']).cast(pa.int16()))
+            if anos is not None:
+                tabela = tabela.filter(pc.is_in(tabela['ano'], value_set=pa.array(sorted(anos), type=pa.int16())))
+            yield from tabela.to_batches()
+
+    ds.write_dataset(
+        lotes(), pasta, schema=esquema, format='parquet',
+        file_options=ds.ParquetFileFormat().make_write_options(compression=OPCOES_PARQUET['compression']),
+        partitioning=COLUNAS_PARTICAO, partitioning_flavor='hive',
+        existing_data_behavior='delete_matching', basename_template='parte-{i}.parquet',
+    )
+
+# ==============================================================================
+# PIPELINE (ETAPAS E LINHA DE COMANDO)
+# ==============================================================================
+ETAPAS_ETL = ['fetch', 'clean', 'consolidate']
+
+def _arquivos_parquet(pasta):
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(os.path.join(pasta, nome) for nome in os.listdir(pasta) if nome.endswith('.parquet'))
+
+def _desatualizado(destino, *origens):
+    """True se `destino` não existe ou é mais antigo que alguma das `origens`."""
+    if not os.path.exists(destino):
+        return True
+    return any(os.path.getmtime(origem) > os.path.getmtime(destino) for origem in origens)
+
+def limpar_arquivo(origem, destino):
+    """
+    Limpa um arquivo anual bruto e o grava em `destino` já no esquema do consolidado.
+    Fica no nível do módulo para poder rodar num processo separado (--workers).
+    Retorna (destino, linhas, segundos).
+    """
+    inicio = time.perf_counter()
+    tabela = para_tabela_arrow(limpar_dados(pd.read_parquet(origem)))
+    arquivo_temporario = destino + '.tmp'
+    linhas = _gravar_por_ano(arquivo_temporario, [tabela])
+    os.replace(arquivo_temporario, destino)
+    return destino, linhas, time.perf_counter() - inicio
+
+def etapa_fetch(ons_url=ONS_URL, pasta=RAW_DATA_DIR, max_workers=MAX_DOWNLOADS_SIMULTANEOS):
+    """Busca os links na página da ONS e sincroniza o espelho local. Devolve as métricas da etapa."""
+    sessao = criar_sessao(max_workers)
+    print(f"--- Buscando links de arquivos em: {ons_url}")
+    file_urls = buscar_links_parquet(sessao, ons_url)
+    if not file_urls:
+        raise RuntimeError("Nenhum arquivo .parquet encontrado na página. O site pode ter mudado.")
+    print(f"--- Encontrados {len(file_urls)} arquivos; sincronizando o espelho local '{pasta}' ({max_workers} downloads simultâneos)...")
+    caminhos, alterados = sincronizar_espelho(file_urls, sessao, pasta, max_workers)
+    print(f"--- {len(alterados)} de {len(caminhos)} arquivos novos ou alterados.")
+    return {'arquivos': len(caminhos), 'alterados': len(alterados), 'bytes_baixados': sum(os.path.getsize(c) for c in alterados)}
+
+def etapa_clean(pasta=RAW_DATA_DIR, pasta_limpos=CLEAN_DATA_DIR, workers=1, todos=False):
+    """
+    Limpa os arquivos anuais do espelho cuja versão limpa em `pasta_limpos` não existe ou é mais
+    antiga que o bruto (ou todos, com `todos=True`). Com `workers` > 1, os arquivos são lidos e
+    limpos em paralelo num pool de processos.
+    """
+    brutos = _arquivos_parquet(pasta)
+    if not brutos:
+        raise RuntimeError(f"Nenhum arquivo .parquet em '{pasta}'.")
+    os.makedirs(pasta_limpos, exist_ok=True)
+    tarefas = [(bruto, os.path.join(pasta_limpos, os.path.basename(bruto))) for bruto in brutos]
+    tarefas = [(origem, destino) for origem, destino in tarefas if todos or _desatualizado(destino, origem)]
+    print(f"--- {len(tarefas)} de {len(brutos)} arquivos para limpar ({workers} processo(s)).")
+
+    linhas = 0
+    def registrar(destino, linhas_arquivo, segundos):
+        nonlocal linhas
+        linhas += linhas_arquivo
+        print(f"--- {os.path.basename(destino)}: {linhas_arquivo:,} linhas em {segundos:.2f}s")
+
+    if workers > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = [executor.submit(limpar_arquivo, origem, destino) for origem, destino in tarefas]
+            for futuro in as_completed(futuros):
+                registrar(*futuro.result())
+    else:
+        for origem, destino in tarefas:
+            registrar(*limpar_arquivo(origem, destino))
+    return {'arquivos': len(brutos), 'limpos': len(tarefas), 'linhas': linhas, 'workers': workers}
+
+def etapa_consolidate(pasta_limpos=CLEAN_DATA_DIR, arquivo_saida=CONSOLIDATED_FILE,
+                      pasta_particionada=CONSOLIDATED_DATASET_DIR, reconstruir=False, ipc=False, particionado=False):
+    """
+    Junta os arquivos limpos no consolidado, em streaming: só os anos cujos arquivos limpos são
+    mais novos que o consolidado são regravados (todos, com `reconstruir=True` ou sem consolidado).
+    Depois atualiza o cubo de agregados (somas por hora, dia, mês e ano) que os painéis leem no
+    lugar das linhas horárias: se o cubo correspondia ao consolidado anterior, só os anos regravados
+    são somados de novo. Por fim renova o cache das análises dos painéis, recalculando só a cauda a
+    partir do primeiro ano regravado.
+    Com `ipc=True` também grava o espelho Arrow IPC do consolidado, que os painéis mapeiam em memória;
+    um espelho que já exista é regravado sempre que o consolidado muda, com ou sem a opção.
+    Com `particionado=True` também mantém o dataset particionado por ano e subsistema (as mesmas
+    partições regravadas), para consultas externas com carregar_dados; os painéis não o leem. Sem a
+    opção, um dataset particionado que ficaria desatualizado é apagado.
+    """
+    limpos = _arquivos_parquet(pasta_limpos)
+    if not limpos:
+        raise RuntimeError(f"Nenhum arquivo limpo em '{pasta_limpos}'. Rode a etapa 'clean' antes.")
+    reconstruir = reconstruir or not os.path.exists(arquivo_saida)
+    alterados = limpos if reconstruir else [c for c in limpos if _desatualizado(arquivo_saida, c)]
+    if not alterados:
+        if particionado and not os.path.exists(pasta_particionada):
+            print(f"--- Gerando o dataset particionado '{pasta_particionada}' a partir do consolidado existente...")
+            atualizar_particoes(arquivo_saida, pasta_particionada)
+        cubo = {}
+        if abrir_cubo(arquivo_saida) is None:
+            print(f"--- Gerando o cubo de agregados '{caminho_cubo(arquivo_saida)}' a partir do consolidado existente...")
+            cubo = gravar_cubo(arquivo_saida)
+        linhas_ipc = None
+        if (ipc or os.path.exists(caminho_ipc(arquivo_saida))) and abrir_ipc(arquivo_saida) is None:
+            print(f"--- Gravando o espelho Arrow IPC '{caminho_ipc(arquivo_saida)}' a partir do consolidado existente...")
+            linhas_ipc = gravar_ipc(arquivo_saida)
+        print(f"--- Nenhum arquivo mudou desde a última consolidação. '{arquivo_saida}' já está atualizado.")
+        return {'alterados': 0, 'linhas': pq.ParquetFile(arquivo_saida).metadata.num_rows, 'anos_regravados': [],
+                'linhas_cubo': cubo, 'linhas_ipc': linhas_ipc}
+
+    anos = sorted(anos_dos_arquivos(alterados))
+    # Conferidos antes de o consolidado mudar: o cubo e as análises guardadas são desta versão?
+    cubo_em_dia = not reconstruir and abrir_cubo(arquivo_saida) is not None
+    versao_anterior = None if reconstruir else versao_dos_dados(arquivo_saida)
+    print(f"--- Gravando '{arquivo_saida}' ({len(alterados)} arquivo(s), anos {anos[0]}-{anos[-1]})...")
+    linhas = gravar_consolidado_streaming(limpos, alterados, arquivo_saida, ja_limpos=True, reconstruir=reconstruir)
+    if particionado:
+        print(f"--- Atualizando o dataset particionado '{pasta_particionada}'...")
+        atualizar_particoes(arquivo_saida, pasta_particionada, None if reconstruir else anos)
+    elif os.path.exists(pasta_particionada):
+        print(f"--- Apagando o dataset particionado '{pasta_particionada}', que ficaria desatualizado (use --particionado para mantê-lo)...")
+        shutil.rmtree(pasta_particionada)
+    if cubo_em_dia:
+        print(f"--- Atualizando o cubo de agregados '{caminho_cubo(arquivo_saida)}' (anos {', '.join(map(str, anos))})...")
+        cubo = atualizar_cubo(arquivo_saida, anos)
+    else:
+        print(f"--- Gravando o cubo de agregados '{caminho_cubo(arquivo_saida)}'...")
+        cubo = gravar_cubo(arquivo_saida)
+    analises_desde = None
     try:
-        print(f"\n[ETAPA 4/4] Salvando o arquivo consolidado como '{CONSOLIDATED_FILE}'...")
-        df.to_parquet(CONSOLIDATED_FILE)
-        print(f">>> SUCESSO! Arquivo '{CONSOLIDATED_FILE}' criado com {len(df):,} linhas.")
-    except Exception as e:
-        print(f"[ERRO] Falha ao salvar o arquivo final: {e}")
-        return
+        print(f"--- Atualizando as análises dos painéis em '{pasta_cache_analises(arquivo_saida)}'...")
+        analises_desde = atualizar_analises(arquivo_saida, None if reconstruir else anos, versao_anterior)
+    except OSError as e:  # os painéis recalculam na primeira carga
+        print(f"--- AVISO: não foi possível guardar as análises: {e}")
+    linhas_ipc = None
+    if ipc or os.path.exists(caminho_ipc(arquivo_saida)):  # um espelho antigo ficaria desatualizado
+        print(f"--- Gravando o espelho Arrow IPC '{caminho_ipc(arquivo_saida)}'...")
+        linhas_ipc = gravar_ipc(arquivo_saida)
+    return {'alterados': len(alterados), 'linhas': linhas, 'anos_regravados': anos, 'linhas_cubo': cubo,
+            'cubo_incremental': cubo_em_dia, 'analises_desde': analises_desde, 'linhas_ipc': linhas_ipc}
+
+def etapa_verify(pasta=RAW_DATA_DIR, pasta_limpos=CLEAN_DATA_DIR, arquivo_saida=CONSOLIDATED_FILE,
+                 pasta_particionada=CONSOLIDATED_DATASET_DIR):
+    """
+    Confere o resultado do ETL sem baixar nada: o espelho bate com o manifesto (tamanho e sha256),
+    todo bruto tem versão limpa atualizada, o consolidado tem o esquema esperado, está ordenado
+    pela chave, sem chaves repetidas e com, ano a ano, pelo menos as chaves distintas dos arquivos
+    limpos, o dataset particionado tem o mesmo total e o cubo de agregados foi gerado a partir desta
+    versão do consolidado, com cada grão somando todas as suas linhas. O espelho Arrow IPC, se
+    existe, precisa ser desta versão do consolidado e ter as mesmas linhas.
+    """
+    problemas = []
+    manifesto = carregar_manifesto(pasta)
+    brutos = _arquivos_parquet(pasta)
+    for caminho in brutos:
+        nome = os.path.basename(caminho)
+        if nome in manifesto and not copia_local_valida(caminho, manifesto[nome]):
+            problemas.append(f"{nome}: não confere com o manifesto")
+        if _desatualizado(os.path.join(pasta_limpos, nome), caminho):
+            problemas.append(f"{nome}: sem versão limpa atualizada")
+
+    # Chaves distintas por ano nos arquivos limpos: o consolidado precisa ter pelo menos essas linhas
+    # (pode ter mais: linhas antigas que não vieram de novo continuam valendo)
+    chaves_limpas = [pd.read_parquet(c, columns=CHAVE_CONSOLIDADO) for c in _arquivos_parquet(pasta_limpos)]
+    esperado = pd.Series(dtype='int64')
+    if chaves_limpas:
+        chaves_limpas = pd.concat([df.astype({'nom_subsistema': str}) for df in chaves_limpas], ignore_index=True)
+        esperado = chaves_limpas.drop_duplicates()['din_instante'].dt.year.value_counts().sort_index()
+        del chaves_limpas
+
+    linhas = 0
+    if not os.path.exists(arquivo_saida):
+        problemas.append(f"'{arquivo_saida}' não existe")
+    else:
+        arquivo = pq.ParquetFile(arquivo_saida)
+        linhas = arquivo.metadata.num_rows
+        if not arquivo.schema_arrow.equals(ESQUEMA_CONSOLIDADO):
+            problemas.append(f"'{arquivo_saida}' fora do esquema de armazenamento")
+        gravado, fora_de_ordem, repetidas, ultimo_instante = {}, False, 0, None
+        for i in range(arquivo.metadata.num_row_groups):
+            tabela = arquivo.read_row_group(i, columns=CHAVE_CONSOLIDADO)
+            if tabela.num_rows == 0:
+                continue
+            diferencas = np.diff(_chaves(tabela, _nomes(tabela)))
+            primeiro = tabela['din_instante'][0].as_py()
+            fora_de_ordem |= bool((diferencas < 0).any()) or (ultimo_instante is not None and primeiro < ultimo_instante)
+            repetidas += int((diferencas == 0).sum())
+            ultimo_instante = tabela['din_instante'][-1].as_py()
+            for ano, n in pd.Series(pc.year(tabela['din_instante']).to_numpy(zero_copy_only=False)).value_counts().items():
+                gravado[ano] = gravado.get(ano, 0) + n
+        if fora_de_ordem:
+            problemas.append(f"'{arquivo_saida}' não está ordenado por (din_instante, nom_subsistema)")
+        if repetidas:
+            problemas.append(f"'{arquivo_saida}' tem {repetidas:,} linha(s) com (din_instante, nom_subsistema) repetido")
+        faltando = [ano for ano, n in esperado.items() if gravado.get(ano, 0) < n]
+        if faltando:
+            problemas.append(f"consolidado tem menos linhas que os arquivos limpos em: {', '.join(map(str, faltando))}")
+    if os.path.isdir(pasta_particionada) and ds.dataset(pasta_particionada, format='parquet', partitioning='hive').count_rows() != linhas:
+        problemas.append(f"'{pasta_particionada}' não tem o mesmo número de linhas do consolidado")
+    if os.path.exists(arquivo_saida):
+        cubo = abrir_cubo(arquivo_saida)
+        if cubo is None:
+            problemas.append(f"'{caminho_cubo(arquivo_saida)}' não existe ou não corresponde ao consolidado atual")
+        else:
+            arquivo_cubo, grupos = cubo
+            for grao, indices in grupos.items():
+                somadas = pc.sum(arquivo_cubo.read_row_groups(indices, columns=['linhas'])['linhas']).as_py() if indices else 0
+                if somadas != linhas:
+                    problemas.append(f"cubo de agregados: o grão '{grao}' não soma as {linhas:,} linhas do consolidado")
+        if os.path.exists(caminho_ipc(arquivo_saida)):
+            mapeado = abrir_ipc(arquivo_saida)
+            if mapeado is None:
+                problemas.append(f"'{caminho_ipc(arquivo_saida)}' não corresponde ao consolidado atual (rode 'consolidate --ipc' ou apague o arquivo)")
+            elif mapeado.num_rows != linhas:
+                problemas.append(f"'{caminho_ipc(arquivo_saida)}' não tem o mesmo número de linhas do consolidado")
+
+    for problema in problemas:
+        print(f"--- PROBLEMA: {problema}")
+    print(f"--- Verificação {'sem problemas' if not problemas else f'com {len(problemas)} problema(s)'}.")
+    return {'ok': not problemas, 'problemas': problemas, 'arquivos': len(brutos), 'linhas': linhas}
+
+ETAPAS = {'fetch': etapa_fetch, 'clean': etapa_clean, 'consolidate': etapa_consolidate, 'verify': etapa_verify}
+
+def executar_etl(etapas=ETAPAS_ETL, ons_url=ONS_URL, pasta=RAW_DATA_DIR, pasta_limpos=CLEAN_DATA_DIR,
+                 arquivo_saida=CONSOLIDATED_FILE, pasta_particionada=CONSOLIDATED_DATASET_DIR,
+                 max_downloads=MAX_DOWNLOADS_SIMULTANEOS, workers=1, offline=False, progresso=None, ipc=False,
+                 particionado=False):
+    """
+    Executa as `etapas` em ordem e devolve o relatório: tempo e contagens de cada etapa.
+    Com `offline=True` a etapa 'fetch' é pulada e tudo é refeito a partir do espelho em `pasta`.
+    Uma etapa que falha interrompe as seguintes; o erro fica registrado no relatório.
+    `progresso(etapa, i, total)`, se informado, é chamado antes de cada etapa (usado pelo painel).
+    Com `ipc=True` a etapa 'consolidate' também grava o espelho Arrow IPC do consolidado e, com
+    `particionado=True`, o dataset particionado por ano e subsistema.
+    """
+    if offline:
+        etapas = [etapa for etapa in etapas if etapa != 'fetch']
+    argumentos = {
+        'fetch': dict(ons_url=ons_url, pasta=pasta, max_workers=max_downloads),
+        'clean': dict(pasta=pasta, pasta_limpos=pasta_limpos, workers=workers, todos=offline),
+        'consolidate': dict(pasta_limpos=pasta_limpos, arquivo_saida=arquivo_saida,
+                            pasta_particionada=pasta_particionada, reconstruir=offline, ipc=ipc, particionado=particionado),
+        'verify': dict(pasta=pasta, pasta_limpos=pasta_limpos, arquivo_saida=arquivo_saida,
+                       pasta_particionada=pasta_particionada),
+    }
+    relatorio = {'inicio': time.strftime('%Y-%m-%dT%H:%M:%S'), 'etapas': list(etapas), 'offline': offline,
+                 'workers': workers, 'sucesso': True, 'resultados': []}
+    inicio = time.perf_counter()
+    for i, etapa in enumerate(etapas, start=1):
+        print(f"\n[ETAPA {i}/{len(etapas)}] {etapa}")
+        if progresso:
+            progresso(etapa, i, len(etapas))
+        inicio_etapa = time.perf_counter()
+        try:
+            resultado = {'etapa': etapa, **ETAPAS[etapa](**argumentos[etapa])}
+        except Exception as e:
+            print(f"[ERRO] Falha na etapa '{etapa}': {e}")
+            relatorio['resultados'].append({'etapa': etapa, 'erro': str(e), 'segundos': time.perf_counter() - inicio_etapa})
+            relatorio.update(sucesso=False, erro=f"{etapa}: {e}")
+            break
+        resultado['segundos'] = time.perf_counter() - inicio_etapa
+        if etapa == 'clean' and resultado['linhas']:
+            resultado['linhas_por_s'] = resultado['linhas'] / resultado['segundos']
+        relatorio['resultados'].append(resultado)
+        if resultado.get('ok') is False:
+            relatorio['sucesso'] = False
+    relatorio['segundos'] = time.perf_counter() - inicio
+    return relatorio
+
+def run_full_etl(ons_url=ONS_URL, arquivo_saida=CONSOLIDATED_FILE, max_workers=MAX_DOWNLOADS_SIMULTANEOS, pasta=RAW_DATA_DIR,
+                 pasta_particionada=CONSOLIDATED_DATASET_DIR, pasta_limpos=CLEAN_DATA_DIR, workers=1, offline=False):
+    """
+    Função principal que executa todo o pipeline de ETL (fetch, clean e consolidate).
+    Cada ano é limpo e gravado separadamente, então o pico de memória fica em um ano de dados.
+    Um dataset particionado que já exista em `pasta_particionada` é apagado quando o consolidado muda
+    (para mantê-lo, use executar_etl com particionado=True).
+    """
+    print(">>> INICIANDO PROCESSO DE ETL DO BALANÇO ENERGÉTICO DA ONS <<<")
+    relatorio = executar_etl(ETAPAS_ETL, ons_url, pasta, pasta_limpos, arquivo_saida, pasta_particionada,
+                             max_workers, workers, offline)
+    if relatorio['sucesso']:
+        linhas = relatorio['resultados'][-1]['linhas']
+        print(f">>> SUCESSO! Arquivo '{arquivo_saida}' com {linhas:,} linhas, em {relatorio['segundos']:.2f}s.")
+    return relatorio
+
+def main(argv=None):
+    """
+    Linha de comando do ETL:
+        python Coletar_dados.py [etl|fetch|clean|consolidate|verify] [opções]
+    Sem subcomando, roda o ETL completo (fetch, clean, consolidate). Ao final imprime o
+    relatório em JSON (última linha da saída) e, com --relatorio, o acrescenta a um arquivo JSONL.
+    """
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument('--url', default=ONS_URL, help="Página do dataset na ONS.")
+    comum.add_argument('--pasta', default=RAW_DATA_DIR, help="Espelho local dos arquivos anuais.")
+    comum.add_argument('--pasta-limpos', default=CLEAN_DATA_DIR, help="Arquivos anuais já limpos.")
+    comum.add_argument('--saida', default=CONSOLIDATED_FILE, help="Arquivo consolidado.")
+    comum.add_argument('--pasta-particionada', default=CONSOLIDATED_DATASET_DIR, help="Dataset particionado por ano/subsistema (com --particionado).")
+    comum.add_argument('--downloads', type=int, default=MAX_DOWNLOADS_SIMULTANEOS, help="Downloads simultâneos.")
+    comum.add_argument('--workers', type=int, default=1, help="Processos para ler e limpar os arquivos anuais.")
+    comum.add_argument('--offline', action='store_true', help="Não acessa a ONS: refaz tudo a partir do espelho local.")
+    comum.add_argument('--ipc', action='store_true', help="Grava também o espelho Arrow IPC do consolidado (mapeado em memória pelos painéis); depois de gravado, é mantido em dia.")
+    comum.add_argument('--particionado', action='store_true', help="Mantém também o dataset particionado por ano/subsistema (para consultas externas; os painéis não o leem).")
+    comum.add_argument('--relatorio', metavar='ARQUIVO', help="Acrescenta o relatório JSON a este arquivo (uma linha por execução).")
+
+    parser = argparse.ArgumentParser(description="ETL do balanço energético por subsistema da ONS.", parents=[comum])
+    subcomandos = parser.add_subparsers(dest='comando')
+    subcomandos.add_parser('etl', parents=[comum], help="fetch + clean + consolidate (padrão).")
+    subcomandos.add_parser('fetch', parents=[comum], help="Sincroniza o espelho local com a ONS.")
+    subcomandos.add_parser('clean', parents=[comum], help="Limpa os arquivos anuais novos ou alterados.")
+    subcomandos.add_parser('consolidate', parents=[comum], help="Atualiza o consolidado, o cubo e as análises.")
+    subcomandos.add_parser('verify', parents=[comum], help="Confere espelho, arquivos limpos e consolidado.")
+    args = parser.parse_args(argv)
+
+    comando = args.comando or 'etl'
+    if comando == 'fetch' and args.offline:
+        parser.error("'fetch' não combina com --offline.")
+    relatorio = executar_etl(
+        ETAPAS_ETL if comando == 'etl' else [comando], args.url, args.pasta, args.pasta_limpos, args.saida,
+        args.pasta_particionada, args.downloads, args.workers, args.offline, ipc=args.ipc, particionado=args.particionado,
+    )
+    relatorio['comando'] = comando
+    if args.relatorio:
+        with open(args.relatorio, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(relatorio, ensure_ascii=False) + '\n')
+    print(json.dumps(relatorio, ensure_ascii=False))
+    return 0 if relatorio['sucesso'] else 1
 
 if __name__ == "__main__":
-    run_full_etl()
\ No newline at end of file
+    sys.exit(main())
@@ -9,54 +9,23 @@ import plotly.graph_objects as go
 from sklearn.linear_model import LinearRegression
 import numpy as np
 import statsmodels.tsa.api as smt
+from dados_energia import JANELAS_MEDIAS, NOMES_ACENTUADOS, OPCOES_JANELAS_MEDIAS, TIPOS_MEDIAS, carregar_analises, carregar_medias
+from graficos import LIMITE_PONTOS_SVG, PONTOS_POR_TRACO, RENDERIZADORES, linha, reduzir_serie, tracado_media
 
 # --- Constantes e Configuração ---
 CONSOLIDATED_FILE = "balanco_energia_consolidado.parquet"
 st.set_page_config(layout="wide", page_title="Análise Energética do Brasil com Previsões", page_icon="🇧🇷")
 
 # --- Módulo de Preparação de Dados (em cache) ---
-@st.cache_data
 def load_and_prepare_all_data():
     """
-    Lê a base mestre e prepara TODOS os dataframes necessários para as análises.
-    Retorna o dataframe original e os processados.
+    Devolve o resumo da base mestre e as análises prontas do módulo compartilhado (dados_energia).
+    O cálculo é feito uma vez por versão do arquivo e reaproveitado pelos outros painéis.
     """
-    df = pd.read_parquet(CONSOLIDATED_FILE)
-    df['ano'] = pd.to_datetime(df['din_instante']).dt.year
-
-    # Prepara dados do SIN
-    df_sin = df[df['nom_subsistema'] == 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    fontes_renovaveis = ['val_gerhidraulica', 'val_gereolica', 'val_gersolar']
-    df_sin['geracao_renovavel'] = df_sin[fontes_renovaveis].sum(axis=1)
-    df_sin['geracao_total'] = df_sin['geracao_renovavel'] + df_sin['val_gertermica']
-
-    # Prepara Análise Anual (com base no SIN)
-    analise_anual = df_sin.groupby('ano').agg(
-        Hidraulica=('val_gerhidraulica', 'sum'), Termica=('val_gertermica', 'sum'),
-        Eolica=('val_gereolica', 'sum'), Solar=('val_gersolar', 'sum'),
-        total_renovavel=('geracao_renovavel', 'sum'), total_geral=('geracao_total', 'sum')
-    ).reset_index()
-    analise_anual['perc_renovavel_total'] = (analise_anual['total_renovavel'] / analise_anual['total_geral']) * 100
-    analise_anual['perc_eolica'] = (analise_anual['Eolica'] / analise_anual['total_geral']) * 100
-    analise_anual['perc_solar'] = (analise_anual['Solar'] / analise_anual['total_geral']) * 100
-    analise_anual['crescimento_eolica'] = analise_anual['perc_eolica'].pct_change() * 100
-    analise_anual['crescimento_solar'] = analise_anual['perc_solar'].pct_change() * 100
-
-    # Prepara Análise Regional (com base no DataFrame completo)
-    df_regional = df[df['nom_subsistema'] != 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    df_regional['geracao_renovavel'] = df_regional[fontes_renovaveis].sum(axis=1)
-    df_regional['geracao_total'] = df_regional['geracao_renovavel'] + df_regional['val_gertermica']
-    analise_regional_anual = df_regional.groupby(['ano', 'nom_subsistema']).agg(
-        geracao_renovavel_regiao=('geracao_renovavel', 'sum'),
-        geracao_total_regiao=('geracao_total', 'sum')
-    ).reset_index()
-    analise_regional_anual = pd.merge(analise_regional_anual, analise_anual[['ano', 'total_renovavel']], on='ano', suffixes=('', '_brasil'))
-    
-    # Prepara Dados Diários (com base no SIN)
-    df_diario = df_sin.set_index('din_instante')[['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']].resample('D').sum()
-    df_diario.columns = ['Hidráulica', 'Térmica', 'Eólica', 'Solar']
-    
-    return df, analise_anual, analise_regional_anual, df_diario # Retornando df original também
+    analises = carregar_analises(CONSOLIDATED_FILE)
+    analise_regional_anual = analises.regional.rename(columns={'total_renovavel_brasil': 'total_renovavel'})
+    df_diario = analises.diario.rename(columns=NOMES_ACENTUADOS)
+    return analises.resumo, analises.anual, analise_regional_anual, df_diario
 
 # --- Funções de Previsão ---
 def predict_linear_regression(df, target_column, current_year, forecast_until_year):
@@ -131,8 +100,13 @@ def predict_ses_for_daily_data(df_diario, forecast_days):
     df_combined = pd.concat([df_diario, df_forecast])
     return df_combined.sort_index()
 
-def plot_serie_diaria(df_diario_original, df_diario_forecasted):
-    """Função para criar o gráfico de Série Diária com Médias Móveis e Previsão."""
+def plot_serie_diaria(df_diario_original, df_diario_forecasted, df_medias, janelas=JANELAS_MEDIAS, inicio=None, fim=None, renderizador=None):
+    """
+    Função para criar o gráfico de Série Diária com Médias Móveis e Previsão, no período [inicio, fim].
+    As médias das `janelas` vêm prontas em `df_medias` (colunas '<fonte>_<janela>d', de carregar_medias).
+    Cada traço é reduzido ao orçamento de pontos (reduzir_serie): períodos menores mostram mais detalhe.
+    `renderizador` escolhe entre SVG e WebGL para os traços (linha).
+    """
     fig = go.Figure()
     # Definindo um esquema de cores mais suave ou com um "gradiente" percebido
     # Usaremos tons que se complementam e são facilmente distinguíveis
@@ -145,22 +119,22 @@ def plot_serie_diaria(df_diario_original, df_diario_forecasted):
     
     # Adicionar os dados históricos (linhas mais finas, opacas)
     for fonte in df_diario_original.columns:
-        media_30d = df_diario_original[fonte].rolling(window=30).mean()
-        media_90d = df_diario_original[fonte].rolling(window=90).mean()
+        diario = reduzir_serie(df_diario_original[fonte], inicio, fim)
         
-        fig.add_trace(go.Scatter(x=df_diario_original.index, y=df_diario_original[fonte], mode='lines', 
+        fig.add_trace(linha(x=diario.index, y=diario, renderizador=renderizador, mode='lines', 
                                  name=f'{fonte} (Histórico)', legendgroup=fonte, line=dict(width=1), opacity=0.5, marker_color=cores[fonte]))
-        fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_30d, mode='lines', 
-                                 name=f'{fonte} Média 30d (Histórico)', legendgroup=fonte, line=dict(width=2), marker_color=cores[fonte], showlegend=False))
-        fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_90d, mode='lines', 
-                                 name=f'{fonte} Média 90d (Histórico)', legendgroup=fonte, line=dict(width=2, dash='dash'), marker_color=cores[fonte], showlegend=False))
+        for posicao, janela in enumerate(janelas):
+            media = reduzir_serie(df_medias[f'{fonte}_{janela}d'], inicio, fim)
+            fig.add_trace(linha(x=media.index, y=media, renderizador=renderizador, mode='lines', 
+                                     name=f'{fonte} Média {janela}d (Histórico)', legendgroup=fonte, line=dict(width=2, dash=tracado_media(posicao)), marker_color=cores[fonte], showlegend=False))
 
     # Adicionar as previsões (linhas tracejadas, mais grossas)
     for fonte in df_diario_forecasted.columns:
         if fonte in df_diario_original.columns: # Apenas para as colunas que foram previstas
             # A previsão SES já é uma série suavizada estendida
             # Plotamos a série completa do df_diario_forecasted para mostrar a continuação
-            fig.add_trace(go.Scatter(x=df_diario_forecasted.index, y=df_diario_forecasted[fonte], mode='lines', 
+            previsao = reduzir_serie(df_diario_forecasted[fonte], inicio, fim)
+            fig.add_trace(linha(x=previsao.index, y=previsao, renderizador=renderizador, mode='lines', 
                                      name=f'{fonte} (Previsão SES)', legendgroup=fonte, 
                                      line=dict(width=3, dash='dot'), marker_color=cores[fonte]))
 
@@ -180,8 +154,8 @@ def main():
         st.stop()
 
     # Carrega e prepara todos os dados de uma vez
-    # Agora 'df_original' recebe o dataframe completo antes de qualquer processamento
-    df_original, analise_anual, analise_regional, df_diario = load_and_prepare_all_data()
+    # 'resumo_base' traz linhas, colunas e período da base mestre, lidos só dos metadados do arquivo
+    resumo_base, analise_anual, analise_regional, df_diario = load_and_prepare_all_data()
 
     # --- Metadados da Base de Dados para Enaltecer o Trabalho ---
     st.header("🔍 Visão Geral da Base de Dados (Nosso Esforço em Números!)")
@@ -195,11 +169,11 @@ def main():
     file_size_mb = file_size_bytes / (1024 * 1024)
 
     # Informações sobre o DataFrame original
-    num_linhas, num_colunas = df_original.shape
-    periodo_inicio = df_original['din_instante'].min().strftime('%d/%m/%Y')
-    periodo_fim = df_original['din_instante'].max().strftime('%d/%m/%Y')
-    num_subsistemas = df_original['nom_subsistema'].nunique()
-    cols_originais = ", ".join(df_original.columns.tolist())
+    num_linhas, num_colunas = resumo_base['linhas'], len(resumo_base['colunas'])
+    periodo_inicio = resumo_base['inicio'].strftime('%d/%m/%Y') if resumo_base['inicio'] is not None else '—'
+    periodo_fim = resumo_base['fim'].strftime('%d/%m/%Y') if resumo_base['fim'] is not None else '—'
+    num_subsistemas = resumo_base['subsistemas']
+    cols_originais = ", ".join(resumo_base['colunas'])
 
     col_meta1, col_meta2 = st.columns(2)
     with col_meta1:
@@ -331,7 +305,20 @@ def main():
             A **Suavização Exponencial Simples (SES)** é usada para gerar as previsões futuras (linhas pontilhadas). Ela atribui maior peso às observações mais recentes, tornando a previsão mais sensível às mudanças recentes na série.
             """)
         # Usar a função plot_serie_diaria que agora aceita o df original e o df com previsões
-        fig_diario_pred = plot_serie_diaria(df_diario, df_diario_ses_combined) 
+        primeiro_dia, ultimo_dia = df_diario.index.min().date(), df_diario_ses_combined.index.max().date()
+        inicio, fim = st.slider("Período do gráfico:", min_value=primeiro_dia, max_value=ultimo_dia,
+                                value=(primeiro_dia, ultimo_dia), format="DD/MM/YYYY")
+        st.caption(f"Períodos menores trazem mais detalhe: cada linha é desenhada com no máximo {PONTOS_POR_TRACO} pontos.")
+        renderizador = st.radio("Desenho do gráfico:", RENDERIZADORES, horizontal=True,
+                                format_func={'auto': 'Automático', 'svg': 'SVG', 'webgl': 'WebGL'}.get,
+                                help=f"Automático usa WebGL nos traços com mais de {LIMITE_PONTOS_SVG} pontos: arrastar e dar zoom fica mais leve.")
+        col_janelas, col_tipo = st.columns(2)
+        janelas = sorted(col_janelas.multiselect("Médias móveis (dias):", OPCOES_JANELAS_MEDIAS, default=list(JANELAS_MEDIAS)))
+        tipo_media = col_tipo.radio("Tipo de média:", TIPOS_MEDIAS, horizontal=True,
+                                    format_func={'simples': 'Simples', 'centralizada': 'Centralizada', 'exponencial': 'Exponencial'}.get,
+                                    help="Simples: média dos dias até o dia. Centralizada: janela centrada no dia. Exponencial: mais peso aos dias recentes.")
+        df_medias = carregar_medias(janelas, tipo_media, CONSOLIDATED_FILE, nomes=NOMES_ACENTUADOS)
+        fig_diario_pred = plot_serie_diaria(df_diario, df_diario_ses_combined, df_medias, janelas, inicio, fim, renderizador)
         st.plotly_chart(fig_diario_pred, use_container_width=True)
 
     elif page == "Previsões e Conceitos":
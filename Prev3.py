@@ -9,6 +9,10 @@ import plotly.graph_objects as go
 from sklearn.linear_model import LinearRegression
 import numpy as np
 import statsmodels.tsa.api as smt
+from artefatos import Artefatos
+from dados_energia import (JANELAS_MEDIAS, NOMES_ACENTUADOS, OPCOES_JANELAS_MEDIAS, TIPOS_MEDIAS, cache_de_figuras,
+                           carregar_analises, carregar_medias, versao_dos_dados)
+from graficos import LIMITE_PONTOS_SVG, PONTOS_POR_TRACO, RENDERIZADORES, figura_em_cache, linha, reduzir_serie, tracado_media
 import matplotlib.pyplot as plt # Importar matplotlib
 
 # --- Constantes e Configuração ---
@@ -16,78 +20,15 @@ CONSOLIDATED_FILE = "balanco_energia_consolidado.parquet"
 st.set_page_config(layout="wide", page_title="Análise Energética do Brasil com Previsões", page_icon="🇧🇷")
 
 # --- Módulo de Preparação de Dados (em cache) ---
-@st.cache_data
 def load_and_prepare_all_data():
     """
-    Lê a base mestre e prepara TODOS os dataframes necessários para as análises.
-    Retorna o dataframe original e os processados.
+    Devolve o resumo da base mestre e as análises prontas do módulo compartilhado (dados_energia).
+    O cálculo é feito uma vez por versão do arquivo e reaproveitado pelos outros painéis.
     """
-    df = pd.read_parquet(CONSOLIDATED_FILE)
-    df['din_instante'] = pd.to_datetime(df['din_instante']) # Garante que din_instante é datetime
-    df['ano'] = df['din_instante'].dt.year
-
-    # Converte as colunas de geração para tipo numérico ANTES de calcular a geração total e agrupar
-    numeric_cols = ['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce') # 'coerce' substitui não numéricos por NaN
-
-    # Prepara dados do SIN
-    df_sin = df[df['nom_subsistema'] == 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    fontes_renovaveis = ['val_gerhidraulica', 'val_gereolica', 'val_gersolar']
-    df_sin['geracao_renovavel'] = df_sin[fontes_renovaveis].sum(axis=1)
-    df_sin['geracao_total'] = df_sin['geracao_renovavel'] + df_sin['val_gertermica']
-
-    # Prepara Análise Anual (com base no SIN)
-    analise_anual = df_sin.groupby('ano').agg(
-        Hidraulica=('val_gerhidraulica', 'sum'), Termica=('val_gertermica', 'sum'),
-        Eolica=('val_gereolica', 'sum'), Solar=('val_gersolar', 'sum'),
-        total_renovavel=('geracao_renovavel', 'sum'), total_geral=('geracao_total', 'sum')
-    ).reset_index()
-    
-    # Preenchimento de NaN e cálculo de porcentagens para TODAS as fontes
-    analise_anual['total_hidraulica'] = analise_anual['Hidraulica'].fillna(0)
-    analise_anual['total_termica'] = analise_anual['Termica'].fillna(0)
-    analise_anual['total_eolica'] = analise_anual['Eolica'].fillna(0)
-    analise_anual['total_solar'] = analise_anual['Solar'].fillna(0)
-    analise_anual['geracao_total_anual'] = analise_anual['total_hidraulica'] + analise_anual['total_termica'] + \
-                                            analise_anual['total_eolica'] + analise_anual['total_solar']
-
-    # --- CORREÇÃO: Adicionando o cálculo das porcentagens individuais ---
-    # Usar .replace(0, np.nan) para evitar divisão por zero antes da divisão, depois .fillna(0) para porcentagens
-    total_geral_safe = analise_anual['total_geral'].replace(0, np.nan)
-
-    analise_anual['perc_renovavel_total'] = (analise_anual['total_renovavel'] / total_geral_safe) * 100
-    analise_anual['perc_eolica'] = (analise_anual['Eolica'] / total_geral_safe) * 100
-    analise_anual['perc_solar'] = (analise_anual['Solar'] / total_geral_safe) * 100
-    analise_anual['perc_hidraulica'] = (analise_anual['Hidraulica'] / total_geral_safe) * 100 # Adicionado
-    analise_anual['perc_termica'] = (analise_anual['Termica'] / total_geral_safe) * 100     # Adicionado
-
-    # Preencher NaN nas porcentagens com 0 após a divisão, se necessário
-    for col_perc in ['perc_renovavel_total', 'perc_eolica', 'perc_solar', 'perc_hidraulica', 'perc_termica']:
-        analise_anual[col_perc] = analise_anual[col_perc].fillna(0)
-
-
-    # Calcula crescimento percentual para os novos gráficos
-    analise_anual['crescimento_eolica'] = analise_anual['perc_eolica'].pct_change() * 100
-    analise_anual['crescimento_solar'] = analise_anual['perc_solar'].pct_change() * 100
-    analise_anual['crescimento_renovavel_total'] = analise_anual['perc_renovavel_total'].pct_change() * 100
-
-
-    # Prepara Análise Regional (com base no DataFrame completo)
-    df_regional = df[df['nom_subsistema'] != 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    df_regional['geracao_renovavel'] = df_regional[fontes_renovaveis].sum(axis=1)
-    df_regional['geracao_total'] = df_regional['geracao_renovavel'] + df_regional['val_gertermica']
-    analise_regional_anual = df_regional.groupby(['ano', 'nom_subsistema']).agg(
-        geracao_renovavel_regiao=('geracao_renovavel', 'sum'),
-        geracao_total_regiao=('geracao_total', 'sum')
-    ).reset_index()
-    analise_regional_anual = pd.merge(analise_regional_anual, analise_anual[['ano', 'total_renovavel']], on='ano', suffixes=('', '_brasil'))
-    
-    # Prepara Dados Diários (com base no SIN)
-    df_diario = df_sin.set_index('din_instante')[['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']].resample('D').sum()
-    df_diario.columns = ['Hidráulica', 'Térmica', 'Eólica', 'Solar']
-    
-    return df, analise_anual, analise_regional_anual, df_diario # Retornando df original também
+    analises = carregar_analises(CONSOLIDATED_FILE)
+    analise_regional_anual = analises.regional.rename(columns={'total_renovavel_brasil': 'total_renovavel'})
+    df_diario = analises.diario.rename(columns=NOMES_ACENTUADOS)
+    return analises.resumo, analises.anual, analise_regional_anual, df_diario
 
 # --- Funções de Previsão ---
 def predict_linear_regression(df, target_column, current_year, forecast_until_year):
@@ -162,8 +103,40 @@ def predict_ses_for_daily_data(df_diario, forecast_days):
     df_combined = pd.concat([df_diario, df_forecast])
     return df_combined.sort_index()
 
-def plot_serie_diaria(df_diario_original, df_diario_forecasted):
-    """Função para criar o gráfico de Série Diária com Médias Móveis e Previsão."""
+# --- Previsões sob Demanda ---
+FORECAST_UNTIL_YEAR = 2030
+# Artefato de regressão linear -> coluna prevista
+PREVISOES_RL = {'rl_eolica': 'perc_eolica', 'rl_solar': 'perc_solar', 'rl_renovavel_total': 'perc_renovavel_total'}
+# Artefatos usados por cada página; só os da página aberta são calculados
+PAGINAS = {
+    "Visão Geral e ODS 7": ['rl_renovavel_total'],
+    "Análise de Crescimento": ['rl_eolica', 'rl_solar'],
+    "Análise Regional": [],
+    "Análise de Série Temporal": ['ses_diario'],
+    "Previsões e Conceitos": list(PREVISOES_RL) + ['ses_diario'],
+}
+
+@st.cache_resource(max_entries=2)
+def obter_artefatos(versao, _analise_anual, _df_diario):
+    """
+    Registra as previsões sem calculá-las: cada uma é ajustada na primeira vez que uma página a pede
+    e reaproveitada (por todas as sessões) enquanto a versão dos dados não mudar.
+    """
+    artefatos = Artefatos()
+    current_year = _analise_anual['ano'].max()
+    for nome, coluna in PREVISOES_RL.items():
+        artefatos.registrar(nome, lambda coluna=coluna: predict_linear_regression(_analise_anual, coluna, current_year, FORECAST_UNTIL_YEAR))
+    forecast_days = 365 * (FORECAST_UNTIL_YEAR - _df_diario.index.max().year)
+    artefatos.registrar('ses_diario', lambda: predict_ses_for_daily_data(_df_diario, forecast_days))
+    return artefatos
+
+def plot_serie_diaria(df_diario_original, df_diario_forecasted, df_medias, janelas=JANELAS_MEDIAS, inicio=None, fim=None, renderizador=None):
+    """
+    Função para criar o gráfico de Série Diária com Médias Móveis e Previsão, no período [inicio, fim].
+    As médias das `janelas` vêm prontas em `df_medias` (colunas '<fonte>_<janela>d', de carregar_medias).
+    Cada traço é reduzido ao orçamento de pontos (reduzir_serie): períodos menores mostram mais detalhe.
+    `renderizador` escolhe entre SVG e WebGL para os traços (linha).
+    """
     fig = go.Figure()
     # Definindo um esquema de cores para as fontes
     cores = {
@@ -175,30 +148,27 @@ def plot_serie_diaria(df_diario_original, df_diario_forecasted):
     
     # Adicionar os dados históricos
     for fonte in df_diario_original.columns:
-        media_30d = df_diario_original[fonte].rolling(window=30).mean()
-        media_90d = df_diario_original[fonte].rolling(window=90).mean()
+        diario = reduzir_serie(df_diario_original[fonte], inicio, fim)
         
         # Área preenchida para a geração histórica (principal destaque)
         # Linha principal invisível, apenas para o preenchimento da área
-        fig.add_trace(go.Scatter(x=df_diario_original.index, y=df_diario_original[fonte], mode='lines', 
+        fig.add_trace(linha(x=diario.index, y=diario, renderizador=renderizador, mode='lines', 
                                  name=f'{fonte} (Geração)', legendgroup=fonte, 
                                  line=dict(width=0), # Linha invisível para focar na área
                                  fill='tozeroy', fillcolor=f'rgba({int(cores[fonte][1:3], 16)}, {int(cores[fonte][3:5], 16)}, {int(cores[fonte][5:7], 16)}, 0.15)')) # Cor da área com transparência
         
-        # Linha para a Média Móvel de 30 dias (mais proeminente que a linha principal do exemplo anterior)
-        fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_30d, mode='lines', 
-                                 name=f'{fonte} Média 30d', legendgroup=fonte, 
-                                 line=dict(width=2, color=cores[fonte]), showlegend=True)) 
-        
-        # Linha para a Média Móvel de 90 dias (tracejada)
-        fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_90d, mode='lines', 
-                                 name=f'{fonte} Média 90d', legendgroup=fonte, 
-                                 line=dict(width=2, dash='dash', color=cores[fonte]), showlegend=True)) 
+        # Uma linha por janela de Média Móvel (a menor contínua, as demais tracejadas)
+        for posicao, janela in enumerate(janelas):
+            media = reduzir_serie(df_medias[f'{fonte}_{janela}d'], inicio, fim)
+            fig.add_trace(linha(x=media.index, y=media, renderizador=renderizador, mode='lines', 
+                                     name=f'{fonte} Média {janela}d', legendgroup=fonte, 
+                                     line=dict(width=2, dash=tracado_media(posicao), color=cores[fonte]), showlegend=True)) 
         
     # Adicionar as previsões (linhas pontilhadas, mais grossas)
     for fonte in df_diario_forecasted.columns:
         if fonte in df_diario_original.columns: # Apenas para as colunas que foram previstas
-            fig.add_trace(go.Scatter(x=df_diario_forecasted.index, y=df_diario_forecasted[fonte], mode='lines', 
+            previsao = reduzir_serie(df_diario_forecasted[fonte], inicio, fim)
+            fig.add_trace(linha(x=previsao.index, y=previsao, renderizador=renderizador, mode='lines', 
                                      name=f'{fonte} (Previsão SES)', legendgroup=fonte, 
                                      line=dict(width=3, dash='dot', color=cores[fonte]))) 
 
@@ -350,7 +320,7 @@ def main():
         st.stop()
 
     # Carrega e prepara todos os dados de uma vez
-    df_original, analise_anual, analise_regional, df_diario = load_and_prepare_all_data()
+    resumo_base, analise_anual, analise_regional, df_diario = load_and_prepare_all_data()
 
     # --- Metadados da Base de Dados para Enaltecer o Trabalho (Fora das Abas) ---
     st.header("🔍 Visão Geral da Base de Dados (Nosso Esforço em Números!)")
@@ -364,11 +334,11 @@ def main():
     file_size_mb = file_size_bytes / (1024 * 1024)
 
     # Informações sobre o DataFrame original
-    num_linhas, num_colunas = df_original.shape
-    periodo_inicio = df_original['din_instante'].min().strftime('%d/%m/%Y')
-    periodo_fim = df_original['din_instante'].max().strftime('%d/%m/%Y')
-    num_subsistemas = df_original['nom_subsistema'].nunique()
-    cols_originais = ", ".join(df_original.columns.tolist())
+    num_linhas, num_colunas = resumo_base['linhas'], len(resumo_base['colunas'])
+    periodo_inicio = resumo_base['inicio'].strftime('%d/%m/%Y') if resumo_base['inicio'] is not None else '—'
+    periodo_fim = resumo_base['fim'].strftime('%d/%m/%Y') if resumo_base['fim'] is not None else '—'
+    num_subsistemas = resumo_base['subsistemas']
+    cols_originais = ", ".join(resumo_base['colunas'])
 
     col_meta1, col_meta2 = st.columns(2)
     with col_meta1:
@@ -393,31 +363,15 @@ def main():
     # --- FILTRO: Excluir o ano de 2025 dos dados anuais antes de gerar as previsões ---
     analise_anual = analise_anual[analise_anual['ano'] != 2025]
 
-    # --- Geração das Previsões ---
-    forecast_until_year = 2030
-    current_year = analise_anual['ano'].max() 
-
-    analise_anual_eolica_lr_combined, pred_eolica_lr, coef_eolica, intercept_eolica = predict_linear_regression(
-        analise_anual, 'perc_eolica', current_year, forecast_until_year
-    )
-    analise_anual_solar_lr_combined, pred_solar_lr, coef_solar, intercept_solar = predict_linear_regression(
-        analise_anual, 'perc_solar', current_year, forecast_until_year
-    )
-    analise_anual_renovavel_lr_combined, pred_renovavel_lr, coef_renovavel, intercept_renovavel = predict_linear_regression(
-        analise_anual, 'perc_renovavel_total', current_year, forecast_until_year
-    )
-
-    # Previsões de SES para dados diários (Ex: 2 anos de previsão)
-    forecast_days = 365 * (forecast_until_year - df_diario.index.max().year) 
-    df_diario_ses_combined = predict_ses_for_daily_data(df_diario, forecast_days)
-
-
-    # --- Usando st.tabs para organizar as seções ---
-    tab_overview, tab_growth, tab_regional, tab_timeseries, tab_predictions = st.tabs(
-        ["Visão Geral e ODS 7", "Análise de Crescimento", "Análise Regional", "Análise de Série Temporal", "Previsões e Conceitos"]
-    )
+    # --- Página escolhida e previsões que ela usa (calculadas na primeira vez e memorizadas) ---
+    pagina = st.sidebar.radio("Página", list(PAGINAS))
+    artefatos = obter_artefatos(tuple(versao_dos_dados(CONSOLIDATED_FILE)), analise_anual, df_diario)
+    versao_dados, pasta_figuras = cache_de_figuras(CONSOLIDATED_FILE)  # Figuras prontas desta versão dos dados
+    with st.spinner("Calculando as previsões desta página..."):
+        artefatos.preparar(PAGINAS[pagina])
 
-    with tab_overview:
+    if pagina == "Visão Geral e ODS 7":
+        analise_anual_renovavel_lr_combined, pred_renovavel_lr, coef_renovavel, intercept_renovavel = artefatos['rl_renovavel_total']
         st.header("Composição da Matriz e Participação Renovável")
         st.markdown("Esta seção apresenta a composição da matriz energética do Sistema Interligado Nacional (SIN) e a participação percentual das fontes renováveis, alinhando-se com a meta **ODS 7.2** de manter elevada essa participação.")
         
@@ -452,10 +406,12 @@ def main():
 
             # Novo gráfico Plotly: Pizza de Participação em 2024
             st.subheader("Participação Renováveis vs. Não Renováveis em 2024")
-            fig_pizza = plot_pizza_participacao_2024(analise_anual)
+            fig_pizza = figura_em_cache(plot_pizza_participacao_2024, analise_anual, versao=versao_dados, pasta=pasta_figuras)
             st.plotly_chart(fig_pizza, use_container_width=True)
 
-    with tab_growth:
+    elif pagina == "Análise de Crescimento":
+        analise_anual_eolica_lr_combined, pred_eolica_lr, coef_eolica, intercept_eolica = artefatos['rl_eolica']
+        analise_anual_solar_lr_combined, pred_solar_lr, coef_solar, intercept_solar = artefatos['rl_solar']
         st.header("Taxa de Crescimento Anual da Participação (Eólica e Solar)")
         st.markdown("""
         **Motivação:** Medir a **velocidade** da expansão das fontes Eólica e Solar. Altas taxas de crescimento indicam um forte momento de investimento e adoção tecnológica, cruciais para a diversificação da matriz.
@@ -505,7 +461,7 @@ def main():
         fig_cres_renovavel = plot_crescimento_renovavel_total(analise_anual)
         st.plotly_chart(fig_cres_renovavel, use_container_width=True)
 
-    with tab_regional:
+    elif pagina == "Análise Regional":
         st.header("Análise dos Subsistemas Energéticos")
         st.markdown("Análise da contribuição de geração renovável de cada região em duas perspectivas: **relativa** (interna) e **absoluta** (em relação ao total do Brasil).")
         st.info("🎯 **Alinhamento: ODS 7.1** (Acesso universal) e **ODS 7.b** (Infraestrutura).")
@@ -515,7 +471,8 @@ def main():
         fig_abs.update_layout(barmode='stack', xaxis_title='Ano', yaxis_title='Geração Renovável (MWMED)')
         st.plotly_chart(fig_abs, use_container_width=True)
         
-    with tab_timeseries:
+    elif pagina == "Análise de Série Temporal":
+        df_diario_ses_combined = artefatos['ses_diario']
         st.header("Análise de Tendências Diárias com Médias Móveis e Previsões")
         st.markdown("Esta visualização detalha a geração diária, destacando as tendências e projeções futuras.")
         
@@ -531,10 +488,27 @@ def main():
             
             A **Suavização Exponencial Simples (SES)** é usada para gerar as previsões futuras (linhas pontilhadas). Ela atribui maior peso às observações mais recentes, tornando a previsão mais sensível às mudanças recentes na série.
             """)
-        fig_diario_pred = plot_serie_diaria(df_diario, df_diario_ses_combined) 
+        primeiro_dia, ultimo_dia = df_diario.index.min().date(), df_diario_ses_combined.index.max().date()
+        inicio, fim = st.slider("Período do gráfico:", min_value=primeiro_dia, max_value=ultimo_dia,
+                                value=(primeiro_dia, ultimo_dia), format="DD/MM/YYYY")
+        st.caption(f"Períodos menores trazem mais detalhe: cada linha é desenhada com no máximo {PONTOS_POR_TRACO} pontos.")
+        renderizador = st.radio("Desenho do gráfico:", RENDERIZADORES, horizontal=True,
+                                format_func={'auto': 'Automático', 'svg': 'SVG', 'webgl': 'WebGL'}.get,
+                                help=f"Automático usa WebGL nos traços com mais de {LIMITE_PONTOS_SVG} pontos: arrastar e dar zoom fica mais leve.")
+        col_janelas, col_tipo = st.columns(2)
+        janelas = sorted(col_janelas.multiselect("Médias móveis (dias):", OPCOES_JANELAS_MEDIAS, default=list(JANELAS_MEDIAS)))
+        tipo_media = col_tipo.radio("Tipo de média:", TIPOS_MEDIAS, horizontal=True,
+                                    format_func={'simples': 'Simples', 'centralizada': 'Centralizada', 'exponencial': 'Exponencial'}.get,
+                                    help="Simples: média dos dias até o dia. Centralizada: janela centrada no dia. Exponencial: mais peso aos dias recentes.")
+        df_medias = carregar_medias(janelas, tipo_media, CONSOLIDATED_FILE, nomes=NOMES_ACENTUADOS)
+        fig_diario_pred = plot_serie_diaria(df_diario, df_diario_ses_combined, df_medias, janelas, inicio, fim, renderizador)
         st.plotly_chart(fig_diario_pred, use_container_width=True)
 
-    with tab_predictions:
+    elif pagina == "Previsões e Conceitos":
+        analise_anual_eolica_lr_combined, pred_eolica_lr, coef_eolica, intercept_eolica = artefatos['rl_eolica']
+        analise_anual_solar_lr_combined, pred_solar_lr, coef_solar, intercept_solar = artefatos['rl_solar']
+        analise_anual_renovavel_lr_combined, pred_renovavel_lr, coef_renovavel, intercept_renovavel = artefatos['rl_renovavel_total']
+        df_diario_ses_combined = artefatos['ses_diario']
         st.header("Detalhes das Previsões e Conceitos Estatísticos")
         st.markdown("""
         Aqui você encontra os detalhes sobre os modelos estatísticos utilizados para as previsões e os resultados gerados, alinhados com os **Objetivos de Desenvolvimento Sustentável (ODS) da ONU**, especialmente o ODS 7.
@@ -9,6 +9,9 @@ import numpy as np
 import statsmodels.tsa.api as smt
 import json # BIBLIOTECA: 'Cozinheiro' de dados, prepara infos pra 'viagem'
 from datetime import datetime # BIBLIOTECA: 'Relogio' e 'Calendario' pra registrar o tempo
+from dados_energia import JANELAS_MEDIAS, OPCOES_JANELAS_MEDIAS, TIPOS_MEDIAS, cache_de_figuras, carregar_analises, carregar_medias, versao_dos_dados # MÓDULO: 'Cozinha central' das contas, compartilhada pelos painéis
+from artefatos import Artefatos # MÓDULO: 'Caderno de apostas' que só calcula o que alguém pede
+from graficos import LIMITE_PONTOS_SVG, PONTOS_POR_TRACO, RENDERIZADORES, figura_em_cache, linha, reduzir_serie, tracado_media # MÓDULO: 'Peneira' que manda ao navegador só os pontos que aparecem na tela, e 'vitrine' de gráficos prontos
 
 # --- Constantes e Configuracao ---
 # ENDEREÇO: Onde seu 'documento' principal está guardado.
@@ -17,95 +20,19 @@ CONSOLIDATED_FILE = "balanco_energia_consolidado.parquet"
 st.set_page_config(layout="wide", page_title="Análise Energética do Brasil com Previsões", page_icon="🇧🇷")
 
 # --- Módulo de Preparação de Dados (em cache) ---
-@st.cache_data # MEMÓRIA TURBO: Guarda resultados pra não ter que refazer, tipo um atalho!
 def load_and_prepare_all_data():
     """
-    Carrega o 'Livro Mestre' (base de dados) e organiza TODOS os 'Cadernos de Análise'
-    (dataframes) necessários. Retorna o 'Livro' original e os 'Cadernos' prontos.
+    Pega o resumo do 'Livro Mestre' e os 'Cadernos de Análise' já prontos no módulo compartilhado (dados_energia).
+    As 'contas' são feitas uma vez por versão do arquivo e servem a todos os painéis.
     """
     if not os.path.exists(CONSOLIDATED_FILE):
         st.error(f"ERRO: Seu 'documento' mestre '{CONSOLIDATED_FILE}' sumiu!")
         st.warning("Por favor, verifique se o arquivo 'balanco_energia_consolidado.parquet' está na mesma 'gaveta' (pasta) do seu 'aplicativo' (script).")
         st.stop()
 
-    df = pd.read_parquet(CONSOLIDATED_FILE) # Lendo o 'documento' em formato .parquet, que é super rápido!
-    df['din_instante'] = pd.to_datetime(df['din_instante']) # CONVERSÃO: Data de texto para 'calendário de verdade'
-    df['ano'] = df['din_instante'].dt.year # EXTRAÇÃO: Tirando só o 'Ano de safra' da data
-
-    # CONVERSÃO: Colunas de geração viram números ANTES dos cálculos
-    numeric_cols = ['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce') # TRATAMENTO: Tenta virar número, se não der, vira 'vazio'
-
-    # DADOS SIN: Só o 'Brasilzão' da energia (Sistema Interligado Nacional)
-    df_sin = df[df['nom_subsistema'] == 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    
-    # FONTES RENOVÁVEIS: As 'fazendas de energia' (inclui água, vento, sol)
-    fontes_renovaveis_total = ['val_gerhidraulica', 'val_gereolica', 'val_gersolar']
-    df_sin['geracao_renovavel_total'] = df_sin[fontes_renovaveis_total].sum(axis=1) # SOMA: Produção total da 'fazenda verde'
-
-    # NOVO: 'FAZENDAS DE ENERGIA NOVA': Só vento e sol (exclui água)
-    fontes_novas_renovaveis = ['val_gereolica', 'val_gersolar']
-    df_sin['geracao_novas_renovaveis'] = df_sin[fontes_novas_renovaveis].sum(axis=1) # SOMA: Produção das 'novas fazendas'
-
-    df_sin['geracao_total'] = df_sin['geracao_renovavel_total'] + df_sin['val_gertermica'] # TOTAL: 'Fazenda verde' + 'Termoelétrica'
-
-    # ANÁLISE ANUAL: 'Fechamento de contas' por ano
-    analise_anual = df_sin.groupby('ano').agg(
-        Hidraulica=('val_gerhidraulica', 'sum'), Termica=('val_gertermica', 'sum'),
-        Eolica=('val_gereolica', 'sum'), Solar=('val_gersolar', 'sum'),
-        total_renovavel=('geracao_renovavel_total', 'sum'), # Soma com água
-        total_novas_renovaveis=('geracao_novas_renovaveis', 'sum'), # SÓ novas
-        total_geral=('geracao_total', 'sum')
-    ).reset_index() # ORGANIZAÇÃO: Devolve o ano como coluna
-
-    # TRATAMENTO: Zera valores 'vazios' (NaN)
-    analise_anual['total_hidraulica'] = analise_anual['Hidraulica'].fillna(0)
-    analise_anual['total_termica'] = analise_anual['Termica'].fillna(0)
-    analise_anual['total_eolica'] = analise_anual['Eolica'].fillna(0)
-    analise_anual['total_solar'] = analise_anual['Solar'].fillna(0)
-    
-    # CÁLCULO: Geração total anual de todas as fontes
-    analise_anual['geracao_total_anual'] = analise_anual['total_hidraulica'] + analise_anual['total_termica'] + \
-                                            analise_anual['total_eolica'] + analise_anual['total_solar']
-
-    total_geral_anual_safe = analise_anual['geracao_total_anual'].replace(0, np.nan) # PREVENÇÃO: Evita divisão por zero
-
-    # CÁLCULOS: Porcentagem de participação no 'bolo' total
-    analise_anual['perc_renovavel_total'] = (analise_anual['total_renovavel'] / total_geral_anual_safe) * 100
-    analise_anual['perc_eolica'] = (analise_anual['Eolica'] / total_geral_anual_safe) * 100
-    analise_anual['perc_solar'] = (analise_anual['Solar'] / total_geral_anual_safe) * 100
-    analise_anual['perc_hidraulica'] = (analise_anual['Hidraulica'] / total_geral_anual_safe) * 100
-    analise_anual['perc_termica'] = (analise_anual['Termica'] / total_geral_anual_safe) * 100
-    
-    analise_anual['perc_novas_renovaveis'] = (analise_anual['total_novas_renovaveis'] / total_geral_anual_safe) * 100 # NOVO: % Novas Renovaveis
-
-    for col_perc in ['perc_renovavel_total', 'perc_eolica', 'perc_solar', 'perc_hidraulica', 'perc_termica', 'perc_novas_renovaveis']:
-        analise_anual[col_perc] = analise_anual[col_perc].fillna(0) # TRATAMENTO: Zera % 'vazias'
-
-    # CÁLCULOS: Crescimento percentual ano a ano
-    analise_anual['crescimento_eolica'] = analise_anual['perc_eolica'].pct_change() * 100
-    analise_anual['crescimento_solar'] = analise_anual['perc_solar'].pct_change() * 100
-    analise_anual['crescimento_renovavel_total'] = analise_anual['perc_renovavel_total'].pct_change() * 100
-    analise_anual['crescimento_novas_renovaveis'] = analise_anual['perc_novas_renovaveis'].pct_change() * 100 # NOVO: Crescimento Novas Renovaveis
-
-    # DADOS REGIONAIS: O que acontece fora do 'Brasilzão' (exclui SIN)
-    df_regional = df[df['nom_subsistema'] != 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    df_regional['geracao_renovavel'] = df_regional[fontes_renovaveis_total].sum(axis=1) # Produção 'verde' regional
-    df_regional['geracao_total'] = df_regional['geracao_renovavel'] + df_regional['val_gertermica'] # Total regional
-    
-    # ANÁLISE REGIONAL ANUAL: Fechamento de contas por ano e por região
-    analise_regional_anual = df_regional.groupby(['ano', 'nom_subsistema']).agg(
-        geracao_renovavel_regiao=('geracao_renovavel', 'sum'),
-        geracao_total_regiao=('geracao_total', 'sum')
-    ).reset_index()
-    analise_regional_anual = pd.merge(analise_regional_anual, analise_anual[['ano', 'total_renovavel']], on='ano', suffixes=('', '_brasil')) # JUNÇÃO: Adiciona total do Brasil
-    
-    # DADOS DIÁRIOS: Produção 'dia a dia' do SIN
-    df_diario = df_sin.set_index('din_instante')[['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']].resample('D').sum()
-    df_diario.columns = ['Hidraulica', 'Termica', 'Eolica', 'Solar'] # RENOMEAR: Colunas com nomes 'amigáveis'
-    
-    return df, analise_anual, analise_regional_anual, df_diario
+    analises = carregar_analises(CONSOLIDATED_FILE) # CARREGA: Contas feitas uma vez só, para todos os painéis
+    analise_regional_anual = analises.regional.rename(columns={'total_renovavel_brasil': 'total_renovavel'})
+    return analises.resumo, analises.anual, analise_regional_anual, analises.diario # Diário já com nomes 'amigáveis' sem acento
 
 # --- Funções de Previsão ---
 def predict_linear_regression(df, target_column, current_year, forecast_until_year):
@@ -149,10 +76,44 @@ def predict_ses_for_daily_data(df_diario, forecast_days):
     df_combined = pd.concat([df_diario, df_forecast]) # JUNTAR: Histórico Diário + Previsão
     return df_combined.sort_index() # ORGANIZA: Por data
 
-def plot_serie_diaria(df_diario_original, df_diario_forecasted):
+# --- 'Apostas' Sob Demanda (cada página calcula só o que mostra) ---
+FORECAST_UNTIL_YEAR = 2030 # ANO ALVO: Até onde vão as 'apostas'
+# RL: Nome da 'aposta' -> coluna que a 'régua' vai prever
+PREVISOES_RL = {
+    'rl_eolica': 'perc_eolica', 'rl_solar': 'perc_solar', 'rl_renovavel_total': 'perc_renovavel_total',
+    'rl_novas_renovaveis': 'perc_novas_renovaveis', 'rl_hidraulica': 'perc_hidraulica',
+}
+# PÁGINAS: Cada 'página' diz quais 'apostas' precisa; as que nenhuma página aberta pediu nem são feitas
+PAGINAS = {
+    "Visão Geral e ODS 7": ['rl_renovavel_total', 'rl_novas_renovaveis'],
+    "Análise de Crescimento": ['rl_eolica', 'rl_solar'],
+    "Análise Regional": [],
+    "Análise de Série Temporal": ['ses_diario'],
+    "Previsões e Conceitos": list(PREVISOES_RL) + ['ses_diario'],
+    "Análise 2030: Eólica/Solar vs. Hidráulica": ['rl_eolica', 'rl_solar', 'rl_hidraulica', 'rl_novas_renovaveis'],
+}
+
+@st.cache_resource(max_entries=2) # MEMÓRIA COMPARTILHADA: Um 'caderno de apostas' por versão dos dados, para todas as sessões
+def obter_artefatos(versao, _analise_anual, _df_diario):
+    """
+    Registra as 'apostas' (previsões) sem fazer nenhuma: cada uma só é calculada quando uma página
+    a pede, e fica guardada enquanto os dados (`versao`) não mudarem.
+    """
+    artefatos = Artefatos()
+    ano_atual = _analise_anual['ano'].max() # ÚLTIMO ANO COMPLETO: Ponto de partida das 'apostas'
+    for nome, coluna in PREVISOES_RL.items():
+        artefatos.registrar(nome, lambda coluna=coluna: predict_linear_regression(_analise_anual, coluna, ano_atual, FORECAST_UNTIL_YEAR))
+    dias_previsao = max((pd.to_datetime(f'{FORECAST_UNTIL_YEAR}-12-31') - _df_diario.index.max()).days, 0) # DIAS: Até o fim do ano alvo
+    artefatos.registrar('ses_diario', lambda: predict_ses_for_daily_data(_df_diario, dias_previsao))
+    return artefatos
+
+def plot_serie_diaria(df_diario_original, df_diario_forecasted, df_medias, janelas=JANELAS_MEDIAS, inicio=None, fim=None, renderizador=None):
     """
     Função para criar o 'Boletim do Tempo' da energia: Gráfico de Série Diária com Medias Móveis e Previsão.
-    Dividido em 'andares' para melhor visualização.
+    As médias das `janelas` chegam prontas em `df_medias` (colunas '<fonte>_<janela>d', de carregar_medias).
+    Dividido em 'andares' para melhor visualização. Mostra só o período [inicio, fim], e cada linha vai
+    'peneirada' (reduzir_serie) para no máximo PONTOS_POR_TRACO pontos: quanto menor o período, mais detalhe.
+    O `renderizador` escolhe o 'pincel' das linhas: SVG, WebGL (placa de vídeo) ou automático (linha).
     """
     cores = { # PALETA: Cores para cada fonte
         'Hidraulica': '#4c78a8',
@@ -167,27 +128,24 @@ def plot_serie_diaria(df_diario_original, df_diario_forecasted):
     fontes_grandes = ['Hidraulica', 'Termica'] # FONTES: As 'grandes' da matriz
     for fonte in fontes_grandes:
         if fonte in df_diario_original.columns:
-            media_30d = df_diario_original[fonte].rolling(window=30).mean() # MM 30d: Média dos últimos 30 dias ('tendência do mês')
-            media_90d = df_diario_original[fonte].rolling(window=90).mean() # MM 90d: Média dos últimos 90 dias ('tendência do trimestre')
+            diario = reduzir_serie(df_diario_original[fonte], inicio, fim)
             
-            fig.add_trace(go.Scatter(x=df_diario_original.index, y=df_diario_original[fonte], mode='lines', 
+            fig.add_trace(linha(x=diario.index, y=diario, renderizador=renderizador, mode='lines', 
                                      name=f'{fonte} (Geração Histórica)', legendgroup=fonte, 
                                      line=dict(width=0), 
                                      fill='tozeroy', fillcolor=f'rgba({int(cores[fonte][1:3], 16)}, {int(cores[fonte][3:5], 16)}, {int(cores[fonte][5:7], 16)}, 0.1)'),
                             row=1, col=1) # ADICIONA: Geração histórica (preenchida)
             
-            fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_30d, mode='lines', 
-                                     name=f'{fonte} Média 30d', legendgroup=fonte, 
-                                     line=dict(width=2, color=cores[fonte]), showlegend=True), 
-                            row=1, col=1) # ADICIONA: Média Móvel 30 dias
-            
-            fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_90d, mode='lines', 
-                                     name=f'{fonte} Média 90d', legendgroup=fonte, 
-                                     line=dict(width=2, dash='dash', color=cores[fonte]), showlegend=True), 
-                            row=1, col=1) # ADICIONA: Média Móvel 90 dias
+            for posicao, janela in enumerate(janelas): # MM: Uma linha por janela escolhida (30d = 'tendência do mês', 90d = 'do trimestre')
+                media = reduzir_serie(df_medias[f'{fonte}_{janela}d'], inicio, fim) # PRONTA: Média já calculada, só 'peneirada'
+                fig.add_trace(linha(x=media.index, y=media, renderizador=renderizador, mode='lines', 
+                                         name=f'{fonte} Média {janela}d', legendgroup=fonte, 
+                                         line=dict(width=2, dash=tracado_media(posicao), color=cores[fonte]), showlegend=True), 
+                                row=1, col=1) # ADICIONA: Média Móvel da janela
             
             if fonte in df_diario_forecasted.columns and not df_diario_forecasted[fonte].isnull().all():
-                fig.add_trace(go.Scatter(x=df_diario_forecasted.index, y=df_diario_forecasted[fonte], mode='lines', 
+                previsao = reduzir_serie(df_diario_forecasted[fonte], inicio, fim)
+                fig.add_trace(linha(x=previsao.index, y=previsao, renderizador=renderizador, mode='lines', 
                                          name=f'{fonte} (Previsão SES)', legendgroup=fonte, 
                                          line=dict(width=3, dash='dot', color=cores[fonte]), showlegend=True),
                                  row=1, col=1) # ADICIONA: Previsão SES
@@ -195,27 +153,24 @@ def plot_serie_diaria(df_diario_original, df_diario_forecasted):
     fontes_menores = ['Eolica', 'Solar'] # FONTES: As 'emergentes' da matriz
     for fonte in fontes_menores:
         if fonte in df_diario_original.columns:
-            media_30d = df_diario_original[fonte].rolling(window=30).mean()
-            media_90d = df_diario_original[fonte].rolling(window=90).mean()
+            diario = reduzir_serie(df_diario_original[fonte], inicio, fim)
             
-            fig.add_trace(go.Scatter(x=df_diario_original.index, y=df_diario_original[fonte], mode='lines', 
+            fig.add_trace(linha(x=diario.index, y=diario, renderizador=renderizador, mode='lines', 
                                      name=f'{fonte} (Geração Histórica)', legendgroup=fonte, 
                                      line=dict(width=0), 
                                      fill='tozeroy', fillcolor=f'rgba({int(cores[fonte][1:3], 16)}, {int(cores[fonte][3:5], 16)}, {int(cores[fonte][5:7], 16)}, 0.1)'),
                             row=2, col=1)
             
-            fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_30d, mode='lines', 
-                                     name=f'{fonte} Média 30d', legendgroup=fonte, 
-                                     line=dict(width=2, color=cores[fonte]), showlegend=True), 
-                            row=2, col=1)
-            
-            fig.add_trace(go.Scatter(x=df_diario_original.index, y=media_90d, mode='lines', 
-                                     name=f'{fonte} Média 90d', legendgroup=fonte, 
-                                     line=dict(width=2, dash='dash', color=cores[fonte]), showlegend=True), 
-                            row=2, col=1)
+            for posicao, janela in enumerate(janelas):
+                media = reduzir_serie(df_medias[f'{fonte}_{janela}d'], inicio, fim)
+                fig.add_trace(linha(x=media.index, y=media, renderizador=renderizador, mode='lines', 
+                                         name=f'{fonte} Média {janela}d', legendgroup=fonte, 
+                                         line=dict(width=2, dash=tracado_media(posicao), color=cores[fonte]), showlegend=True), 
+                                row=2, col=1)
             
             if fonte in df_diario_forecasted.columns and not df_diario_forecasted[fonte].isnull().all():
-                fig.add_trace(go.Scatter(x=df_diario_forecasted.index, y=df_diario_forecasted[fonte], mode='lines', 
+                previsao = reduzir_serie(df_diario_forecasted[fonte], inicio, fim)
+                fig.add_trace(linha(x=previsao.index, y=previsao, renderizador=renderizador, mode='lines', 
                                          name=f'{fonte} (Previsão SES)', legendgroup=fonte, 
                                          line=dict(width=3, dash='dot', color=cores[fonte]), showlegend=True),
                                  row=2, col=1)
@@ -351,7 +306,7 @@ def main():
     # Removida a linha: st.markdown("Um 'aplicativo' feito com Gemini para entender a fundo a produção de energia no Brasil, com foco no futuro e alinhamento com os ODS da ONU (Objetivos de Desenvolvimento Sustentável).")
     st.markdown("Um 'aplicativo' para entender a fundo a produção de energia no Brasil, com foco no futuro e alinhamento com os **ODS da ONU** (Objetivos de Desenvolvimento Sustentável).")
 
-    df_original, analise_anual, analise_regional_anual, df_diario = load_and_prepare_all_data() # CARREGA: Todas as 'contas' prontas
+    resumo_base, analise_anual, analise_regional_anual, df_diario = load_and_prepare_all_data() # CARREGA: Todas as 'contas' prontas
 
     st.header("🔍 Olhar Geral da Base de Dados (Nosso 'Caminhão de Dados'!)")
     st.markdown("""
@@ -365,11 +320,11 @@ def main():
     else:
         file_size_mb = 0
 
-    num_linhas, num_colunas = df_original.shape # QUANTIDADE: Linhas e colunas do 'caminhão'
-    periodo_inicio = df_original['din_instante'].min().strftime('%d/%m/%Y') # INÍCIO: 'Data de fundação' dos dados
-    periodo_fim = df_original['din_instante'].max().strftime('%d/%m/%Y') # FIM: 'Última atualização' dos dados
-    num_subsistemas = df_original['nom_subsistema'].nunique() # QUANTIDADE: Quantas 'regiões energéticas'
-    cols_originais = ", ".join(df_original.columns.tolist()) # NOMES: Quais eram as 'etiquetas' originais das colunas
+    num_linhas, num_colunas = resumo_base['linhas'], len(resumo_base['colunas']) # QUANTIDADE: Linhas e colunas do 'caminhão'
+    periodo_inicio = resumo_base['inicio'].strftime('%d/%m/%Y') if resumo_base['inicio'] is not None else '—' # INÍCIO: 'Data de fundação' dos dados
+    periodo_fim = resumo_base['fim'].strftime('%d/%m/%Y') if resumo_base['fim'] is not None else '—' # FIM: 'Última atualização' dos dados
+    num_subsistemas = resumo_base['subsistemas'] # QUANTIDADE: Quantas 'regiões energéticas'
+    cols_originais = ", ".join(resumo_base['colunas']) # NOMES: Quais eram as 'etiquetas' originais das colunas
 
     col_meta1, col_meta2 = st.columns(2) # COLUNAS: Dividindo a tela
     with col_meta1:
@@ -400,81 +355,18 @@ def main():
         analise_anual_para_exibicao = analise_anual.copy() # Usa todos os anos
 
     current_year_for_prediction = analise_anual_para_exibicao['ano'].max() # Último ano completo para previsão
-    forecast_until_year = 2030 # Ano alvo da previsão
-
-    # Chamada das funções de previsão com Regressão Linear (RL)
-    analise_anual_eolica_lr_combined, pred_eolica_lr, coef_eolica, intercept_eolica = predict_linear_regression(
-        analise_anual_para_exibicao, 'perc_eolica', current_year_for_prediction, forecast_until_year
-    )
-    analise_anual_solar_lr_combined, pred_solar_lr, coef_solar, intercept_solar = predict_linear_regression(
-        analise_anual_para_exibicao, 'perc_solar', current_year_for_prediction, forecast_until_year
-    )
-    analise_anual_renovavel_lr_combined, pred_renovavel_lr, coef_renovavel, intercept_renovavel = predict_linear_regression(
-        analise_anual_para_exibicao, 'perc_renovavel_total', current_year_for_prediction, forecast_until_year
-    )
-    analise_anual_novas_renovaveis_lr_combined, pred_novas_renovaveis_lr, coef_novas_renovaveis, intercept_novas_renovaveis = predict_linear_regression(
-        analise_anual_para_exibicao, 'perc_novas_renovaveis', current_year_for_prediction, forecast_until_year
-    )
-    
-    analise_anual_hidraulica_lr_combined, pred_hidraulica_lr, coef_hidraulica, intercept_hidraulica = predict_linear_regression(
-        analise_anual_para_exibicao, 'perc_hidraulica', current_year_for_prediction, forecast_until_year
-    )
-
-    # Previsão diária com SES
-    last_daily_date = df_diario.index.max()
-    target_end_date = pd.to_datetime(f'{forecast_until_year}-12-31')
-    forecast_days = (target_end_date - last_daily_date).days
-    if forecast_days < 0:
-        forecast_days = 0 
-    
-    df_diario_ses_combined = predict_ses_for_daily_data(df_diario, forecast_days)
-
-    # Preparar df_comparison
-    if forecast_until_year in analise_anual_eolica_lr_combined['ano'].values:
-        data_2030_eolica = analise_anual_eolica_lr_combined[analise_anual_eolica_lr_combined['ano'] == forecast_until_year]['perc_eolica'].iloc[0]
-        data_2030_solar = analise_anual_solar_lr_combined[analise_anual_solar_lr_combined['ano'] == forecast_until_year]['perc_solar'].iloc[0]
-        data_2030_hidraulica = analise_anual_hidraulica_lr_combined[analise_anual_hidraulica_lr_combined['ano'] == forecast_until_year]['perc_hidraulica'].iloc[0]
-        data_2030_novas_renovaveis = analise_anual_novas_renovaveis_lr_combined[analise_anual_novas_renovaveis_lr_combined['ano'] == forecast_until_year]['perc_novas_renovaveis'].iloc[0]
-    else:
-        data_2030_eolica, data_2030_solar, data_2030_hidraulica, data_2030_novas_renovaveis = 0.0, 0.0, 0.0, 0.0
-    data_2030_eolica_solar_combinada = data_2030_eolica + data_2030_solar
-
-    base_year_for_comparison_data = current_year_for_prediction
-    if base_year_for_comparison_data in analise_anual_para_exibicao['ano'].values:
-        data_base_eolica = analise_anual_para_exibicao[analise_anual_para_exibicao['ano'] == base_year_for_comparison_data]['perc_eolica'].iloc[0]
-        data_base_solar = analise_anual_para_exibicao[analise_anual_para_exibicao['ano'] == base_year_for_comparison_data]['perc_solar'].iloc[0]
-        data_base_hidraulica = analise_anual_para_exibicao[analise_anual_para_exibicao['ano'] == base_year_for_comparison_data]['perc_hidraulica'].iloc[0]
-        data_base_eolica_solar_combinada = data_base_eolica + data_base_solar
-        data_base_novas_renovaveis = analise_anual_para_exibicao[analise_anual_para_exibicao['ano'] == base_year_for_comparison_data]['perc_novas_renovaveis'].iloc[0]
-    else:
-        data_base_eolica, data_base_solar, data_base_hidraulica, data_base_novas_renovaveis = 0.0, 0.0, 0.0, 0.0
-        data_base_eolica_solar_combinada = 0.0
-
-    df_comparison_data = {
-        'Fonte': ['Eólica', 'Solar', 'Eólica + Solar', 'Novas Renováveis (Eólica + Solar)', 'Hidráulica'],
-        f'Participação em {base_year_for_comparison_data} (%)': [
-            float(data_base_eolica), float(data_base_solar), float(data_base_eolica_solar_combinada), float(data_base_novas_renovaveis), float(data_base_hidraulica)
-        ],
-        f'Participação Projetada em {forecast_until_year} (%)': [
-            float(data_2030_eolica), float(data_2030_solar), float(data_2030_eolica_solar_combinada), float(data_2030_novas_renovaveis), float(data_2030_hidraulica)
-        ],
-        'Diferença (p.p.)': [
-            float(data_2030_eolica - data_base_eolica),
-            float(data_2030_solar - data_base_solar),
-            float(data_2030_eolica_solar_combinada - data_base_eolica_solar_combinada),
-            float(data_2030_novas_renovaveis - data_base_novas_renovaveis),
-            float(data_2030_hidraulica - data_base_hidraulica)
-        ]
-    }
-    df_comparison = pd.DataFrame(df_comparison_data)
-
-
-    # Removida a aba 'Relatório Completo (JSON)' da lista de abas
-    tab_overview, tab_growth, tab_regional, tab_timeseries, tab_predictions, tab_2030_analysis = st.tabs(
-        ["Visão Geral e ODS 7", "Análise de Crescimento", "Análise Regional", "Análise de Série Temporal", "Previsões e Conceitos", "Análise 2030: Eólica/Solar vs. Hidráulica"]
-    )
-
-    with tab_overview:
+    forecast_until_year = FORECAST_UNTIL_YEAR # Ano alvo da previsão
+
+    # PÁGINA: Só a página escolhida é montada, e só as 'apostas' dela são calculadas (uma vez por versão dos dados)
+    pagina = st.sidebar.radio("Escolha a página:", list(PAGINAS))
+    artefatos = obter_artefatos(tuple(versao_dos_dados(CONSOLIDATED_FILE)), analise_anual_para_exibicao, df_diario)
+    versao_dados, pasta_figuras = cache_de_figuras(CONSOLIDATED_FILE) # VITRINE: Gráficos já montados para esta versão dos dados
+    with st.spinner("Calculando as 'apostas' desta página..."):
+        artefatos.preparar(PAGINAS[pagina])
+
+    if pagina == "Visão Geral e ODS 7":
+        analise_anual_renovavel_lr_combined, pred_renovavel_lr, coef_renovavel, intercept_renovavel = artefatos['rl_renovavel_total']
+        analise_anual_novas_renovaveis_lr_combined, pred_novas_renovaveis_lr, coef_novas_renovaveis, intercept_novas_renovaveis = artefatos['rl_novas_renovaveis']
         st.header("Composição da Matriz e Participação Renovável")
         st.markdown("""
         Esta seção mostra a 'receita de bolo' da energia do **Sistema Interligado Nacional (SIN)** e a 'fatia' das fontes renováveis. Isso é importante pra ver se estamos seguindo o **ODS 7.2** da ONU, que fala em ter mais energia 'verde'.
@@ -534,10 +426,12 @@ def main():
 
 
             st.subheader("O Bolo Energético de 2024: Participação das Renováveis vs. Não Renováveis")
-            fig_pizza = plot_pizza_participacao_2024(analise_anual_para_exibicao)
+            fig_pizza = figura_em_cache(plot_pizza_participacao_2024, analise_anual_para_exibicao, versao=versao_dados, pasta=pasta_figuras) # VITRINE: Monta só na primeira visita
             st.plotly_chart(fig_pizza, use_container_width=True)
 
-    with tab_growth:
+    elif pagina == "Análise de Crescimento":
+        analise_anual_eolica_lr_combined, pred_eolica_lr, coef_eolica, intercept_eolica = artefatos['rl_eolica']
+        analise_anual_solar_lr_combined, pred_solar_lr, coef_solar, intercept_solar = artefatos['rl_solar']
         st.header("Termômetros de Crescimento: Velocidade da Expansão Eólica e Solar")
         st.markdown("""
         **Por que olhar isso?** Pra medir a **velocidade** que as 'fazendas' de Vento e Sol estão crescendo! Taxas altas indicam que tem muito 'dinheiro novo' sendo investido e muita gente usando essa tecnologia. Isso é 'ouro' pra mudar a nossa matriz energética.
@@ -603,7 +497,7 @@ def main():
         st.plotly_chart(fig_cres_novas_renovaveis, use_container_width=True)
 
 
-    with tab_regional:
+    elif pagina == "Análise Regional":
         st.header("Raio-X das Regiões: Análise dos Subsistemas Energéticos")
         st.markdown("Aqui a gente vê a 'ajuda' que cada região dá na produção de energia 'verde'. Tem duas formas de ver: **a 'ajuda de casa'** (só da região) e **a 'ajuda pro Brasil'** (comparado com o total do país).")
         st.info("🎯 **Alinhamento: ODS 7.1** (Ter energia pra todo mundo) e **ODS 7.b** (Ter a 'fiação' e as 'usinas' modernas).")
@@ -614,7 +508,8 @@ def main():
                               yaxis_title='Geração Renovável (MWmed) <br><sub>(Produção em Gigawatts Médios, tipo a "força" das usinas)</sub>')
         st.plotly_chart(fig_abs, use_container_width=True)
         
-    with tab_timeseries:
+    elif pagina == "Análise de Série Temporal":
+        df_diario_ses_combined = artefatos['ses_diario']
         st.header("Boletim do Tempo da Energia: Tendências Diárias e Previsões")
         st.markdown("""Essa 'previsão do tempo' detalha a produção de energia por dia, mostrando as 'ondas' e 'apostas' pro futuro. Você verá para cada fonte de energia (Água, Térmica, Vento e Sol):
         * A linha preenchida: a **produção real** de energia a cada dia.
@@ -635,10 +530,29 @@ def main():
             
             A **Suavização Exponencial Simples (SES)** é usada pras 'apostas' futuras (linhas pontilhadas). Ela dá mais 'peso' para o que aconteceu **recentemente**, fazendo a previsão 'reagir mais rápido' a novas 'mudanças de vento'.
             """)
-        fig_diario_pred = plot_serie_diaria(df_diario, df_diario_ses_combined) 
+        primeiro_dia, ultimo_dia = df_diario.index.min().date(), df_diario_ses_combined.index.max().date() # RÉGUA: Do primeiro dia à última 'aposta'
+        inicio, fim = st.slider("Período do gráfico:", min_value=primeiro_dia, max_value=ultimo_dia,
+                                value=(primeiro_dia, ultimo_dia), format="DD/MM/YYYY") # LUPA: Período que vai pro gráfico
+        st.caption(f"Quanto menor o período, mais detalhe: cada linha é desenhada com no máximo {PONTOS_POR_TRACO} pontos.")
+        renderizador = st.radio("Desenho do gráfico:", RENDERIZADORES, horizontal=True,
+                                format_func={'auto': 'Automático', 'svg': 'SVG', 'webgl': 'WebGL'}.get,
+                                help=f"Automático usa WebGL nos traços com mais de {LIMITE_PONTOS_SVG} pontos: arrastar e dar zoom fica mais leve.") # PINCEL: SVG ou WebGL (placa de vídeo)
+        col_janelas, col_tipo = st.columns(2)
+        janelas = sorted(col_janelas.multiselect("Médias móveis (dias):", OPCOES_JANELAS_MEDIAS, default=list(JANELAS_MEDIAS))) # RÉGUAS: Quais 'ondas' desenhar
+        tipo_media = col_tipo.radio("Tipo de média:", TIPOS_MEDIAS, horizontal=True,
+                                    format_func={'simples': 'Simples', 'centralizada': 'Centralizada', 'exponencial': 'Exponencial'}.get,
+                                    help="Simples: média dos dias até o dia. Centralizada: janela centrada no dia. Exponencial: mais peso aos dias recentes.")
+        df_medias = carregar_medias(janelas, tipo_media, CONSOLIDATED_FILE) # PRONTAS: Médias feitas uma vez por versão dos dados e janela
+        fig_diario_pred = plot_serie_diaria(df_diario, df_diario_ses_combined, df_medias, janelas, inicio, fim, renderizador)
         st.plotly_chart(fig_diario_pred, use_container_width=True)
 
-    with tab_predictions:
+    elif pagina == "Previsões e Conceitos":
+        analise_anual_eolica_lr_combined, pred_eolica_lr, coef_eolica, intercept_eolica = artefatos['rl_eolica']
+        analise_anual_solar_lr_combined, pred_solar_lr, coef_solar, intercept_solar = artefatos['rl_solar']
+        analise_anual_renovavel_lr_combined, pred_renovavel_lr, coef_renovavel, intercept_renovavel = artefatos['rl_renovavel_total']
+        analise_anual_novas_renovaveis_lr_combined, pred_novas_renovaveis_lr, coef_novas_renovaveis, intercept_novas_renovaveis = artefatos['rl_novas_renovaveis']
+        analise_anual_hidraulica_lr_combined, pred_hidraulica_lr, coef_hidraulica, intercept_hidraulica = artefatos['rl_hidraulica']
+        df_diario_ses_combined = artefatos['ses_diario']
         st.header("Detalhes das 'Apostas' e Conceitos 'Difíceis' (que a gente explica!)")
         st.markdown("""
         Aqui você encontra os detalhes sobre os 'modelos de adivinhação' (estatísticos) que usamos e os resultados. Tudo isso alinhado com os **ODS da ONU** (Objetivos de Desenvolvimento Sustentável), especialmente o **ODS 7** ('Energia Limpa e Acessível').
@@ -714,7 +628,11 @@ def main():
         Ao 'apostar' no crescimento do Vento e do Sol, e na porcentagem total de energias 'verdes', a gente consegue ver se estamos 'na rota certa' pra ter um aumento "muito grande" até 2030. As 'apostas' diárias, por sua vez, ajudam a 'arrumar a casa' e otimizar a 'fiação' pra integrar cada vez mais essas fontes.
         """)
 
-    with tab_2030_analysis:
+    elif pagina == "Análise 2030: Eólica/Solar vs. Hidráulica":
+        analise_anual_eolica_lr_combined, pred_eolica_lr, coef_eolica, intercept_eolica = artefatos['rl_eolica']
+        analise_anual_solar_lr_combined, pred_solar_lr, coef_solar, intercept_solar = artefatos['rl_solar']
+        analise_anual_hidraulica_lr_combined, pred_hidraulica_lr, coef_hidraulica, intercept_hidraulica = artefatos['rl_hidraulica']
+        analise_anual_novas_renovaveis_lr_combined, pred_novas_renovaveis_lr, coef_novas_renovaveis, intercept_novas_renovaveis = artefatos['rl_novas_renovaveis']
         st.header(f"Aposta para {forecast_until_year}: Fatia do Vento/Sol vs. Fatia da Água")
         st.markdown(f"""
         Pra entender a pergunta principal sobre a 'ajuda' futura do Vento e do Sol na energia e como isso pode 'trocar de lugar' com a energia da Água, vamos focar nas 'apostas' para o ano de **{forecast_until_year}**.
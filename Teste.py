@@ -14,22 +14,21 @@ aplicação Streamlit interativa.
 # 1. IMPORTS E CONFIGURAÇÕES GERAIS
 # ==============================================================================
 import streamlit as st
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 import os
-import io
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
+from Coletar_dados import executar_etl
+from dados_energia import (JANELAS_MEDIAS, NOMES_ACENTUADOS, OPCOES_JANELAS_MEDIAS, TIPOS_MEDIAS, cache_de_figuras,
+                           carregar_analises, carregar_medias)
+from graficos import LIMITE_PONTOS_SVG, PONTOS_POR_TRACO, RENDERIZADORES, figura_em_cache, linha, reduzir_serie, tracado_media
 
 # --- Constantes e Configuração da Página ---
 ONS_URL = "https://dados.ons.org.br/dataset/balanco-energia-subsistema"
 RAW_DATA_DIR = "dados_ons_parquet_notebook" # Nova pasta para não conflitar
 CONSOLIDATED_FILE = "balanco_energia_consolidado_notebook.parquet"
-REQUEST_HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
+CLEAN_DATA_DIR = "dados_ons_limpos_notebook"
+CONSOLIDATED_DATASET_DIR = "balanco_energia_particionado_notebook"
 st.set_page_config(layout="wide", page_title="Meu Painel de Energia", page_icon="💡")
 
 # ==============================================================================
@@ -40,79 +39,44 @@ def run_full_etl_from_notebook_logic():
     Executa o pipeline de ETL completo, baseado na lógica do notebook original.
     Retorna True em sucesso, False em falha.
     """
-    try:
-        with st.status("Iniciando ETL...", expanded=True) as status:
-            # Raspagem e Download
-            status.update(label="Etapa 1: Baixando dados da ONS...")
-            response = requests.get(ONS_URL, headers=REQUEST_HEADERS, timeout=15)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            links_parquet = [link.get('href') for link in soup.select("ul.resource-list a.resource-url-analytics") if link.get('href', '').endswith('.parquet')]
-            if not links_parquet:
-                status.update(label="Nenhum link .parquet encontrado.", state="error")
-                return False
-
-            os.makedirs(RAW_DATA_DIR, exist_ok=True)
-            lista_dfs = [pd.read_parquet(io.BytesIO(requests.get(link, headers=REQUEST_HEADERS, timeout=90).content)) for link in links_parquet]
-            
-            # Consolidação e Limpeza
-            status.update(label="Etapa 2: Consolidando e limpando dados...")
-            df = pd.concat(lista_dfs, ignore_index=True)
-            df['din_instante'] = pd.to_datetime(df['din_instante'], errors='coerce')
-            
-            colunas_valores = ['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar', 'val_carga', 'val_intercambio']
-            for col in colunas_valores:
-                df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.', regex=False), errors='coerce')
-            df[colunas_valores] = df[colunas_valores].fillna(0)
-            df.dropna(subset=['din_instante'], inplace=True)
-
-            status.update(label="Etapa 3: Salvando arquivo consolidado...")
-            df.to_parquet(CONSOLIDATED_FILE)
-            status.update(label="Processo ETL concluído!", state="complete")
-        return True
-    except Exception as e:
-        st.error("Falha crítica durante o processo de ETL.")
-        st.exception(e)
-        if 'status' in locals(): status.update(label="Processo falhou.", state="error")
-        return False
+    # Mesmo pipeline do `python Coletar_dados.py` (fetch, clean, consolidate), com as pastas deste painel
+    descricoes = {
+        'fetch': "Baixando dados da ONS (só o que mudou desde a última execução)...",
+        'clean': "Limpando os arquivos anuais novos ou alterados...",
+        'consolidate': "Salvando arquivo consolidado...",
+    }
+    with st.status("Iniciando ETL...", expanded=True) as status:
+        relatorio = executar_etl(
+            ons_url=ONS_URL, pasta=RAW_DATA_DIR, pasta_limpos=CLEAN_DATA_DIR, arquivo_saida=CONSOLIDATED_FILE,
+            pasta_particionada=CONSOLIDATED_DATASET_DIR,
+            progresso=lambda etapa, i, total: status.update(label=f"Etapa {i}: {descricoes[etapa]}"),
+        )
+        if not relatorio['sucesso']:
+            st.error("Falha crítica durante o processo de ETL.")
+            st.error(relatorio['erro'])
+            status.update(label="Processo falhou.", state="error")
+            return False
+        st.json(relatorio, expanded=False)
+        status.update(label="Processo ETL concluído!", state="complete")
+    return True
 
 # ==============================================================================
 # 3. MÓDULO DE PREPARAÇÃO DE DADOS E VISUALIZAÇÃO (Baseado nas Células de Análise)
 # ==============================================================================
 
-@st.cache_data
 def load_and_prepare_data():
-    """Lê o arquivo local e prepara todos os DataFrames para as análises."""
-    df_consolidado = pd.read_parquet(CONSOLIDATED_FILE)
-    df_consolidado['ano'] = pd.to_datetime(df_consolidado['din_instante']).dt.year
-
-    # --- DataFrames para o SIN ---
-    df_sin = df_consolidado[df_consolidado['nom_subsistema'] == 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    df_sin['geracao_renovavel'] = df_sin['val_gerhidraulica'] + df_sin['val_gereolica'] + df_sin['val_gersolar']
-    df_sin['geracao_total'] = df_sin['geracao_renovavel'] + df_sin['val_gertermica']
-    
-    # --- DataFrame para Análise Anual Agregada ---
-    analise_anual = df_sin.groupby('ano').agg(
-        Hidraulica=('val_gerhidraulica', 'sum'), Termica=('val_gertermica', 'sum'),
-        Eolica=('val_gereolica', 'sum'), Solar=('val_gersolar', 'sum'),
-        geracao_renovavel=('geracao_renovavel', 'sum'), geracao_total=('geracao_total', 'sum')
-    )
-    analise_anual['percentual_renovavel'] = (analise_anual['geracao_renovavel'] / analise_anual['geracao_total']) * 100
-    analise_anual['crescimento_anual_%'] = analise_anual['geracao_total'].pct_change() * 100
-
-    # --- DataFrame para Análise Regional ---
-    df_regional = df_consolidado[df_consolidado['nom_subsistema'] != 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    df_regional['geracao_renovavel'] = df_regional['val_gerhidraulica'] + df_regional['val_gereolica'] + df_regional['val_gersolar']
-    df_regional['geracao_total'] = df_regional['geracao_renovavel'] + df_regional['val_gertermica']
-    analise_regional_anual = df_regional.groupby(['ano', 'nom_subsistema']).agg(
-        geracao_renovavel=('geracao_renovavel', 'sum'), geracao_total=('geracao_total', 'sum')
-    ).reset_index()
-    analise_regional_anual['percentual_renovavel'] = (analise_regional_anual['geracao_renovavel'] / analise_regional_anual['geracao_total']) * 100
-
-    # --- DataFrame para Série Diária ---
-    df_diario = df_sin.set_index('din_instante')[['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']].resample('D').sum()
-    df_diario.columns = ['Hidráulica', 'Térmica', 'Eólica', 'Solar']
-    
+    """
+    Devolve as análises do módulo compartilhado (dados_energia) com os nomes de colunas do notebook.
+    O cálculo é refeito só quando o ETL grava uma nova versão do arquivo.
+    """
+    analises = carregar_analises(CONSOLIDATED_FILE)
+    analise_anual = analises.anual.set_index('ano').rename(columns={
+        'total_renovavel': 'geracao_renovavel', 'total_geral': 'geracao_total',
+        'perc_renovavel_total': 'percentual_renovavel', 'crescimento_total': 'crescimento_anual_%'})
+    analise_regional_anual = analises.regional.rename(columns={
+        'geracao_renovavel_regiao': 'geracao_renovavel', 'geracao_total_regiao': 'geracao_total',
+        'perc_renovavel_interno': 'percentual_renovavel'})
+    df_diario = analises.diario.rename(columns=NOMES_ACENTUADOS)
     return analise_anual, analise_regional_anual, df_diario
 
 def plotar_dashboard_geracao_total(analise_anual):
@@ -131,16 +95,16 @@ def plotar_dashboard_renovaveis(analise_anual):
     fig.update_layout(title_text='<b>Dashboard: Percentual de Energia Renovável na Matriz Energética</b>', showlegend=False, height=500)
     return fig
 
-def plotar_serie_diaria_com_medias(df_diario):
-    """Cria a Análise 3 do notebook, com médias móveis."""
+def plotar_serie_diaria_com_medias(df_diario, df_medias, janelas=JANELAS_MEDIAS, inicio=None, fim=None, renderizador=None):
+    """Cria a Análise 3 do notebook, com as médias móveis prontas de `df_medias` nas `janelas`, no período [inicio, fim], com cada traço reduzido (reduzir_serie) e desenhado em SVG ou WebGL (linha)."""
     fig = go.Figure()
     cores = {'Hidráulica': 'blue', 'Térmica': 'red', 'Eólica': 'green', 'Solar': 'orange'}
     for fonte in df_diario.columns:
-        media_30d = df_diario[fonte].rolling(window=30).mean()
-        media_90d = df_diario[fonte].rolling(window=90).mean()
-        fig.add_trace(go.Scatter(x=df_diario.index, y=df_diario[fonte], mode='lines', name=fonte, legendgroup=fonte, line=dict(width=1), opacity=0.3, marker_color=cores[fonte]))
-        fig.add_trace(go.Scatter(x=df_diario.index, y=media_30d, mode='lines', name=f'{fonte} Média 30d', legendgroup=fonte, line=dict(width=2), marker_color=cores[fonte]))
-        fig.add_trace(go.Scatter(x=df_diario.index, y=media_90d, mode='lines', name=f'{fonte} Média 90d', legendgroup=fonte, line=dict(width=2, dash='dash'), marker_color=cores[fonte]))
+        diario = reduzir_serie(df_diario[fonte], inicio, fim)
+        fig.add_trace(linha(x=diario.index, y=diario, renderizador=renderizador, mode='lines', name=fonte, legendgroup=fonte, line=dict(width=1), opacity=0.3, marker_color=cores[fonte]))
+        for posicao, janela in enumerate(janelas):
+            media = reduzir_serie(df_medias[f'{fonte}_{janela}d'], inicio, fim)
+            fig.add_trace(linha(x=media.index, y=media, renderizador=renderizador, mode='lines', name=f'{fonte} Média {janela}d', legendgroup=fonte, line=dict(width=2, dash=tracado_media(posicao)), marker_color=cores[fonte]))
     fig.update_layout(height=700, title_text='<b>Análise Detalhada: Geração Diária com Tendências de Médias Móveis</b>', legend_title='<b>Fonte e Tendência</b>', xaxis_rangeslider_visible=True)
     return fig
 
@@ -155,7 +119,6 @@ def main():
     if st.sidebar.button("Executar ETL (Baixar e Processar Dados)"):
         if run_full_etl_from_notebook_logic():
             st.sidebar.success("Dados processados com sucesso!")
-            st.cache_data.clear() # Limpa o cache para forçar a releitura
             st.rerun() # Recarrega a página para o painel aparecer
         else:
             st.sidebar.error("O processo de ETL falhou.")
@@ -168,6 +131,7 @@ def main():
     
     # --- Carrega os dados e exibe o painel ---
     analise_anual, analise_regional_anual, df_diario = load_and_prepare_data()
+    versao_dados, pasta_figuras = cache_de_figuras(CONSOLIDATED_FILE)  # Figuras prontas desta versão dos dados
     
     st.sidebar.header("Minhas Análises")
     analise_selecionada = st.sidebar.radio(
@@ -177,8 +141,8 @@ def main():
     
     if analise_selecionada == "Visão Geral (Dashboards 1 e 2)":
         st.header("Dashboards Gerais")
-        st.plotly_chart(plotar_dashboard_geracao_total(analise_anual), use_container_width=True)
-        st.plotly_chart(plotar_dashboard_renovaveis(analise_anual), use_container_width=True)
+        st.plotly_chart(figura_em_cache(plotar_dashboard_geracao_total, analise_anual, versao=versao_dados, pasta=pasta_figuras), use_container_width=True)
+        st.plotly_chart(figura_em_cache(plotar_dashboard_renovaveis, analise_anual, versao=versao_dados, pasta=pasta_figuras), use_container_width=True)
         
     elif analise_selecionada == "Análise de Tendências Diárias":
         st.header("Análise de Sazonalidade e Tendência")
@@ -190,7 +154,20 @@ def main():
             - **Crescimento Eólico (Verde) e Solar (Laranja):** As médias móveis mostram claramente a trajetória de ascensão dessas fontes na matriz, ignorando a intermitência diária.
             Use o zoom na parte inferior para explorar períodos específicos.
             """)
-        st.plotly_chart(plotar_serie_diaria_com_medias(df_diario), use_container_width=True)
+        primeiro_dia, ultimo_dia = df_diario.index.min().date(), df_diario.index.max().date()
+        inicio, fim = st.slider("Período do gráfico:", min_value=primeiro_dia, max_value=ultimo_dia,
+                                value=(primeiro_dia, ultimo_dia), format="DD/MM/YYYY")
+        st.caption(f"Períodos menores trazem mais detalhe: cada linha é desenhada com no máximo {PONTOS_POR_TRACO} pontos.")
+        renderizador = st.radio("Desenho do gráfico:", RENDERIZADORES, horizontal=True,
+                                format_func={'auto': 'Automático', 'svg': 'SVG', 'webgl': 'WebGL'}.get,
+                                help=f"Automático usa WebGL nos traços com mais de {LIMITE_PONTOS_SVG} pontos: arrastar e dar zoom fica mais leve.")
+        col_janelas, col_tipo = st.columns(2)
+        janelas = sorted(col_janelas.multiselect("Médias móveis (dias):", OPCOES_JANELAS_MEDIAS, default=list(JANELAS_MEDIAS)))
+        tipo_media = col_tipo.radio("Tipo de média:", TIPOS_MEDIAS, horizontal=True,
+                                    format_func={'simples': 'Simples', 'centralizada': 'Centralizada', 'exponencial': 'Exponencial'}.get,
+                                    help="Simples: média dos dias até o dia. Centralizada: janela centrada no dia. Exponencial: mais peso aos dias recentes.")
+        df_medias = carregar_medias(janelas, tipo_media, CONSOLIDATED_FILE, nomes=NOMES_ACENTUADOS)
+        st.plotly_chart(plotar_serie_diaria_com_medias(df_diario, df_medias, janelas, inicio, fim, renderizador), use_container_width=True)
         
     elif analise_selecionada == "Outras Análises":
         st.header("Outras Análises do Notebook")
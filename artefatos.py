@@ -0,0 +1,55 @@
+# Arquivo: artefatos.py
+# Grafo preguiçoso de resultados para os painéis: cada artefato (uma previsão, uma tabela de
+# comparação...) é registrado com a função que o calcula e os artefatos de que depende, e só é
+# calculado na primeira vez que alguma página o pede. Depois fica memorizado.
+
+import threading
+
+class Artefatos:
+    """
+    Conjunto de artefatos calculados sob demanda e memorizados.
+        artefatos = Artefatos()
+        artefatos.registrar('anual', lambda: analise_anual)
+        artefatos.registrar('rl_solar', lambda anual: prever(anual, 'perc_solar'), 'anual')
+        artefatos['rl_solar']  # calcula 'anual' e 'rl_solar' só agora
+    Seguro para várias sessões do Streamlit usando a mesma instância (st.cache_resource): um
+    artefato pedido ao mesmo tempo por duas sessões é calculado uma vez só.
+    """
+
+    def __init__(self):
+        self._receitas = {}
+        self._valores = {}
+        self._trava = threading.RLock()  # reentrante: um artefato pede as suas dependências
+
+    def registrar(self, nome, funcao, *dependencias):
+        """Registra `nome` = funcao(*valores das dependencias); nada é calculado aqui."""
+        faltando = [d for d in dependencias if d not in self._receitas]
+        if faltando:
+            raise KeyError(f"Artefato '{nome}' depende de artefatos não registrados: {', '.join(faltando)}")
+        with self._trava:
+            self._receitas[nome] = (funcao, dependencias)
+            self._valores.pop(nome, None)
+
+    def __contains__(self, nome):
+        return nome in self._receitas
+
+    def __getitem__(self, nome):
+        if nome in self._valores:
+            return self._valores[nome]
+        funcao, dependencias = self._receitas[nome]
+        with self._trava:
+            if nome not in self._valores:
+                self._valores[nome] = funcao(*(self[d] for d in dependencias))
+            return self._valores[nome]
+
+    def preparar(self, nomes):
+        """Calcula os artefatos de `nomes` (e as dependências) e devolve os que ainda não estavam prontos."""
+        novos = [nome for nome in nomes if nome not in self._valores]
+        for nome in nomes:
+            self[nome]
+        return novos
+
+    @property
+    def calculados(self):
+        """Nomes dos artefatos já calculados."""
+        return list(self._valores)
@@ -0,0 +1,78 @@
+# Arquivo: benchmark_armazenamento.py
+# Compara o tamanho em disco e o tempo de leitura do consolidado em três configurações:
+#   padrao    - df.to_parquet com os tipos e opções padrão do pandas (como era gravado antes);
+#   compacto  - float32 + dicionário nos subsistemas, ainda com snappy;
+#   completo  - esquema compacto + zstd, DELTA/BYTE_STREAM_SPLIT e um row group por ano (Coletar_dados).
+# Mede a leitura completa e a leitura filtrada de um único ano (que só descarta row groups
+# quando as estatísticas de din_instante estão ordenadas por ano).
+#
+# Uso: python benchmark_armazenamento.py --anos 26 --amostras-por-hora 1
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+def gravar(modo, df, arquivo):
+    from Coletar_dados import COLUNAS_VALORES, ESQUEMA_CONSOLIDADO, _gravar_por_ano, para_tabela_arrow
+
+    if modo == 'padrao':
+        # Tipos de antes: texto nos subsistemas e float64 nas medidas
+        df.astype({'id_subsistema': str, 'nom_subsistema': str, **{col: 'float64' for col in COLUNAS_VALORES}}).to_parquet(arquivo, index=False)
+    elif modo == 'compacto':
+        pq.write_table(para_tabela_arrow(df), arquivo, compression='snappy')
+    else:
+        _gravar_por_ano(arquivo, [para_tabela_arrow(df)])
+    assert pq.read_schema(arquivo).names[:len(ESQUEMA_CONSOLIDADO)] == ESQUEMA_CONSOLIDADO.names
+
+def medir(funcao, repeticoes=3):
+    """Melhor tempo de `repeticoes` execuções, em segundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho e tempo de leitura do consolidado em diferentes esquemas.")
+    parser.add_argument('--anos', type=int, default=26, help="Quantidade de anos sintéticos (a partir de 2000).")
+    parser.add_argument('--amostras-por-hora', type=int, default=1, help="Multiplica o número de linhas de cada ano.")
+    args = parser.parse_args()
+
+    from Coletar_dados import limpar_dados
+    from dados_sinteticos import gerar_ano_sintetico
+
+    print(f"Gerando {args.anos} anos sintéticos ({args.amostras_por_hora} amostra(s) por hora)...")
+    df = limpar_dados(pd.concat(
+        [gerar_ano_sintetico(ano, args.amostras_por_hora) for ano in range(2000, 2000 + args.anos)],
+        ignore_index=True,
+    ))
+    # Ano do meio da série, para a leitura filtrada
+    ano = 2000 + args.anos // 2
+    filtro = (ds.field('din_instante') >= pd.Timestamp(ano, 1, 1)) & (ds.field('din_instante') < pd.Timestamp(ano + 1, 1, 1))
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for modo in ['padrao', 'compacto', 'completo']:
+            arquivo = os.path.join(tmp, f'{modo}.parquet')
+            gravar(modo, df, arquivo)
+            resultados.append({
+                'modo': modo,
+                'mb': os.path.getsize(arquivo) / 1024 / 1024,
+                'row_groups': pq.ParquetFile(arquivo).metadata.num_row_groups,
+                'leitura_s': medir(lambda: pd.read_parquet(arquivo)),
+                'leitura_ano_s': medir(lambda: ds.dataset(arquivo).to_table(filter=filtro).to_pandas()),
+            })
+
+    print(f"\n{len(df):,} linhas; leitura filtrada do ano {ano}.")
+    print(f"{'Modo':<12}{'Tamanho (MB)':>14}{'Row groups':>12}{'Leitura (s)':>13}{'Leitura 1 ano (s)':>19}")
+    for r in resultados:
+        print(f"{r['modo']:<12}{r['mb']:>14.1f}{r['row_groups']:>12}{r['leitura_s']:>13.3f}{r['leitura_ano_s']:>19.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Arquivo: benchmark_carga_paineis.py
+# Compara o tempo e o pico de memória (RSS) de preparar as análises dos painéis (anual do SIN,
+# regional e diária) a partir de um consolidado sintético grande:
+#   antigo    - read_parquet sem columns/filters, máscaras booleanas e .copy() (o load_and_prepare_data original);
+#   projetado - só as colunas necessárias, SIN e regiões separados na leitura por filtro, sem cópias;
+#   lotes     - dados_energia.montar_cubo: colunas projetadas, somadas lote a lote (caminho sem cubo gravado);
+#   cubo      - dados_energia.carregar_analises lendo o cubo de agregados gravado pelo ETL;
+#   reinicio  - carregar_analises num processo novo, com as análises já guardadas no cache em disco.
+# Cada modo roda em um processo separado, para que um não contamine a medição do outro, e os
+# totais anuais de cada modo são conferidos com os do modo antigo.
+#
+# Uso: python benchmark_carga_paineis.py --anos 26 --amostras-por-hora 4
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_utils import pico_rss_mb
+
+MODOS = ['antigo', 'projetado', 'lotes', 'cubo', 'reinicio']
+
+def preparar_antigo(arquivo):
+    """Cópia fiel do load_and_prepare_data original do painel_completo.py."""
+    import pandas as pd
+
+    df = pd.read_parquet(arquivo)
+    df['ano'] = pd.to_datetime(df['din_instante']).dt.year
+    df_sin = df[df['nom_subsistema'] == 'SISTEMA INTERLIGADO NACIONAL'].copy()
+    fontes_renovaveis = ['val_gerhidraulica', 'val_gereolica', 'val_gersolar']
+    df_sin['geracao_renovavel'] = df_sin[fontes_renovaveis].sum(axis=1)
+    df_sin['geracao_total'] = df_sin['geracao_renovavel'] + df_sin['val_gertermica']
+    analise_nacional_anual = df_sin.groupby('ano').agg(
+        total_geral_brasil=('geracao_total', 'sum'), total_renovavel_brasil=('geracao_renovavel', 'sum'),
+        Hidraulica=('val_gerhidraulica', 'sum'), Termica=('val_gertermica', 'sum'),
+        Eolica=('val_gereolica', 'sum'), Solar=('val_gersolar', 'sum')
+    ).reset_index()
+    df_regional = df[df['nom_subsistema'] != 'SISTEMA INTERLIGADO NACIONAL'].copy()
+    df_regional['geracao_renovavel'] = df_regional[fontes_renovaveis].sum(axis=1)
+    df_regional['geracao_total'] = df_regional['geracao_renovavel'] + df_regional['val_gertermica']
+    analise_regional_anual = df_regional.groupby(['ano', 'nom_subsistema']).agg(
+        geracao_renovavel_regiao=('geracao_renovavel', 'sum'), geracao_total_regiao=('geracao_total', 'sum')
+    ).reset_index()
+    analise_final_regional = pd.merge(analise_regional_anual, analise_nacional_anual[['ano', 'total_renovavel_brasil']], on='ano')
+    df_diario = df_sin.set_index('din_instante')[['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']].resample('D').sum()
+    return analise_nacional_anual['total_geral_brasil'].tolist(), len(analise_final_regional), len(df_diario)
+
+def preparar_projetado(arquivo):
+    """Mesmas análises lendo SIN e regiões separadamente, só com as colunas usadas e sem cópias."""
+    from dados_energia import FONTES, RENOVAVEIS, SIN, carregar_dados
+
+    sin = carregar_dados(subsistemas=[SIN], colunas=['din_instante', 'ano'] + list(FONTES), pasta=None, arquivo=arquivo)
+    anual = sin.groupby('ano')[list(FONTES)].sum().astype('float64')
+    total_geral = anual[RENOVAVEIS].sum(axis=1) + anual['val_gertermica']
+    diario = sin.set_index('din_instante')[list(FONTES)].resample('D').sum()
+    del sin
+    regioes = carregar_dados(excluir=[SIN], colunas=['ano', 'nom_subsistema'] + list(FONTES), pasta=None, arquivo=arquivo)
+    regional = regioes.groupby(['ano', 'nom_subsistema'], observed=True)[list(FONTES)].sum()
+    return total_geral.tolist(), len(regional), len(diario)
+
+def preparar_lotes(arquivo):
+    """Caminho do carregar_analises quando não há cubo gravado: grãos 'ano' e 'dia' somados em lotes."""
+    from dados_energia import montar_cubo, preparar_analises
+
+    cubo = montar_cubo(arquivo, ['ano', 'dia'])
+    anual, regional, diario = preparar_analises(cubo['ano'], cubo['dia'])
+    return anual['total_geral'].tolist(), len(regional), len(diario)
+
+def preparar_cubo(arquivo):
+    """Primeira carga depois do ETL: só os grãos 'ano' e 'dia' do cubo (e grava o cache em disco)."""
+    from dados_energia import carregar_analises, pasta_cache_analises
+
+    shutil.rmtree(pasta_cache_analises(arquivo), ignore_errors=True)
+    analises = carregar_analises(arquivo)
+    return analises.anual['total_geral'].tolist(), len(analises.regional), len(analises.diario)
+
+def preparar_reinicio(arquivo):
+    """Servidor reiniciado sem mudança nos dados: as análises vêm do cache em disco."""
+    from dados_energia import carregar_analises
+
+    analises = carregar_analises(arquivo)
+    return analises.anual['total_geral'].tolist(), len(analises.regional), len(analises.diario)
+
+def executar_modo(modo, arquivo):
+    """Prepara as análises com um dos modos e imprime o resultado em JSON."""
+    preparar = {'antigo': preparar_antigo, 'projetado': preparar_projetado, 'lotes': preparar_lotes,
+                'cubo': preparar_cubo, 'reinicio': preparar_reinicio}[modo]
+    import dados_energia  # noqa: F401 - bibliotecas carregadas fora da medição
+    rss_inicial = pico_rss_mb()
+    inicio = time.perf_counter()
+    totais, linhas_regional, dias = preparar(arquivo)
+    print(json.dumps({
+        'modo': modo,
+        'segundos': time.perf_counter() - inicio,
+        'rss_inicial_mb': rss_inicial,
+        'pico_rss_mb': pico_rss_mb(),
+        'totais_anuais': totais,
+        'linhas_regional': linhas_regional,
+        'dias': dias,
+    }))
+
+def gerar_consolidado(arquivo, anos, amostras_por_hora):
+    """Grava um consolidado sintético no esquema do ETL, um ano por vez."""
+    from Coletar_dados import _gravar_por_ano, limpar_dados, para_tabela_arrow
+    from dados_sinteticos import gerar_ano_sintetico
+
+    tabelas = (para_tabela_arrow(limpar_dados(gerar_ano_sintetico(ano, amostras_por_hora))) for ano in anos)
+    return _gravar_por_ano(arquivo, tabelas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo e pico de memória da carga dos painéis.")
+    parser.add_argument('--anos', type=int, default=26, help="Anos do consolidado sintético (a partir de 2000).")
+    parser.add_argument('--amostras-por-hora', type=int, default=4, help="Multiplica o número de linhas de cada ano.")
+    parser.add_argument('--executar', nargs=2, metavar=('MODO', 'ARQUIVO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_modo(*args.executar)
+        return
+
+    from dados_energia import gravar_cubo
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = os.path.join(tmp, 'balanco_energia_consolidado.parquet')
+        print(f"Gerando o consolidado sintético ({args.anos} anos, {args.amostras_por_hora} amostra(s) por hora)...")
+        linhas = gerar_consolidado(arquivo, range(2000, 2000 + args.anos), args.amostras_por_hora)
+        gravar_cubo(arquivo)
+        print(f"{linhas:,} linhas, {os.path.getsize(arquivo) / 1024 / 1024:.1f} MB.\n")
+
+        resultados = []
+        for modo in MODOS:
+            saida = subprocess.run([sys.executable, __file__, '--executar', modo, arquivo],
+                                   capture_output=True, text=True, check=True)
+            resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    referencia = resultados[0]
+    print(f"{'Modo':<11}{'Tempo (s)':>10}{'Pico RSS (MB)':>15}{'Acréscimo (MB)':>16}  Confere")
+    for r in resultados:
+        confere = (len(r['totais_anuais']) == len(referencia['totais_anuais'])
+                   and all(abs(a - b) <= 1e-6 * abs(b) for a, b in zip(r['totais_anuais'], referencia['totais_anuais']))
+                   and (r['linhas_regional'], r['dias']) == (referencia['linhas_regional'], referencia['dias']))
+        print(f"{r['modo']:<11}{r['segundos']:>10.2f}{r['pico_rss_mb']:>15.0f}{r['pico_rss_mb'] - r['rss_inicial_mb']:>16.0f}  {'sim' if confere else 'NÃO'}")
+
+if __name__ == "__main__":
+    main()
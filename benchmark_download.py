@@ -0,0 +1,65 @@
+# Arquivo: benchmark_download.py
+# Mede, sem acessar a ONS, o efeito dos downloads simultâneos e do cache (GET condicional) no ETL.
+# Sobe o servidor_espelho com arquivos sintéticos, latência e banda por conexão fixas, e roda:
+#   - a etapa 'fetch' com um espelho vazio (fria) e de novo sobre o mesmo espelho (quente, só 304),
+#     para cada quantidade de downloads simultâneos;
+#   - o ETL completo (fetch, clean, consolidate) frio e quente, com a maior quantidade testada.
+# A latência e a banda do servidor tornam os tempos reprodutíveis entre máquinas.
+#
+# Uso: python benchmark_download.py --anos 12 --downloads 1 2 4 8 --latencia 0.05 --banda 4000000
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+def executar_silencioso(funcao, *args, **kwargs):
+    """Roda `funcao` descartando o progresso impresso e devolve (segundos, resultado)."""
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = funcao(*args, **kwargs)
+    return time.perf_counter() - inicio, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Downloads simultâneos e cache do ETL contra o servidor_espelho local.")
+    parser.add_argument('--anos', type=int, default=12, help="Quantidade de arquivos anuais sintéticos.")
+    parser.add_argument('--amostras-por-hora', type=int, default=1)
+    parser.add_argument('--downloads', type=int, nargs='+', default=[1, 2, 4, 8], help="Downloads simultâneos a testar.")
+    parser.add_argument('--latencia', type=float, default=0.05, help="Segundos de espera do servidor por requisição.")
+    parser.add_argument('--banda', type=float, default=4_000_000, help="Bytes por segundo por conexão no servidor.")
+    args = parser.parse_args()
+
+    from Coletar_dados import etapa_fetch, executar_etl
+    from dados_sinteticos import gerar_espelho_sintetico
+    from servidor_espelho import iniciar_em_segundo_plano
+
+    with tempfile.TemporaryDirectory() as tmp:
+        origem = os.path.join(tmp, 'origem')
+        print(f"Gerando {args.anos} arquivos sintéticos ({args.amostras_por_hora} amostra(s) por hora)...")
+        gerar_espelho_sintetico(origem, range(2000, 2000 + args.anos), args.amostras_por_hora, virgula_decimal=True)
+        servidor = iniciar_em_segundo_plano(origem, latencia=args.latencia, banda=args.banda)
+        try:
+            print(f"\n{'Downloads':>10}{'Fetch frio (s)':>16}{'Fetch quente (s)':>18}{'MB transferidos':>17}")
+            for downloads in args.downloads:
+                espelho = os.path.join(tmp, f'espelho_{downloads}')
+                servidor.estatisticas.clear()
+                frio, _ = executar_silencioso(etapa_fetch, servidor.url_dataset, espelho, downloads)
+                quente, _ = executar_silencioso(etapa_fetch, servidor.url_dataset, espelho, downloads)
+                print(f"{downloads:>10}{frio:>16.2f}{quente:>18.2f}{servidor.estatisticas['bytes'] / 1024 / 1024:>17.1f}")
+
+            pastas = dict(pasta=os.path.join(tmp, 'etl_espelho'), pasta_limpos=os.path.join(tmp, 'etl_limpos'),
+                          arquivo_saida=os.path.join(tmp, 'etl.parquet'), pasta_particionada=os.path.join(tmp, 'etl_particionado'))
+            print(f"\nETL completo com {max(args.downloads)} downloads simultâneos:")
+            for rodada in ['frio', 'quente']:
+                segundos, relatorio = executar_silencioso(
+                    executar_etl, ons_url=servidor.url_dataset, max_downloads=max(args.downloads), **pastas)
+                etapas = ', '.join(f"{r['etapa']} {r['segundos']:.2f}s" for r in relatorio['resultados'])
+                print(f"  {rodada:<7}{segundos:>7.2f}s  ({etapas})")
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Arquivo: benchmark_graficos.py
+# Mede o peso do gráfico de série diária dos painéis (geração diária + médias de 30 e 90 dias +
+# previsão SES até 2030, por fonte) montado com a série inteira e reduzido ao orçamento de pontos
+# (graficos.reduzir_serie), sobre uma série diária sintética de muitos anos:
+#   completo - todos os pontos, como os painéis faziam antes;
+#   reduzido - o período inteiro, no máximo PONTOS_POR_TRACO pontos por traço;
+#   zoom     - só o último ano do histórico (a série volta a vir inteira).
+# Cada modo é montado com os traços em SVG (go.Scatter) e em WebGL (go.Scattergl), via graficos.linha.
+# Para cada combinação: pontos enviados, tamanho do JSON da figura (o que vai ao navegador), tempo
+# para montar a figura e para serializá-la. O tempo de desenho no navegador acompanha a quantidade
+# de pontos e o desenho; com --html as figuras são gravadas para abrir e comparar no navegador.
+# As médias móveis são calculadas antes, como os painéis as recebem (dados_energia.medias_moveis); a
+# seção seguinte compara esse cálculo, todas as fontes e janelas de uma vez por soma acumulada, com o
+# rolling().mean() / ewm() de cada fonte e janela que os painéis faziam a cada gráfico.
+# Depois mede o cache de figuras (graficos.figura_em_cache) com o gráfico regional por subsistema
+# (plotly.express, um painel por região) nos grãos anual, mensal e diário: montar a figura do zero,
+# servi-la da memória do processo e do disco (como um processo novo do servidor).
+#
+# Uso: python benchmark_graficos.py --anos 26 --html /tmp/graficos
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import graficos
+from dados_energia import JANELAS_MEDIAS, OPCOES_JANELAS_MEDIAS, TIPOS_MEDIAS, medias_moveis
+from graficos import PONTOS_POR_TRACO, figura_em_cache, linha, reduzir_serie, tracado_media
+
+FONTES = ['Hidráulica', 'Térmica', 'Eólica', 'Solar']
+
+def series_sinteticas(anos, ano_previsao=2030):
+    """Série diária sintética de `anos` anos terminando em 2025 e a previsão (histórico + SES) até `ano_previsao`."""
+    gerador = np.random.default_rng(0)
+    dias = pd.date_range(f'{2026 - anos}-01-01', '2025-12-31', freq='D')
+    sazonal = np.sin(2 * np.pi * dias.dayofyear.to_numpy() / 365.25)
+    diario = pd.DataFrame({fonte: 1e6 * (1 + 0.3 * sazonal) * (1 + i) + gerador.normal(0, 5e4, len(dias))
+                           for i, fonte in enumerate(FONTES)}, index=dias)
+    futuro = pd.date_range('2026-01-01', f'{ano_previsao}-12-31', freq='D')
+    previsao = pd.DataFrame({fonte: np.full(len(futuro), diario[fonte].iloc[-1]) for fonte in FONTES}, index=futuro)
+    return diario, pd.concat([diario, previsao])
+
+def montar_figura(diario, previsao, medias, renderizador, reduzir=True, inicio=None, fim=None):
+    """O gráfico da série diária dos painéis, com ou sem a redução de pontos, em SVG ou WebGL."""
+    recortar = (lambda serie: reduzir_serie(serie, inicio, fim)) if reduzir else (lambda serie: serie.loc[inicio:fim])
+    fig = go.Figure()
+    for fonte in diario.columns:
+        tracos = {fonte: recortar(diario[fonte])}
+        tracos.update({f'{fonte} Média {janela}d': recortar(medias[f'{fonte}_{janela}d']) for janela in JANELAS_MEDIAS})
+        tracos[f'{fonte} (Previsão SES)'] = recortar(previsao[fonte])
+        for posicao, (nome, serie) in enumerate(tracos.items()):
+            fig.add_trace(linha(x=serie.index, y=serie, renderizador=renderizador, mode='lines', name=nome, legendgroup=fonte,
+                                line=dict(dash=tracado_media(posicao - 1)) if 'Média' in nome else None))
+    fig.update_layout(height=700, xaxis_rangeslider_visible=True)
+    return fig
+
+def medias_por_fonte(diario, janelas, tipo):
+    """As médias como os painéis faziam: um rolling()/ewm() por fonte e janela."""
+    if tipo == 'exponencial':
+        calcular = lambda serie, janela: serie.ewm(span=janela, adjust=False).mean()
+    else:
+        calcular = lambda serie, janela: serie.rolling(window=janela, center=(tipo == 'centralizada')).mean()
+    return pd.DataFrame({f'{fonte}_{janela}d': calcular(diario[fonte], janela) for janela in janelas for fonte in diario.columns})
+
+def medir_medias(diario, repeticoes):
+    """Tempo das médias de todas as fontes nas janelas oferecidas pelos painéis: por fonte x soma acumulada."""
+    janelas = list(OPCOES_JANELAS_MEDIAS)
+    print(f"\nMédias móveis de {diario.shape[1]} fontes nas janelas {janelas}:")
+    print(f"{'Tipo':<14}{'Por fonte (s)':>15}{'Acumulada (s)':>15}{'Maior dif. rel.':>17}")
+    for tipo in TIPOS_MEDIAS:
+        tempos = {'fonte': [], 'acumulada': []}
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            referencia = medias_por_fonte(diario, janelas, tipo)
+            tempos['fonte'].append(time.perf_counter() - inicio)
+            inicio = time.perf_counter()
+            medias = medias_moveis(diario, janelas, tipo)
+            tempos['acumulada'].append(time.perf_counter() - inicio)
+        a, b = referencia.to_numpy(), medias.to_numpy()
+        validos = np.isfinite(a) & (a != 0)
+        diferenca = float(np.max(np.abs(a - b)[validos] / np.abs(a[validos]))) if validos.any() else 0.0
+        print(f"{tipo:<14}{min(tempos['fonte']):>15.4f}{min(tempos['acumulada']):>15.4f}{diferenca:>17.1e}")
+
+def regional_sintetico(anos, grao):
+    """% renovável interno sintético por (período, subsistema), no grão 'ano', 'mes' ou 'dia'."""
+    gerador = np.random.default_rng(0)
+    periodos = pd.date_range(f'{2026 - anos}-01-01', '2025-12-31', freq={'ano': 'YS', 'mes': 'MS', 'dia': 'D'}[grao])
+    subsistemas = ['NORDESTE', 'NORTE', 'SUDESTE', 'SUL']
+    return pd.DataFrame({'periodo': np.repeat(periodos, len(subsistemas)),
+                         'nom_subsistema': np.tile(subsistemas, len(periodos)),
+                         'perc_renovavel_interno': gerador.uniform(40, 100, len(periodos) * len(subsistemas))})
+
+def plot_analise_regional_relativa(df_regional, eixo_x='periodo'):
+    """Cópia fiel do gráfico regional do painel_completo.py."""
+    fig = px.line(
+        df_regional, x=eixo_x, y='perc_renovavel_interno',
+        facet_col='nom_subsistema', facet_col_wrap=2,
+        color='nom_subsistema', markers=(eixo_x == 'ano'), height=700,
+        title='Análise Relativa: % de Renováveis na Matriz de CADA Subsistema'
+    )
+    fig.for_each_xaxis(lambda axis: axis.update(showticklabels=True, title='Ano' if eixo_x == 'ano' else 'Período'))
+    fig.for_each_yaxis(lambda axis: axis.update(showticklabels=True, title='% Renovável Interno'))
+    fig.update_layout(showlegend=False)
+    return fig
+
+def medir_cache_figuras(anos, repeticoes):
+    """Tempo para obter o gráfico regional montando do zero, da memória e do disco, em cada grão."""
+    print(f"\n{'Grão':<6}{'JSON (MB)':>11}{'Montar (s)':>12}{'Memória (s)':>13}{'Disco (s)':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for grao in ['ano', 'mes', 'dia']:
+            regional = regional_sintetico(anos, grao)
+            tempos = {'montar': [], 'memoria': [], 'disco': []}
+            for rodada in range(repeticoes):
+                pasta = os.path.join(tmp, f'{grao}_{rodada}')
+                graficos._figuras.clear()
+                for etapa in ['montar', 'memoria', 'disco']:
+                    if etapa == 'disco':
+                        graficos._figuras.clear()
+                    inicio = time.perf_counter()
+                    fig = figura_em_cache(plot_analise_regional_relativa, regional, versao=grao, pasta=pasta)
+                    tempos[etapa].append(time.perf_counter() - inicio)
+            print(f"{grao:<6}{len(fig.to_json()) / 1024 / 1024:>11.2f}{min(tempos['montar']):>12.3f}"
+                  f"{min(tempos['memoria']):>13.3f}{min(tempos['disco']):>11.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho e tempo do gráfico de série diária: completo x reduzido, SVG x WebGL.")
+    parser.add_argument('--anos', type=int, default=26, help="Anos da série diária sintética (terminando em 2025).")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Medições por modo (vale a menor).")
+    parser.add_argument('--html', help="Pasta onde gravar cada figura em HTML para abrir no navegador.")
+    args = parser.parse_args()
+
+    diario, previsao = series_sinteticas(args.anos)
+    medias = medias_moveis(diario)
+    ultimo_ano = diario.index.max().year
+    modos = {'completo': dict(reduzir=False), 'reduzido': dict(),
+             'zoom': dict(inicio=pd.Timestamp(ultimo_ano, 1, 1), fim=pd.Timestamp(ultimo_ano, 12, 31))}
+
+    print(f"{len(diario):,} dias, {len(previsao) - len(diario):,} de previsão; orçamento de {PONTOS_POR_TRACO} pontos por traço.\n")
+    print(f"{'Modo':<10}{'Desenho':>8}{'Pontos':>10}{'JSON (MB)':>11}{'Montar (s)':>12}{'Serializar (s)':>16}")
+    for modo, opcoes in modos.items():
+        for renderizador in ['svg', 'webgl']:
+            montar, serializar = [], []
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                fig = montar_figura(diario, previsao, medias, renderizador, **opcoes)
+                montar.append(time.perf_counter() - inicio)
+                inicio = time.perf_counter()
+                texto = fig.to_json()
+                serializar.append(time.perf_counter() - inicio)
+            pontos = sum(len(traco.x) for traco in fig.data)
+            print(f"{modo:<10}{renderizador:>8}{pontos:>10,}{len(texto) / 1024 / 1024:>11.2f}{min(montar):>12.3f}{min(serializar):>16.3f}")
+            if args.html:
+                os.makedirs(args.html, exist_ok=True)
+                fig.write_html(os.path.join(args.html, f'serie_diaria_{modo}_{renderizador}.html'), include_plotlyjs='cdn')
+
+    medir_medias(diario, args.repeticoes)
+    medir_cache_figuras(args.anos, args.repeticoes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Arquivo: benchmark_incremental.py
+# Mede o que o ETL gasta para deixar o cubo e as análises dos painéis em dia quando chegam horas
+# novas do ano corrente, num consolidado sintético de muitos anos:
+#   completo    - gravar_cubo + calcular_analises: refaz tudo a partir do histórico inteiro;
+#   incremental - atualizar_cubo + atualizar_analises: refaz só o ano regravado e a cauda das análises.
+# O último ano começa com metade das horas; depois o consolidado é regravado com o ano inteiro (os
+# demais anos são copiados como estavam) e as análises dos dois caminhos são conferidas entre si.
+#
+# Uso: python benchmark_incremental.py --anos 26 --amostras-por-hora 4
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+def regravar_ultimo_ano(arquivo, tabela_nova):
+    """Regrava `arquivo` trocando o row group do último ano por `tabela_nova`, como faz o consolidate."""
+    import pyarrow.parquet as pq
+    from Coletar_dados import _gravar_por_ano
+
+    parquet = pq.ParquetFile(arquivo)
+    anteriores = [parquet.read_row_group(i) for i in range(parquet.num_row_groups - 1)]
+    temporario = arquivo + '.tmp'
+    linhas = _gravar_por_ano(temporario, anteriores + [tabela_nova], ja_por_ano=True)
+    os.replace(temporario, arquivo)
+    return linhas
+
+def main():
+    parser = argparse.ArgumentParser(description="Cubo e análises: reconstrução completa x atualização incremental.")
+    parser.add_argument('--anos', type=int, default=26, help="Anos do consolidado sintético (a partir de 2000).")
+    parser.add_argument('--amostras-por-hora', type=int, default=4, help="Multiplica o número de linhas de cada ano.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from benchmark_carga_paineis import gerar_consolidado
+    from Coletar_dados import limpar_dados, para_tabela_arrow
+    from dados_energia import (atualizar_analises, atualizar_cubo, calcular_analises, carregar_analises,
+                               gravar_cubo, versao_dos_dados)
+    from dados_sinteticos import gerar_ano_sintetico
+
+    ultimo = 2000 + args.anos - 1
+    ano_inteiro = para_tabela_arrow(limpar_dados(gerar_ano_sintetico(ultimo, args.amostras_por_hora)))
+    meio_do_ano = pd.Timestamp(f'{ultimo}-07-01')
+    metade = ano_inteiro.filter(ano_inteiro['din_instante'].to_numpy() < meio_do_ano.to_datetime64())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = os.path.join(tmp, 'incremental', 'balanco_energia_consolidado.parquet')
+        referencia = os.path.join(tmp, 'completo', 'balanco_energia_consolidado.parquet')
+        os.makedirs(os.path.dirname(arquivo))
+        os.makedirs(os.path.dirname(referencia))
+        print(f"Gerando o consolidado sintético ({args.anos} anos, {args.amostras_por_hora} amostra(s) por hora)...")
+        gerar_consolidado(arquivo, range(2000, ultimo + 1), args.amostras_por_hora)
+        regravar_ultimo_ano(arquivo, metade)
+        gravar_cubo(arquivo)
+        carregar_analises(arquivo)  # grava o cache em disco da versão de antes das horas novas
+
+        versao_anterior = versao_dos_dados(arquivo)
+        linhas = regravar_ultimo_ano(arquivo, ano_inteiro)
+        shutil.copy(arquivo, referencia)
+        print(f"{linhas:,} linhas; {ano_inteiro.num_rows - metade.num_rows:,} novas em {ultimo}.\n")
+
+        inicio = time.perf_counter()
+        gravar_cubo(referencia)
+        segundos_cubo_completo = time.perf_counter() - inicio
+        completo = calcular_analises(referencia)
+        segundos_completo = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        atualizar_cubo(arquivo, [ultimo])
+        segundos_cubo_incremental = time.perf_counter() - inicio
+        desde = atualizar_analises(arquivo, [ultimo], versao_anterior)
+        segundos_incremental = time.perf_counter() - inicio
+        incremental = carregar_analises(arquivo)
+
+        confere = desde == ultimo
+        for campo in ['anual', 'regional', 'diario', 'medias']:
+            try:
+                pd.testing.assert_frame_equal(getattr(incremental, campo), getattr(completo, campo), check_exact=False, rtol=1e-9)
+            except AssertionError:
+                confere = False
+
+    print(f"{'Caminho':<13}{'Cubo (s)':>10}{'Total (s)':>11}")
+    print(f"{'completo':<13}{segundos_cubo_completo:>10.2f}{segundos_completo:>11.2f}")
+    print(f"{'incremental':<13}{segundos_cubo_incremental:>10.2f}{segundos_incremental:>11.2f}")
+    print(f"\nAnálises iguais nos dois caminhos: {'sim' if confere else 'NÃO'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Arquivo: benchmark_janelas.py
+# Mede a série por janela dos painéis (dados_energia.serie_na_janela) num consolidado sintético de
+# muitos anos, com o cubo gravado, em janelas de tamanho crescente, do zoom de uma semana ao histórico
+# inteiro. Para cada janela: o grão escolhido, os períodos devolvidos, o tempo da consulta ao cubo
+# (primeira vez e do cache) e o tamanho do JSON do gráfico de 4 fontes que vai ao navegador.
+# Para comparar, o mesmo gráfico com a série horária da janela inteira, que é o que o painel teria
+# de mandar para mostrar o detalhe horário sem escolher o grão.
+#
+# Uso: python benchmark_janelas.py --anos 26 --amostras-por-hora 1
+
+import argparse
+import os
+import tempfile
+import time
+
+JANELAS = {'1 semana': 7, '2 meses': 61, '1 ano': 366, '5 anos': 5 * 366, 'histórico': None}
+
+def tamanho_json_mb(df):
+    """Tamanho (MB) do JSON de uma figura com uma linha por coluna de `df`."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure([go.Scattergl(x=df.index, y=df[coluna], mode='lines', name=coluna) for coluna in df.columns])
+    return len(fig.to_json()) / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Série por janela: grão automático no cubo x série horária inteira.")
+    parser.add_argument('--anos', type=int, default=26, help="Anos do consolidado sintético (a partir de 2000).")
+    parser.add_argument('--amostras-por-hora', type=int, default=1, help="Multiplica o número de linhas de cada ano.")
+    parser.add_argument('--pontos', type=int, default=1500, help="Máximo de períodos por janela.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from benchmark_carga_paineis import gerar_consolidado
+    from dados_energia import SIN, gravar_cubo, ler_horario, serie_na_janela
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = os.path.join(tmp, 'balanco_energia_consolidado.parquet')
+        print(f"Gerando o consolidado sintético ({args.anos} anos, {args.amostras_por_hora} amostra(s) por hora)...")
+        linhas = gerar_consolidado(arquivo, range(2000, 2000 + args.anos), args.amostras_por_hora)
+        gravar_cubo(arquivo)
+        fim = pd.Timestamp(2000 + args.anos - 1, 12, 31, 23)
+        print(f"{linhas:,} linhas; no máximo {args.pontos} períodos por janela.\n")
+        print(f"{'Janela':<11}{'Grão':>8}{'Períodos':>10}{'Consulta (s)':>14}{'Cache (s)':>11}{'JSON (MB)':>11}"
+              f"{'Horas':>10}{'JSON horário (MB)':>19}")
+        for nome, dias in JANELAS.items():
+            inicio = pd.Timestamp(2000, 1, 1) if dias is None else fim.normalize() - pd.Timedelta(days=dias - 1)
+            tempos = []
+            for _ in range(2):
+                comeco = time.perf_counter()
+                grao, serie = serie_na_janela(inicio, fim, SIN, args.pontos, arquivo)
+                tempos.append(time.perf_counter() - comeco)
+            horario = ler_horario(inicio, fim, SIN, arquivo)
+            print(f"{nome:<11}{grao:>8}{len(serie):>10,}{tempos[0]:>14.3f}{tempos[1]:>11.4f}{tamanho_json_mb(serie):>11.2f}"
+                  f"{len(horario):>10,}{tamanho_json_mb(horario):>19.2f}")
+
+if __name__ == "__main__":
+    main()
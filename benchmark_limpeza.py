@@ -0,0 +1,99 @@
+# Arquivo: benchmark_limpeza.py
+# Compara a limpeza antiga (astype(str).str.replace + pd.to_numeric, coluna a coluna) com a
+# limpeza vetorizada do Coletar_dados.limpar_dados, sobre um DataFrame sintético grande.
+# Metade das medidas vem como texto com vírgula decimal e metade já numérica, como no histórico da ONS.
+# Cada modo roda em um processo separado; o pico de RSS é medido só durante a limpeza.
+#
+# Uso: python benchmark_limpeza.py --linhas 10000000
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from benchmark_utils import pico_rss_mb, rss_atual_mb, zerar_pico_rss
+from dados_sinteticos import SIN, SUBSISTEMAS
+
+MODOS = ['antigo', 'vetorizado']
+
+def gerar_frame(linhas, semente=0):
+    """DataFrame bruto no formato da ONS, com `linhas` linhas (5 subsistemas por instante horário)."""
+    from Coletar_dados import COLUNAS_VALORES
+
+    rng = np.random.default_rng(semente)
+    nomes = [nome for _, nome in SUBSISTEMAS] + [SIN[1]]
+    instantes = pa.array(pd.Timestamp('2000-01-01') + pd.to_timedelta(np.arange(linhas) // len(nomes), unit='h'))
+    df = pd.DataFrame({
+        'din_instante': pc.strftime(instantes, format='%Y-%m-%d %H:%M:%S').to_pandas(),
+        'nom_subsistema': np.array(nomes)[np.arange(linhas) % len(nomes)],
+    })
+    for i, col in enumerate(COLUNAS_VALORES):
+        valores = np.round(rng.uniform(0, 50000, linhas), 3)
+        if i % 2 == 0:
+            df[col] = pc.replace_substring(pa.array(valores).cast(pa.string()), '.', ',').to_pandas()
+        else:
+            df[col] = valores
+    return df
+
+def limpar_antigo(df):
+    """Limpeza como era feita no run_full_etl original, mantida aqui só como referência."""
+    from Coletar_dados import COLUNAS_VALORES
+
+    df['din_instante'] = pd.to_datetime(df['din_instante'], errors='coerce')
+    for col in COLUNAS_VALORES:
+        df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.', regex=False), errors='coerce')
+    df[COLUNAS_VALORES] = df[COLUNAS_VALORES].fillna(0)
+    df.dropna(subset=['din_instante'], inplace=True)
+    return df
+
+def executar_modo(modo, linhas):
+    from Coletar_dados import limpar_dados
+
+    df = gerar_frame(linhas)
+    rss_base = rss_atual_mb()
+    zerar_pico_rss()
+    inicio = time.perf_counter()
+    df = limpar_antigo(df) if modo == 'antigo' else limpar_dados(df)
+    segundos = time.perf_counter() - inicio
+    print(json.dumps({
+        'modo': modo,
+        'linhas': len(df),
+        'segundos': segundos,
+        'linhas_por_s': len(df) / segundos,
+        'rss_base_mb': rss_base,
+        'pico_rss_mb': pico_rss_mb(),
+        'memoria_resultado_mb': df.memory_usage(deep=True).sum() / 1024 / 1024,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão e pico de memória da limpeza antiga vs. vetorizada.")
+    parser.add_argument('--linhas', type=int, default=10_000_000, help="Tamanho do DataFrame sintético.")
+    parser.add_argument('--executar', metavar='MODO', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_modo(args.executar, args.linhas)
+        return
+
+    resultados = []
+    for modo in MODOS:
+        processo = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--executar', modo, '--linhas', str(args.linhas)],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        resultados.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+
+    print(f"{'Modo':<12}{'Linhas':>14}{'Tempo (s)':>12}{'Linhas/s':>14}{'RSS base (MB)':>16}{'Pico RSS (MB)':>16}{'Resultado (MB)':>17}")
+    for r in resultados:
+        print(f"{r['modo']:<12}{r['linhas']:>14,}{r['segundos']:>12.2f}{r['linhas_por_s']:>14,.0f}"
+              f"{r['rss_base_mb']:>16.1f}{r['pico_rss_mb']:>16.1f}{r['memoria_resultado_mb']:>17.1f}")
+
+if __name__ == "__main__":
+    main()
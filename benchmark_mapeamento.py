@@ -0,0 +1,85 @@
+# Arquivo: benchmark_mapeamento.py
+# Mede a memória de vários processos do servidor carregando o histórico horário ao mesmo tempo:
+#   parquet - carregar_dados lendo o consolidado .parquet (cada processo com a sua cópia);
+#   ipc     - carregar_dados sobre o espelho Arrow IPC mapeado em memória (as colunas apontam
+#             para o arquivo, e as páginas ficam no cache do sistema, divididas entre os processos).
+# Cada processo carrega as colunas de data, subsistema e geração, soma as fontes (para tocar todos
+# os dados, como um gráfico faria) e espera os outros; com todos carregados, lê-se de cada um a
+# memória residente (RSS), a proporcional (PSS, que divide as páginas compartilhadas) e a anônima.
+# Só no Linux (usa /proc/<pid>/smaps_rollup).
+#
+# Uso: python benchmark_mapeamento.py --anos 26 --amostras-por-hora 4 --processos 4
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_utils import memoria_processo_mb
+
+MODOS = ['parquet', 'ipc']
+
+def executar_modo(modo, arquivo):
+    """Carrega o histórico como um processo do painel, avisa que terminou e espera a medição."""
+    from dados_energia import FONTES, carregar_dados
+
+    inicio = time.perf_counter()
+    df = carregar_dados(colunas=['din_instante', 'nom_subsistema'] + list(FONTES), pasta=None, arquivo=arquivo, ipc=(modo == 'ipc'))
+    total = float(df[list(FONTES)].sum().sum())
+    print(json.dumps({'modo': modo, 'segundos': time.perf_counter() - inicio, 'linhas': len(df), 'total': total}), flush=True)
+    sys.stdin.readline()  # mantém o DataFrame vivo até o processo principal medir a memória
+
+def medir(modo, arquivo, processos):
+    """Sobe `processos` processos com o `modo`, espera todos carregarem e mede a memória de cada um."""
+    filhos = [subprocess.Popen([sys.executable, __file__, '--executar', modo, arquivo],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for _ in range(processos)]
+    try:
+        resultados = [json.loads(filho.stdout.readline()) for filho in filhos]
+        memorias = [memoria_processo_mb(filho.pid) for filho in filhos]
+    finally:
+        for filho in filhos:
+            filho.communicate('\n')
+    return resultados, memorias
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória de vários processos carregando o consolidado (parquet x IPC mapeado).")
+    parser.add_argument('--anos', type=int, default=26, help="Anos do consolidado sintético (a partir de 2000).")
+    parser.add_argument('--amostras-por-hora', type=int, default=4, help="Multiplica o número de linhas de cada ano.")
+    parser.add_argument('--processos', type=int, default=4, help="Processos carregando ao mesmo tempo.")
+    parser.add_argument('--executar', nargs=2, metavar=('MODO', 'ARQUIVO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_modo(*args.executar)
+        return
+
+    from benchmark_carga_paineis import gerar_consolidado
+    from dados_energia import caminho_ipc, gravar_ipc
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = os.path.join(tmp, 'balanco_energia_consolidado.parquet')
+        print(f"Gerando o consolidado sintético ({args.anos} anos, {args.amostras_por_hora} amostra(s) por hora)...")
+        linhas = gerar_consolidado(arquivo, range(2000, 2000 + args.anos), args.amostras_por_hora)
+        gravar_ipc(arquivo)
+        print(f"{linhas:,} linhas; parquet {os.path.getsize(arquivo) / 1024 / 1024:.0f} MB, "
+              f"IPC {os.path.getsize(caminho_ipc(arquivo)) / 1024 / 1024:.0f} MB. {args.processos} processo(s) por modo.\n")
+
+        print(f"{'Modo':<9}{'Tempo (s)':>10}{'RSS (MB)':>10}{'PSS (MB)':>10}{'Anônima (MB)':>14}{'PSS total (MB)':>16}  Confere")
+        referencia = None
+        for modo in MODOS:
+            resultados, memorias = medir(modo, arquivo, args.processos)
+            if None in memorias:
+                print("Sem /proc/<pid>/smaps_rollup: a medição precisa do Linux.")
+                return
+            referencia = referencia or resultados[0]
+            confere = all(r['linhas'] == referencia['linhas'] and r['total'] == referencia['total'] for r in resultados)
+            media = {campo: sum(m[campo] for m in memorias) / len(memorias) for campo in ['rss', 'pss', 'anonima']}
+            segundos = sum(r['segundos'] for r in resultados) / len(resultados)
+            print(f"{modo:<9}{segundos:>10.2f}{media['rss']:>10.0f}{media['pss']:>10.0f}{media['anonima']:>14.0f}"
+                  f"{sum(m['pss'] for m in memorias):>16.0f}  {'sim' if confere else 'NÃO'}")
+
+if __name__ == "__main__":
+    main()
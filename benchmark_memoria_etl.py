@@ -0,0 +1,73 @@
+# Arquivo: benchmark_memoria_etl.py
+# Compara o pico de memória (RSS) do ETL clássico (concatena todos os anos, limpa e grava)
+# com o modo streaming (limpa e grava um ano por vez com ParquetWriter).
+# Cada modo roda em um processo separado, para que um não contamine a medição do outro.
+#
+# Uso: python benchmark_memoria_etl.py --anos 26 --amostras-por-hora 4
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_utils import pico_rss_mb
+
+MODOS = ['classico', 'streaming']
+
+def executar_modo(modo, pasta, arquivo_saida):
+    """Roda um dos modos do ETL sobre o espelho em `pasta` e imprime o resultado em JSON."""
+    import pyarrow.parquet as pq
+    from Coletar_dados import atualizar_consolidado, gravar_consolidado, gravar_consolidado_streaming
+
+    caminhos = sorted(os.path.join(pasta, nome) for nome in os.listdir(pasta) if nome.endswith('.parquet'))
+    rss_inicial = pico_rss_mb()
+    inicio = time.perf_counter()
+    if modo == 'classico':
+        df = atualizar_consolidado(caminhos, caminhos, arquivo_saida)
+        gravar_consolidado(df, arquivo_saida)
+    else:
+        gravar_consolidado_streaming(caminhos, caminhos, arquivo_saida)
+    print(json.dumps({
+        'modo': modo,
+        'segundos': time.perf_counter() - inicio,
+        'linhas': pq.ParquetFile(arquivo_saida).metadata.num_rows,
+        'rss_inicial_mb': rss_inicial,
+        'pico_rss_mb': pico_rss_mb(),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de memória do ETL clássico vs. streaming.")
+    parser.add_argument('--anos', type=int, default=26, help="Quantidade de arquivos anuais sintéticos (a partir de 2000).")
+    parser.add_argument('--amostras-por-hora', type=int, default=1, help="Multiplica o número de linhas de cada ano.")
+    parser.add_argument('--executar', nargs=3, metavar=('MODO', 'PASTA', 'SAIDA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_modo(*args.executar)
+        return
+
+    from dados_sinteticos import gerar_espelho_sintetico
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = os.path.join(tmp, 'espelho')
+        print(f"Gerando {args.anos} arquivos anuais sintéticos ({args.amostras_por_hora} amostra(s) por hora)...")
+        gerar_espelho_sintetico(pasta, range(2000, 2000 + args.anos), args.amostras_por_hora, virgula_decimal=True)
+
+        resultados = []
+        for modo in MODOS:
+            saida = os.path.join(tmp, f'consolidado_{modo}.parquet')
+            processo = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--executar', modo, pasta, saida],
+                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            resultados.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'Modo':<12}{'Linhas':>14}{'Tempo (s)':>12}{'RSS inicial (MB)':>19}{'Pico RSS (MB)':>16}")
+    for r in resultados:
+        print(f"{r['modo']:<12}{r['linhas']:>14,}{r['segundos']:>12.2f}{r['rss_inicial_mb']:>19.1f}{r['pico_rss_mb']:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Arquivo: benchmark_mescla.py
+# Compara o custo de mesclar um lote fixo de dados novos (um mês, com parte das chaves já
+# existentes) num ano de dados consolidados de tamanho crescente:
+#   reordenar - concat + drop_duplicates + sort_values no pandas (Coletar_dados.mesclar_por_chave);
+#   sort-merge - Coletar_dados.mesclar_ordenado sobre as tabelas Arrow já ordenadas.
+# Os dois resultados são conferidos entre si.
+#
+# Uso: python benchmark_mescla.py --amostras-por-hora 1 4 16
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+def medir(funcao, repeticoes=3):
+    """Melhor tempo de `repeticoes` execuções, em segundos, e o último resultado."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo da mescla por chave: reordenação completa vs. sort-merge.")
+    parser.add_argument('--amostras-por-hora', type=int, nargs='+', default=[1, 4, 16],
+                        help="Tamanhos do ano consolidado a testar (amostras por hora).")
+    args = parser.parse_args()
+
+    from Coletar_dados import (COLUNAS_VALORES, _deduplicar, limpar_dados, mesclar_ordenado,
+                               mesclar_por_chave, para_tabela_arrow)
+    from dados_sinteticos import gerar_ano_sintetico
+
+    print(f"{'Linhas antigas':>15}{'Linhas novas':>14}{'Reordenar (s)':>15}{'Sort-merge (s)':>16}")
+    for amostras in args.amostras_por_hora:
+        antigo = limpar_dados(gerar_ano_sintetico(2024, amostras))
+        # Dados novos: março republicado com outros valores, mais linhas atrasadas de um instante novo
+        novo = antigo[antigo['din_instante'].dt.month == 3].copy()
+        novo[COLUNAS_VALORES] = novo[COLUNAS_VALORES] * np.float32(1.01)
+        atrasadas = novo.head(5).copy()
+        atrasadas['din_instante'] += pd.Timedelta(seconds=1)
+        novo = pd.concat([novo, atrasadas], ignore_index=True)
+
+        tabela_antiga = _deduplicar(para_tabela_arrow(antigo))
+        tabela_nova = _deduplicar(para_tabela_arrow(novo))
+        segundos_pandas, esperado = medir(lambda: mesclar_por_chave(antigo, novo))
+        segundos_merge, resultado = medir(lambda: mesclar_ordenado(tabela_antiga, tabela_nova))
+
+        resultado = resultado.to_pandas()
+        assert len(resultado) == len(esperado)
+        assert np.array_equal(resultado[COLUNAS_VALORES].to_numpy(), esperado[COLUNAS_VALORES].to_numpy())
+        print(f"{len(antigo):>15,}{len(novo):>14,}{segundos_pandas:>15.3f}{segundos_merge:>16.3f}")
+
+if __name__ == "__main__":
+    main()
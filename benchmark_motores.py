@@ -0,0 +1,80 @@
+# Arquivo: benchmark_motores.py
+# Compara os motores de agregação do dados_energia (pandas em lotes x DuckDB) calculando as análises
+# dos painéis (grãos 'ano' e 'dia' do cubo + preparar_analises) direto do consolidado, sem cubo gravado,
+# em consolidados sintéticos de tamanho crescente. Cada medição roda em um processo separado; as
+# análises de cada motor são gravadas e conferidas com as do pandas (iguais bit a bit ou a maior
+# diferença relativa encontrada).
+#
+# Uso: python benchmark_motores.py --anos 26 --amostras-por-hora 1 2 4 8
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_utils import pico_rss_mb
+
+MOTORES = ['pandas', 'duckdb']
+ANALISES = ['anual', 'regional', 'diario']
+
+def executar_motor(motor, arquivo, prefixo):
+    """Calcula as análises com `motor`, grava cada uma em `prefixo`_<nome>.parquet e imprime a medição em JSON."""
+    from dados_energia import escolher_motor, montar_cubo, preparar_analises
+
+    motor_usado = escolher_motor(motor)
+    rss_inicial = pico_rss_mb()
+    inicio = time.perf_counter()
+    cubo = montar_cubo(arquivo, ['ano', 'dia'], motor=motor_usado)
+    analises = preparar_analises(cubo['ano'], cubo['dia'])
+    segundos = time.perf_counter() - inicio
+    for nome, df in zip(ANALISES, analises):
+        df.to_parquet(f"{prefixo}_{nome}.parquet")
+    print(json.dumps({'motor': motor_usado, 'segundos': segundos, 'rss_inicial_mb': rss_inicial, 'pico_rss_mb': pico_rss_mb()}))
+
+def comparar(prefixo, referencia):
+    """'idênticas' se as análises de `prefixo` são iguais bit a bit às de `referencia`; senão, a maior diferença relativa."""
+    import numpy as np
+    import pandas as pd
+
+    maior = 0.0
+    for nome in ANALISES:
+        a, b = pd.read_parquet(f"{referencia}_{nome}.parquet"), pd.read_parquet(f"{prefixo}_{nome}.parquet")
+        pd.testing.assert_frame_equal(a, b, check_exact=False, rtol=1e-9)  # mesmas linhas, colunas e tipos
+        numeros_a, numeros_b = a.select_dtypes('number').to_numpy(), b.select_dtypes('number').to_numpy()
+        diferentes = ~((numeros_a == numeros_b) | (np.isnan(numeros_a) & np.isnan(numeros_b)))
+        if diferentes.any():
+            maior = max(maior, float(np.max(np.abs(numeros_a - numeros_b)[diferentes] / np.abs(numeros_a[diferentes]))))
+    return 'idênticas' if maior == 0 else f'dif. rel. {maior:.1e}'
+
+def main():
+    parser = argparse.ArgumentParser(description="Motores de agregação (pandas x DuckDB) em consolidados crescentes.")
+    parser.add_argument('--anos', type=int, default=26, help="Anos do consolidado sintético (a partir de 2000).")
+    parser.add_argument('--amostras-por-hora', type=int, nargs='+', default=[1, 2, 4, 8], help="Tamanhos a testar.")
+    parser.add_argument('--executar', nargs=3, metavar=('MOTOR', 'ARQUIVO', 'PREFIXO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_motor(*args.executar)
+        return
+
+    from benchmark_carga_paineis import gerar_consolidado
+
+    print(f"{'Linhas':>12}{'Motor':>8}{'Tempo (s)':>11}{'Acréscimo RSS (MB)':>20}  Análises")
+    with tempfile.TemporaryDirectory() as tmp:
+        for amostras in args.amostras_por_hora:
+            arquivo = os.path.join(tmp, f'consolidado_{amostras}.parquet')
+            linhas = gerar_consolidado(arquivo, range(2000, 2000 + args.anos), amostras)
+            for motor in MOTORES:
+                prefixo = os.path.join(tmp, f'{motor}_{amostras}')
+                saida = subprocess.run([sys.executable, __file__, '--executar', motor, arquivo, prefixo],
+                                       capture_output=True, text=True, check=True)
+                r = json.loads(saida.stdout.strip().splitlines()[-1])
+                confere = comparar(prefixo, os.path.join(tmp, f'pandas_{amostras}'))
+                print(f"{linhas:>12,}{r['motor']:>8}{r['segundos']:>11.2f}{r['pico_rss_mb'] - r['rss_inicial_mb']:>20.0f}  {confere}")
+            os.remove(arquivo)
+
+if __name__ == "__main__":
+    main()
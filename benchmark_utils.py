@@ -0,0 +1,59 @@
+# Arquivo: benchmark_utils.py
+# Funções de apoio compartilhadas pelos scripts benchmark_*.py.
+
+import sys
+
+def zerar_pico_rss():
+    """Zera o pico de memória do processo (só no Linux, via /proc); nos outros sistemas não faz nada."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def pico_rss_mb():
+    """Pico de memória residente do processo atual, em MB."""
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+def rss_atual_mb():
+    """Memória residente atual do processo, em MB (0 se não for possível medir)."""
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        return 0.0
+
+def memoria_processo_mb(pid):
+    """
+    Memória atual do processo `pid`, em MB, lida do /proc/<pid>/smaps_rollup (só no Linux):
+    rss (páginas residentes), pss (rss com as páginas compartilhadas divididas entre os processos
+    que as usam) e anonima (memória própria do processo, que não vem de arquivo).
+    Devolve None onde não é possível medir.
+    """
+    campos = {'Rss:': 'rss', 'Pss:': 'pss', 'Anonymous:': 'anonima'}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            valores = {campos[linha.split()[0]]: int(linha.split()[1]) / 1024 for linha in f if linha.split()[0] in campos}
+    except OSError:
+        return None
+    return valores
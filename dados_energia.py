@@ -0,0 +1,966 @@
+# Arquivo: dados_energia.py
+# Acesso aos dados consolidados do balanço energético para os painéis.
+# carregar_dados prefere o dataset particionado por ano/subsistema (gerado pelo Coletar_dados.py
+# com --particionado), onde os filtros de ano e subsistema descartam arquivos inteiros antes da leitura.
+# Também concentra as análises que os painéis exibem (anual, regional e diária): elas saem do
+# cubo de agregados gravado pelo ETL ao lado do consolidado (somas por hora, dia, mês e ano, por
+# subsistema e fonte), são calculadas uma vez por versão dos dados e compartilhadas entre os painéis.
+# As somas sobre o consolidado rodam no pandas, em lotes, ou opcionalmente no DuckDB (MOTOR_AGREGACAO),
+# que varre o parquet em paralelo sem montar um DataFrame com as linhas horárias.
+# O detalhe horário (ler_horario) busca só a janela e o subsistema pedidos, sob demanda.
+# Opcionalmente o ETL grava também um espelho do consolidado em Arrow IPC (sem compressão), que os
+# carregamentos mapeiam em memória: vários processos do servidor dividem as mesmas páginas do cache
+# do sistema operacional em vez de cada um guardar a sua cópia do histórico horário.
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# --- Constantes ---
+CONSOLIDATED_FILE = "balanco_energia_consolidado.parquet"
+CONSOLIDATED_DATASET_DIR = "balanco_energia_particionado"
+SIN = 'SISTEMA INTERLIGADO NACIONAL'
+# Colunas de geração e o nome curto usado nas análises
+FONTES = {'val_gerhidraulica': 'Hidraulica', 'val_gertermica': 'Termica', 'val_gereolica': 'Eolica', 'val_gersolar': 'Solar'}
+RENOVAVEIS = ['val_gerhidraulica', 'val_gereolica', 'val_gersolar']
+NOVAS_RENOVAVEIS = ['val_gereolica', 'val_gersolar']
+# Nomes com acento usados nos gráficos da série diária
+NOMES_ACENTUADOS = {'Hidraulica': 'Hidráulica', 'Termica': 'Térmica', 'Eolica': 'Eólica', 'Solar': 'Solar'}
+
+# Cubo de agregados: grão -> unidade do datetime64 usada para truncar o instante (do mais grosso ao mais fino)
+GRAOS = {'ano': 'Y', 'mes': 'M', 'dia': 'D', 'hora': 'h'}
+COLUNAS_DERIVADAS = ['geracao_renovavel', 'geracao_novas_renovaveis', 'geracao_total']
+ESQUEMA_CUBO = pa.schema(
+    [('periodo', pa.timestamp('ms')), ('nom_subsistema', pa.dictionary(pa.int8(), pa.string())), ('linhas', pa.int32())]
+    + [(coluna, pa.float64()) for coluna in list(FONTES) + COLUNAS_DERIVADAS]
+)
+# Grão -> parte do date_trunc do DuckDB equivalente à unidade do datetime64
+TRUNCAMENTO_SQL = {'ano': 'year', 'mes': 'month', 'dia': 'day', 'hora': 'hour'}
+# Motor das somas sobre o consolidado: 'pandas' ou 'duckdb' (opcional: pip install duckdb)
+MOTORES = ['pandas', 'duckdb']
+MOTOR_AGREGACAO = os.environ.get('MOTOR_AGREGACAO', 'pandas')
+LINHAS_POR_GRUPO_CUBO = 250_000
+LINHAS_POR_LOTE_LEITURA = 500_000
+OPCOES_PARQUET_CUBO = {
+    'compression': 'zstd',
+    'use_dictionary': ['nom_subsistema'],
+    'column_encoding': {'periodo': 'DELTA_BINARY_PACKED', 'linhas': 'DELTA_BINARY_PACKED',
+                        **{coluna: 'BYTE_STREAM_SPLIT' for coluna in list(FONTES) + COLUNAS_DERIVADAS}},
+}
+
+Analises = namedtuple('Analises', ['resumo', 'anual', 'regional', 'diario', 'medias'])
+# Janelas (em dias) das médias móveis da série diária guardadas com as análises
+JANELAS_MEDIAS = (30, 90)
+# Janelas oferecidas pelos painéis para as médias móveis (qualquer outra também pode ser pedida)
+OPCOES_JANELAS_MEDIAS = (7, 14, 30, 60, 90, 180, 365)
+# Tipos de média móvel: dos dias anteriores, centrada no dia ou exponencial (span = janela)
+TIPOS_MEDIAS = ['simples', 'centralizada', 'exponencial']
+# Versão do formato das análises guardadas em disco: aumente ao mudar preparar_analises ou as colunas
+VERSAO_ANALISES = 4
+TAMANHO_BLOCO_HASH = 1024 * 1024
+# Cache (LRU) das janelas horárias pedidas pelos painéis: limite de janelas guardadas e de memória
+MAX_JANELAS_HORARIAS = 32
+MAX_MB_JANELAS_HORARIAS = 64
+# Série por janela (serie_na_janela): grãos do mais fino ao mais grosso, com a duração de cada
+# período, e o máximo de períodos devolvidos (cerca de um por pixel de um gráfico largo)
+NIVEIS_JANELA = {'hora': pd.Timedelta(hours=1), 'dia': pd.Timedelta(days=1), 'semana': pd.Timedelta(weeks=1), 'mes': pd.Timedelta(days=365.25 / 12)}
+MAX_PERIODOS_JANELA = 1500
+
+def _expressao_filtro(anos=None, subsistemas=None, inicio=None, fim=None, particionado=True, excluir=None):
+    """
+    Monta a expressão de filtro do pyarrow.dataset. No dataset particionado a faixa de anos vira
+    condição sobre a partição `ano`; no arquivo monolítico, uma faixa sobre `din_instante`.
+    """
+    ano_inicial, ano_final = anos if anos else (None, None)
+    condicoes = []
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        condicoes.append(ds.field('din_instante') >= inicio)
+        ano_inicial = inicio.year if ano_inicial is None else max(ano_inicial, inicio.year)
+    if fim is not None:
+        fim = pd.Timestamp(fim)
+        condicoes.append(ds.field('din_instante') <= fim)
+        ano_final = fim.year if ano_final is None else min(ano_final, fim.year)
+    if ano_inicial is not None:
+        condicoes.append(ds.field('ano') >= ano_inicial if particionado else ds.field('din_instante') >= pd.Timestamp(ano_inicial, 1, 1))
+    if ano_final is not None:
+        condicoes.append(ds.field('ano') <= ano_final if particionado else ds.field('din_instante') < pd.Timestamp(ano_final + 1, 1, 1))
+    if subsistemas is not None:
+        condicoes.append(ds.field('nom_subsistema').isin(list(subsistemas)))
+    if excluir is not None:
+        condicoes.append(~ds.field('nom_subsistema').isin(list(excluir)))
+
+    expressao = None
+    for condicao in condicoes:
+        expressao = condicao if expressao is None else expressao & condicao
+    return expressao
+
+def abrir_dataset(pasta=CONSOLIDATED_DATASET_DIR, arquivo=CONSOLIDATED_FILE):
+    """Abre o dataset particionado se existir (e `pasta` não for None); senão, o arquivo consolidado monolítico."""
+    if pasta and os.path.isdir(pasta):
+        return ds.dataset(pasta, format='parquet', partitioning='hive'), True
+    return ds.dataset(arquivo, format='parquet'), False
+
+def carregar_dados(anos=None, subsistemas=None, inicio=None, fim=None, colunas=None,
+                   pasta=CONSOLIDATED_DATASET_DIR, arquivo=CONSOLIDATED_FILE, excluir=None, ipc=True):
+    """
+    Lê o balanço energético aplicando os filtros na leitura (predicate pushdown).
+    - anos: tupla (ano_inicial, ano_final), inclusiva; qualquer ponta pode ser None.
+    - subsistemas: lista de nomes em `nom_subsistema` (ex.: [SIN]).
+    - excluir: nomes a deixar de fora (ex.: [SIN], para só as regiões).
+    - inicio / fim: janela de datas sobre `din_instante` (também poda as partições de ano).
+    - colunas: colunas a ler; por padrão, todas.
+    - ipc: usa o espelho Arrow IPC do consolidado (abrir_ipc) quando ele existe e está atualizado.
+    No dataset particionado, partições fora dos filtros nem chegam a ser abertas.
+    Do espelho IPC, sem filtros, as colunas numéricas e de data viram pandas sem cópia, apontando
+    para o arquivo mapeado; com filtros, só as linhas selecionadas são copiadas.
+    `nom_subsistema` volta como categoria (do arquivo monolítico e do espelho, já nos códigos int8
+    do dicionário, sem materializar um texto por linha). Os três caminhos devolvem as mesmas colunas:
+    as pedidas em `colunas`, nessa ordem, ou todas na ordem do consolidado mais `ano`.
+    """
+    pedidas = None if colunas is None else list(colunas)
+    mapeado = abrir_ipc(arquivo) if ipc else None
+    if mapeado is not None:
+        dataset, particionado = ds.dataset(mapeado), False
+    else:
+        dataset, particionado = abrir_dataset(pasta, arquivo)
+    quer_ano = colunas is None or 'ano' in colunas
+    if colunas is not None and not particionado:
+        # No arquivo monolítico o ano é derivado da data
+        colunas = [c for c in colunas if c != 'ano'] + (['din_instante'] if quer_ano and 'din_instante' not in colunas else [])
+    filtro = _expressao_filtro(anos, subsistemas, inicio, fim, particionado, excluir)
+    if mapeado is not None and filtro is None:
+        # Só referências ao mapeamento, que é compartilhado: não pode ser destruído na conversão
+        tabela = mapeado.select(colunas) if colunas is not None else mapeado
+        df = tabela.to_pandas(split_blocks=True)
+    else:
+        # self_destruct libera cada coluna Arrow assim que ela vira pandas: o pico não guarda as duas cópias
+        df = dataset.to_table(columns=colunas, filter=filtro).to_pandas(self_destruct=True, split_blocks=True)
+    if quer_ano and 'ano' not in df.columns:
+        df['ano'] = df['din_instante'].dt.year
+    # Derivar o ano pode ter trazido din_instante sem que ele fosse pedido; no dataset particionado
+    # as colunas de partição vêm no fim e o subsistema, como texto
+    if pedidas is not None:
+        df = df[pedidas]
+    elif particionado and os.path.exists(arquivo):
+        df = df[[c for c in pq.read_schema(arquivo).names if c in df.columns] + ['ano']]
+    if 'nom_subsistema' in df.columns and not isinstance(df['nom_subsistema'].dtype, pd.CategoricalDtype):
+        df['nom_subsistema'] = df['nom_subsistema'].astype('category')
+    return df
+
+# ==============================================================================
+# ESPELHO ARROW IPC (MAPEADO EM MEMÓRIA)
+# ==============================================================================
+_ipc_mapeados = {}  # arquivo -> ((versão, versão do espelho), Table apontando para o arquivo mapeado, ou None se desatualizado)
+_trava_ipc = threading.Lock()
+
+def caminho_ipc(arquivo=CONSOLIDATED_FILE):
+    """O espelho fica ao lado do consolidado: balanco_energia_consolidado.parquet -> balanco_energia_consolidado.arrow."""
+    return f"{os.path.splitext(arquivo)[0]}.arrow"
+
+def gravar_ipc(arquivo=CONSOLIDATED_FILE, arquivo_ipc=None):
+    """
+    Grava o consolidado em `arquivo_ipc` (por padrão, caminho_ipc(arquivo)) no formato Arrow IPC
+    (Feather v2) sem compressão e em um único record batch: mapeado em memória, cada coluna é um
+    bloco contíguo que o pandas usa sem cópia. A versão do consolidado de origem vai nos metadados.
+    Monta o arquivo coluna a coluna, então o pico de memória fica perto do tamanho da tabela Arrow.
+    Devolve o número de linhas.
+    """
+    arquivo_ipc = arquivo_ipc or caminho_ipc(arquivo)
+    origem = pq.ParquetFile(arquivo)
+    esquema = origem.schema_arrow.remove_metadata().with_metadata({'versao_consolidado': json.dumps(versao_dos_dados(arquivo))})
+    colunas = []
+    for campo in esquema:
+        coluna = origem.read(columns=[campo.name])
+        if pa.types.is_dictionary(campo.type):
+            coluna = coluna.unify_dictionaries()  # um row group, um dicionário: junta num só para emendar os pedaços
+        colunas.append(coluna[campo.name].combine_chunks())
+        del coluna
+    tabela = pa.Table.from_arrays(colunas, schema=esquema)
+    del colunas
+
+    temporario = arquivo_ipc + '.tmp'
+    with pa.OSFile(temporario, 'wb') as saida, pa.ipc.new_file(saida, esquema) as writer:
+        writer.write_table(tabela)
+    os.replace(temporario, arquivo_ipc)  # quem já mapeou o arquivo antigo continua lendo a versão dele
+    return tabela.num_rows
+
+def abrir_ipc(arquivo=CONSOLIDATED_FILE):
+    """
+    Devolve o consolidado como Table mapeada do espelho IPC (nada é lido do disco até ser usado),
+    ou None se o espelho não existe ou foi gravado a partir de outra versão do consolidado.
+    O resultado, mapeamento ou None, vale por versão do consolidado e do espelho e é reaproveitado
+    pelo processo: um espelho desatualizado não é reaberto a cada chamada.
+    """
+    arquivo_ipc = caminho_ipc(arquivo)
+    if not os.path.exists(arquivo_ipc) or not os.path.exists(arquivo):
+        return None
+    chave = os.path.abspath(arquivo)
+    with _trava_ipc:
+        versao = versao_dos_dados(arquivo)
+        versoes = (versao, versao_dos_dados(arquivo_ipc))
+        mapeado = _ipc_mapeados.get(chave)
+        if mapeado is not None and mapeado[0] == versoes:
+            return mapeado[1]
+        _ipc_mapeados.pop(chave, None)
+        leitor = pa.ipc.open_file(pa.memory_map(arquivo_ipc))
+        if json.loads((leitor.schema.metadata or {}).get(b'versao_consolidado', b'null')) != versao:
+            tabela = None
+        else:
+            tabela = leitor.read_all()
+        _ipc_mapeados[chave] = (versoes, tabela)
+        return tabela
+
+# ==============================================================================
+# CUBO DE AGREGADOS
+# ==============================================================================
+def caminho_cubo(arquivo=CONSOLIDATED_FILE):
+    """O cubo fica ao lado do consolidado: balanco_energia_consolidado.parquet -> balanco_energia_consolidado_cubo.parquet."""
+    raiz, extensao = os.path.splitext(arquivo)
+    return f"{raiz}_cubo{extensao}"
+
+def versao_dos_dados(arquivo=CONSOLIDATED_FILE):
+    """Identifica o conteúdo do consolidado: muda sempre que o ETL grava o arquivo de novo."""
+    info = os.stat(arquivo)
+    return [info.st_mtime_ns, info.st_size]
+
+def _agregar(df, unidade, coluna_tempo='periodo'):
+    """
+    Soma as fontes de `df` por (período, subsistema), com o período truncado na `unidade` do datetime64.
+    `linhas` conta as linhas do consolidado somadas em cada período (já existente nas agregações do próprio cubo).
+    """
+    periodo = df[coluna_tempo].to_numpy().astype(f'datetime64[{unidade}]').astype('datetime64[ms]')
+    grupos = df.groupby([periodo, df['nom_subsistema']], sort=True, observed=True)
+    if 'linhas' in df.columns:
+        somas = grupos[list(FONTES) + ['linhas']].sum()
+    else:
+        somas = grupos[list(FONTES)].sum()
+        somas['linhas'] = grupos.size()
+    somas = somas.rename_axis(['periodo', 'nom_subsistema']).reset_index()
+    somas['nom_subsistema'] = somas['nom_subsistema'].astype(str)  # uma linha por período, não por linha lida
+    return somas
+
+def montar_cubo(arquivo=CONSOLIDATED_FILE, graos=GRAOS, subsistemas=None, motor=None, anos=None):
+    """
+    Calcula o cubo de agregados do consolidado, em lotes: só as colunas de data, subsistema e
+    geração são lidas e, com `subsistemas`, o filtro é aplicado na leitura.
+    Devolve {grão: DataFrame(periodo, nom_subsistema, linhas, fontes..., derivadas...)} para os `graos` pedidos.
+    Cada grão sai do grão imediatamente mais fino (as somas são aditivas), então o consolidado é lido uma vez só.
+    `motor` ('pandas' ou 'duckdb', veja escolher_motor) decide onde as somas são feitas; o resultado tem
+    as mesmas linhas, na mesma ordem e com os mesmos tipos nos dois.
+    Com `anos`, só as linhas desses anos são lidas (os row groups dos outros anos nem são abertos).
+    """
+    ordem = [grao for grao in GRAOS if grao in graos]  # do mais grosso ao mais fino
+    if escolher_motor(motor) == 'duckdb':
+        return _montar_cubo_duckdb(arquivo, ordem, subsistemas, anos)
+    dataset = ds.dataset(arquivo, format='parquet')
+    filtro = _expressao_filtro(subsistemas=subsistemas, particionado=False)
+    if anos is not None:
+        por_ano = None
+        for ano in sorted(anos):
+            condicao = (ds.field('din_instante') >= pd.Timestamp(ano, 1, 1)) & (ds.field('din_instante') < pd.Timestamp(ano + 1, 1, 1))
+            por_ano = condicao if por_ano is None else por_ano | condicao
+        filtro = por_ano if filtro is None else filtro & por_ano
+    partes = []
+    for lote in dataset.to_batches(columns=['din_instante', 'nom_subsistema'] + list(FONTES), filter=filtro,
+                                   batch_size=LINHAS_POR_LOTE_LEITURA):
+        if lote.num_rows == 0:
+            continue
+        df = lote.to_pandas().astype({coluna: 'float64' for coluna in FONTES})
+        partes.append(_agregar(df, GRAOS[ordem[-1]], 'din_instante'))
+        del df
+    colunas = ['periodo', 'nom_subsistema', 'linhas'] + list(FONTES)
+    base = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=colunas)
+    # Um período pode ter ficado dividido entre dois lotes: soma de novo no próprio grão
+    cubo = {ordem[-1]: _agregar(base, GRAOS[ordem[-1]])}
+    for fino, grosso in zip(reversed(ordem), list(reversed(ordem))[1:]):
+        cubo[grosso] = _agregar(cubo[fino], GRAOS[grosso])
+    return {grao: _completar_cubo(cubo[grao]) for grao in ordem}
+
+def _montar_cubo_duckdb(arquivo, ordem, subsistemas=None, anos=None):
+    """
+    montar_cubo no DuckDB: o grão mais fino é somado direto do parquet (varredura em paralelo, só
+    com as colunas usadas) e os mais grossos saem dele, na mesma hierarquia do caminho pandas.
+    Só as tabelas de agregados, com poucas linhas, chegam ao pandas.
+    """
+    import duckdb
+
+    somas = ', '.join(f"fsum({coluna}::DOUBLE) AS {coluna}" for coluna in FONTES)  # soma compensada, como no pandas
+
+    condicoes = ['din_instante IS NOT NULL', 'nom_subsistema IS NOT NULL']  # o groupby do pandas descarta chaves nulas
+    parametros = []
+    if subsistemas is not None:
+        condicoes.append(f"nom_subsistema::VARCHAR IN ({', '.join('?' for _ in subsistemas)})")
+        parametros = list(subsistemas)
+    if anos is not None:
+        condicoes.append('(' + ' OR '.join('(din_instante >= ? AND din_instante < ?)' for _ in anos) + ')')
+        for ano in sorted(anos):
+            parametros += [pd.Timestamp(ano, 1, 1).to_pydatetime(), pd.Timestamp(ano + 1, 1, 1).to_pydatetime()]
+    caminho = arquivo.replace("'", "''")
+    conexao = duckdb.connect()
+    try:
+        conexao.execute(f"""
+            CREATE TEMP TABLE fino AS
+            SELECT date_trunc('{TRUNCAMENTO_SQL[ordem[-1]]}', din_instante) AS periodo, nom_subsistema::VARCHAR AS nom_subsistema,
+                   count(*) AS linhas, {somas}
+            FROM read_parquet('{caminho}')
+            WHERE {' AND '.join(condicoes)}
+            GROUP BY ALL
+        """, parametros)
+        cubo = {}
+        for grao in ordem:
+            df = conexao.execute(f"""
+                SELECT date_trunc('{TRUNCAMENTO_SQL[grao]}', periodo) AS periodo, nom_subsistema,
+                       sum(linhas)::BIGINT AS linhas, {somas}
+                FROM fino GROUP BY ALL ORDER BY periodo, nom_subsistema
+            """).df()
+            df = df.astype({'periodo': 'datetime64[ms]', 'nom_subsistema': str})
+            cubo[grao] = _completar_cubo(df)
+    finally:
+        conexao.close()
+    return cubo
+
+def _completar_cubo(tabela):
+    """Acrescenta as colunas derivadas às somas de um grão e põe as colunas na ordem do ESQUEMA_CUBO."""
+    tabela['geracao_renovavel'] = tabela[RENOVAVEIS].sum(axis=1)
+    tabela['geracao_novas_renovaveis'] = tabela[NOVAS_RENOVAVEIS].sum(axis=1)
+    tabela['geracao_total'] = tabela['geracao_renovavel'] + tabela['val_gertermica']
+    return tabela[ESQUEMA_CUBO.names]
+
+def escolher_motor(motor=None):
+    """
+    Motor de agregação a usar: `motor` ou, se None, MOTOR_AGREGACAO (variável de ambiente de mesmo nome).
+    Sem o duckdb instalado, segue no pandas com um aviso.
+    """
+    motor = motor or MOTOR_AGREGACAO
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de agregação desconhecido: '{motor}' (use {' ou '.join(MOTORES)}).")
+    if motor == 'duckdb':
+        try:
+            import duckdb  # noqa: F401
+        except ImportError:
+            print("AVISO: o duckdb não está instalado; as agregações seguem no pandas.")
+            return 'pandas'
+    return motor
+
+def gravar_cubo(arquivo=CONSOLIDATED_FILE, arquivo_cubo=None):
+    """
+    Grava o cubo de agregados de `arquivo` em `arquivo_cubo` (por padrão, caminho_cubo(arquivo)).
+    Cada grão ocupa seus próprios row groups, anotados nos metadados junto com a versão do
+    consolidado de origem, para que os painéis leiam só o grão de que precisam.
+    Devolve o número de linhas de cada grão.
+    """
+    arquivo_cubo = arquivo_cubo or caminho_cubo(arquivo)
+    versao = versao_dos_dados(arquivo)
+    return _gravar_tabelas_cubo(montar_cubo(arquivo), arquivo_cubo, versao)
+
+def atualizar_cubo(arquivo=CONSOLIDATED_FILE, anos=(), arquivo_cubo=None):
+    """
+    Atualiza o cubo gravado depois que o ETL regravou só os `anos` do consolidado: as somas desses
+    anos são refeitas lendo só as linhas deles, e os demais períodos do cubo ficam como estavam.
+    O custo acompanha o tamanho dos anos alterados, não o do histórico inteiro.
+    O cubo gravado precisa corresponder ao consolidado de antes da regravação (o ETL confere com
+    abrir_cubo antes de gravar); senão, use gravar_cubo. Devolve o número de linhas de cada grão.
+    """
+    arquivo_cubo = arquivo_cubo or caminho_cubo(arquivo)
+    versao = versao_dos_dados(arquivo)
+    gravado = pq.ParquetFile(arquivo_cubo)
+    grupos = json.loads(gravado.schema_arrow.metadata[b'cubo'])['graos']
+    novos = montar_cubo(arquivo, anos=anos)
+    cubo = {}
+    for grao, tabela in novos.items():
+        antigo = gravado.read_row_groups(grupos[grao]).to_pandas() if grupos.get(grao) else tabela.iloc[:0]
+        antigo = antigo.astype({'nom_subsistema': str, 'linhas': tabela['linhas'].dtype})
+        antigo = antigo[~antigo['periodo'].dt.year.isin(list(anos))]
+        # Cada período vem inteiro de um dos lados: ordenar só pelo período mantém a ordem dos subsistemas
+        cubo[grao] = pd.concat([antigo, tabela], ignore_index=True).sort_values('periodo', kind='stable', ignore_index=True)
+    return _gravar_tabelas_cubo(cubo, arquivo_cubo, versao)
+
+def _gravar_tabelas_cubo(cubo, arquivo_cubo, versao):
+    """Grava o {grão: DataFrame} do cubo, um conjunto de row groups por grão, e devolve as linhas de cada grão."""
+    grupos, proximo = {}, 0
+    for grao, tabela in cubo.items():
+        quantidade = -(-len(tabela) // LINHAS_POR_GRUPO_CUBO)
+        grupos[grao] = list(range(proximo, proximo + quantidade))
+        proximo += quantidade
+    info = {'graos': grupos, 'versao_consolidado': versao}
+    esquema = ESQUEMA_CUBO.with_metadata({'cubo': json.dumps(info)})
+
+    temporario = arquivo_cubo + '.tmp'
+    with pq.ParquetWriter(temporario, esquema, **OPCOES_PARQUET_CUBO) as writer:
+        for tabela in cubo.values():
+            if len(tabela):
+                writer.write_table(pa.Table.from_pandas(tabela, preserve_index=False).cast(esquema),
+                                   row_group_size=LINHAS_POR_GRUPO_CUBO)
+    os.replace(temporario, arquivo_cubo)
+    return {grao: len(tabela) for grao, tabela in cubo.items()}
+
+def abrir_cubo(arquivo=CONSOLIDATED_FILE):
+    """
+    Abre o cubo de `arquivo` e devolve (ParquetFile, {grão: row groups}), ou None se o cubo não
+    existe ou foi gerado a partir de outra versão do consolidado.
+    """
+    arquivo_cubo = caminho_cubo(arquivo)
+    if not os.path.exists(arquivo_cubo) or not os.path.exists(arquivo):
+        return None
+    cubo = pq.ParquetFile(arquivo_cubo)
+    info = json.loads((cubo.schema_arrow.metadata or {}).get(b'cubo', b'{}'))
+    if info.get('versao_consolidado') != versao_dos_dados(arquivo):
+        return None
+    return cubo, info['graos']
+
+def ler_cubo(grao, arquivo=CONSOLIDATED_FILE, subsistemas=None):
+    """
+    Lê um grão ('ano', 'mes', 'dia' ou 'hora') do cubo: só os row groups desse grão são lidos.
+    Sem cubo válido em disco, calcula o grão a partir do consolidado, já filtrando os `subsistemas` na leitura.
+    """
+    aberto = abrir_cubo(arquivo)
+    if aberto is None:
+        return montar_cubo(arquivo, [grao], subsistemas)[grao]
+    cubo, grupos = aberto
+    df = cubo.read_row_groups(grupos[grao]).to_pandas()
+    df['nom_subsistema'] = df['nom_subsistema'].astype(str)
+    if subsistemas is not None:
+        df = df[df['nom_subsistema'].isin(list(subsistemas))].reset_index(drop=True)
+    return df
+
+# ==============================================================================
+# ANÁLISES COMPARTILHADAS ENTRE OS PAINÉIS
+# ==============================================================================
+_analises_em_memoria = {}  # arquivo -> (versão, Analises)
+_regionais_em_memoria = {}  # (arquivo, grão) -> (versão, DataFrame das métricas regionais)
+_medias_em_memoria = {}  # arquivo -> (versão, {(tipo, janela): DataFrame das médias dessa janela})
+_trava_analises = threading.Lock()
+
+def _percentual(parte, total):
+    """parte / total em %, com 0 onde o total é zero."""
+    return (parte / total.replace(0, np.nan) * 100).fillna(0)
+
+def resumo_do_consolidado(arquivo=CONSOLIDATED_FILE, subsistemas=None):
+    """Linhas, colunas e período do consolidado, lidos só do rodapé do parquet (estatísticas dos row groups)."""
+    metadados = pq.ParquetFile(arquivo).metadata
+    posicao = metadados.schema.to_arrow_schema().get_field_index('din_instante')
+    estatisticas = [metadados.row_group(i).column(posicao).statistics for i in range(metadados.num_row_groups)]
+    estatisticas = [e for e in estatisticas if e is not None and e.has_min_max]
+    return {
+        'linhas': metadados.num_rows,
+        'colunas': metadados.schema.to_arrow_schema().names + ['ano'],
+        'inicio': pd.Timestamp(min(e.min for e in estatisticas)) if estatisticas else None,
+        'fim': pd.Timestamp(max(e.max for e in estatisticas)) if estatisticas else None,
+        'subsistemas': subsistemas,
+    }
+
+def _resumo_das_analises(arquivo, cubo_anual, cubo_diario):
+    """
+    resumo_do_consolidado para as Analises: se o rodapé não tem as estatísticas de din_instante
+    (consolidados antigos), o período sai do primeiro e do último dia do cubo.
+    """
+    resumo = resumo_do_consolidado(arquivo, cubo_anual['nom_subsistema'].nunique())
+    if resumo['inicio'] is None and len(cubo_diario):
+        resumo.update(inicio=pd.Timestamp(cubo_diario['periodo'].min()), fim=pd.Timestamp(cubo_diario['periodo'].max()))
+    return resumo
+
+def preparar_regional(cubo, grao='ano'):
+    """
+    Métricas dos subsistemas (exceto o SIN) a partir de um grão do cubo, num único passo vetorizado:
+    as somas viram matrizes período x subsistema (um unstack), cada métrica é uma conta entre matrizes
+    alinhadas (o SIN é só mais uma coluna, então não há merge com o total nacional) e o resultado
+    volta ao formato longo, uma linha por (periodo, nom_subsistema):
+    - geracao_renovavel_regiao, geracao_total_regiao e perc_renovavel_interno;
+    - total_renovavel_brasil (do SIN) e contribuicao_perc_nacional (peso da região no renovável do país);
+    - perc_hidraulica, perc_termica, perc_eolica e perc_solar: fatia de cada fonte na geração da região;
+    - crescimento_renovavel_regiao e crescimento_total_regiao: variação % sobre o mesmo período do
+      ano anterior (NaN se ele não existe ou é zero).
+    `grao` só documenta a origem: o ano anterior é sempre o período - 1 ano, em qualquer grão.
+    """
+    largo = cubo.set_index(['periodo', 'nom_subsistema'])[list(FONTES) + ['geracao_renovavel', 'geracao_total']]
+    largo = largo.unstack('nom_subsistema')
+    renovavel, total = largo['geracao_renovavel'], largo['geracao_total']
+    regioes = [nome for nome in renovavel.columns if nome != SIN]
+    brasil = renovavel[SIN] if SIN in renovavel.columns else pd.Series(np.nan, index=renovavel.index)
+
+    metricas = {
+        'geracao_renovavel_regiao': renovavel[regioes],
+        'geracao_total_regiao': total[regioes],
+        'perc_renovavel_interno': _percentual(renovavel[regioes], total[regioes]),
+        'total_renovavel_brasil': pd.DataFrame({nome: brasil for nome in regioes}, index=renovavel.index),
+        'contribuicao_perc_nacional': renovavel[regioes].div(brasil, axis=0) * 100,
+    }
+    for coluna, nome in FONTES.items():
+        metricas[f'perc_{nome.lower()}'] = _percentual(largo[coluna][regioes], total[regioes])
+    ano_anterior = renovavel.index - pd.DateOffset(years=1)
+    for medida, nome in [('geracao_renovavel_regiao', 'crescimento_renovavel_regiao'), ('geracao_total_regiao', 'crescimento_total_regiao')]:
+        anterior = metricas[medida].reindex(ano_anterior).set_axis(renovavel.index)
+        metricas[nome] = (metricas[medida] / anterior.replace(0, np.nan) - 1) * 100
+
+    regional = pd.concat(metricas, axis=1).stack('nom_subsistema')
+    regional = regional.dropna(subset=['geracao_total_regiao'])  # região sem linhas naquele período
+    return regional.reset_index()
+
+def preparar_analises(cubo_anual, cubo_diario):
+    """
+    Monta, a partir dos grãos 'ano' e 'dia' do cubo, as análises usadas pelos painéis:
+    - anual: SIN por ano (somas por fonte, totais, percentuais e crescimento ano a ano);
+    - regional: subsistemas (exceto o SIN) por ano, com o % renovável interno e a contribuição
+      de cada um para o total renovável do país;
+    - diario: geração diária do SIN por fonte.
+    """
+    return _analise_anual(cubo_anual), _analise_regional(cubo_anual), _serie_diaria(cubo_diario)
+
+def _analise_anual(cubo_anual):
+    """SIN por ano: somas por fonte, totais, percentuais e crescimento ano a ano (em relação à linha anterior)."""
+    somas = cubo_anual.assign(ano=cubo_anual['periodo'].dt.year).set_index(['ano', 'nom_subsistema'])
+    somas = somas.rename(columns={'geracao_renovavel': 'total_renovavel', 'geracao_novas_renovaveis': 'total_novas_renovaveis',
+                                  'geracao_total': 'total_geral'})
+
+    anual = somas.xs(SIN, level='nom_subsistema')[list(FONTES) + ['total_renovavel', 'total_novas_renovaveis', 'total_geral']]
+    anual = anual.rename(columns=FONTES)
+    for nome in FONTES.values():
+        anual[f'total_{nome.lower()}'] = anual[nome]
+    anual['geracao_total_anual'] = anual['total_geral']
+    anual['perc_renovavel_total'] = _percentual(anual['total_renovavel'], anual['total_geral'])
+    anual['perc_novas_renovaveis'] = _percentual(anual['total_novas_renovaveis'], anual['total_geral'])
+    for nome in FONTES.values():
+        anual[f'perc_{nome.lower()}'] = _percentual(anual[nome], anual['total_geral'])
+    anual['crescimento_eolica'] = anual['perc_eolica'].pct_change() * 100
+    anual['crescimento_solar'] = anual['perc_solar'].pct_change() * 100
+    anual['crescimento_renovavel_total'] = anual['perc_renovavel_total'].pct_change() * 100
+    anual['crescimento_novas_renovaveis'] = anual['perc_novas_renovaveis'].pct_change() * 100
+    anual['crescimento_total'] = anual['total_geral'].pct_change() * 100
+    return anual.reset_index()
+
+def _analise_regional(cubo_anual):
+    """preparar_regional no grão anual, com o período trocado pela coluna `ano`."""
+    regional = preparar_regional(cubo_anual, 'ano')
+    regional.insert(0, 'ano', regional.pop('periodo').dt.year)
+    return regional
+
+def _serie_diaria(cubo_diario):
+    """Geração diária do SIN por fonte, sem dias faltando (dias sem linhas ficam com zero)."""
+    diario = cubo_diario.loc[cubo_diario['nom_subsistema'] == SIN, ['periodo'] + list(FONTES)]
+    return diario.set_index('periodo').rename_axis('din_instante').asfreq('D', fill_value=0.0).rename(columns=FONTES)
+
+def medias_moveis(diario, janelas=JANELAS_MEDIAS, tipo='simples'):
+    """
+    Médias móveis de todas as fontes da série diária, uma coluna '<fonte>_<janela>d' por janela:
+    - 'simples': média dos `janela` dias até o dia (como rolling(janela).mean(), NaN até a janela encher);
+    - 'centralizada': a mesma média, com a janela centrada no dia (rolling(janela, center=True));
+    - 'exponencial': média exponencial com span = janela (ewm(span=janela, adjust=False)).
+    As médias simples e centralizadas saem de uma única soma acumulada da matriz dias x fontes:
+    cada janela, de qualquer tamanho, é só uma subtração entre linhas dessa soma.
+    """
+    if tipo not in TIPOS_MEDIAS:
+        raise ValueError(f"Tipo de média móvel desconhecido: '{tipo}' (use {', '.join(TIPOS_MEDIAS)}).")
+    valores = diario.to_numpy(dtype=np.float64)
+    if tipo == 'exponencial':
+        medias = {janela: diario.ewm(span=janela, adjust=False).mean().to_numpy() for janela in janelas}
+    else:
+        # Linha i das somas = soma dos i primeiros dias; dias sem valor (NaN) deixam a janela incompleta.
+        # Os valores são somados já descontada a média de cada fonte: a soma acumulada fica pequena e a
+        # subtração entre linhas dela não perde os algarismos das janelas de valores baixos.
+        validos = np.isfinite(valores)
+        centro = np.where(validos.any(axis=0), np.nanmean(np.where(validos, valores, np.nan), axis=0), 0.0) if validos.size else 0.0
+        somas = np.zeros((len(valores) + 1, valores.shape[1]))
+        np.cumsum(np.where(validos, valores - centro, 0.0), axis=0, out=somas[1:])
+        contagens = np.zeros(somas.shape, dtype=np.int64)
+        np.cumsum(validos, axis=0, out=contagens[1:])
+        medias = {}
+        for janela in janelas:
+            media = np.full(valores.shape, np.nan)
+            if janela <= len(valores):
+                # A janela que começa no dia k fica no dia k + janela - 1 (ou no meio dela, se centralizada)
+                posicao = janela // 2 if tipo == 'centralizada' else janela - 1
+                completa = (contagens[janela:] - contagens[:-janela]) == janela
+                media[posicao:posicao + len(valores) - janela + 1] = np.where(completa, (somas[janela:] - somas[:-janela]) / janela + centro, np.nan)
+            medias[janela] = media
+    return pd.DataFrame({f'{fonte}_{janela}d': medias[janela][:, j] for janela in janelas for j, fonte in enumerate(diario.columns)},
+                        index=diario.index)
+
+def atualizar_cauda_analises(anteriores, cubo_anual, cubo_diario, desde, resumo):
+    """
+    Analises novas a partir das `anteriores`, quando só os anos a partir de `desde` mudaram: o que
+    vem antes é reaproveitado e só a cauda é recalculada, com o mínimo de histórico que ela precisa
+    (o último ano anterior, para as variações ano a ano; a maior janela, para as médias móveis).
+    O resultado é o mesmo de preparar_analises sobre o cubo inteiro (a menos do arredondamento das médias).
+    """
+    inicio = pd.Timestamp(desde, 1, 1)
+    anteriores_ao_inicio = cubo_anual.loc[cubo_anual['periodo'] < inicio, 'periodo']
+    cauda_anual = cubo_anual[cubo_anual['periodo'] >= (anteriores_ao_inicio.max() if len(anteriores_ao_inicio) else inicio)]
+    anual, regional = _analise_anual(cauda_anual), _analise_regional(cauda_anual)
+    anual = pd.concat([anteriores.anual[anteriores.anual['ano'] < desde], anual[anual['ano'] >= desde]], ignore_index=True)
+    regional = pd.concat([anteriores.regional[anteriores.regional['ano'] < desde], regional[regional['ano'] >= desde]], ignore_index=True)
+
+    cauda = _serie_diaria(cubo_diario[cubo_diario['periodo'] >= inicio])
+    diario = pd.concat([anteriores.diario[anteriores.diario.index < inicio], cauda]).asfreq('D', fill_value=0.0)
+    # As médias dos dias novos partem de uma janela antes deles, já com os dias faltando preenchidos
+    janela = diario[diario.index >= inicio - pd.Timedelta(days=max(JANELAS_MEDIAS) - 1)]
+    medias = pd.concat([anteriores.medias[anteriores.medias.index < inicio], medias_moveis(janela)[janela.index >= inicio]])
+    return Analises(resumo, anual, regional, diario, medias.reindex(diario.index))
+
+# --- Cache em disco das análises (sobrevive a reinícios do servidor) ---
+def pasta_cache_analises(arquivo=CONSOLIDATED_FILE):
+    """As análises prontas ficam ao lado do consolidado: balanco_energia_consolidado_analises/."""
+    return f"{os.path.splitext(arquivo)[0]}_analises"
+
+def _sha256(arquivo):
+    digest = hashlib.sha256()
+    with open(arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+def _ler_indice(arquivo):
+    """Última impressão digital calculada para `arquivo` (ou {} se não houver)."""
+    try:
+        with open(os.path.join(pasta_cache_analises(arquivo), 'indice.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _gravar_indice(arquivo, impressao):
+    pasta = pasta_cache_analises(arquivo)
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, 'indice.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(impressao, f)
+    os.replace(os.path.join(pasta, 'indice.json.tmp'), os.path.join(pasta, 'indice.json'))
+
+def impressao_digital(arquivo=CONSOLIDATED_FILE):
+    """
+    Identidade do conteúdo do consolidado: sha256, mtime, tamanho e a versão do formato das análises.
+    O sha256 só é recalculado quando mtime ou tamanho mudam; senão vem do índice do cache.
+    """
+    mtime_ns, tamanho = versao_dos_dados(arquivo)
+    indice = _ler_indice(arquivo)
+    if indice.get('mtime_ns') == mtime_ns and indice.get('tamanho') == tamanho and indice.get('sha256'):
+        sha256 = indice['sha256']
+    else:
+        sha256 = _sha256(arquivo)
+    return {'sha256': sha256, 'mtime_ns': mtime_ns, 'tamanho': tamanho, 'versao_analises': VERSAO_ANALISES}
+
+def _nome_entrada(impressao):
+    return f"{impressao['sha256'][:16]}-v{impressao['versao_analises']}"
+
+def cache_de_figuras(arquivo=CONSOLIDATED_FILE):
+    """
+    (versão, pasta) para o graficos.figura_em_cache guardar as figuras prontas dos painéis: a versão é
+    o sha256 do consolidado e a pasta fica dentro da entrada do cache das análises desta versão, então
+    é descartada junto com ela quando o consolidado muda. Sem a entrada em disco, a pasta é None.
+    """
+    impressao = impressao_digital(arquivo)
+    entrada = os.path.join(pasta_cache_analises(arquivo), _nome_entrada(impressao))
+    return impressao['sha256'], (os.path.join(entrada, 'figuras') if os.path.isdir(entrada) else None)
+
+def ler_cache_analises(arquivo, impressao):
+    """Analises guardadas em disco para esta impressão digital, ou None se não houver."""
+    entrada = os.path.join(pasta_cache_analises(arquivo), _nome_entrada(impressao))
+    try:
+        with open(os.path.join(entrada, 'resumo.json'), encoding='utf-8') as f:
+            resumo = json.load(f)
+        anual = pd.read_parquet(os.path.join(entrada, 'anual.parquet'))
+        regional = pd.read_parquet(os.path.join(entrada, 'regional.parquet'))
+        diario = pd.read_parquet(os.path.join(entrada, 'diario.parquet')).asfreq('D')
+        medias = pd.read_parquet(os.path.join(entrada, 'medias.parquet')).asfreq('D')
+    except (OSError, ValueError):
+        return None
+    resumo['inicio'] = pd.Timestamp(resumo['inicio']) if resumo['inicio'] else None
+    resumo['fim'] = pd.Timestamp(resumo['fim']) if resumo['fim'] else None
+    return Analises(resumo, anual, regional, diario, medias)
+
+def gravar_cache_analises(arquivo, impressao, analises):
+    """
+    Guarda as análises em disco sob a impressão digital do consolidado e descarta as entradas de
+    versões anteriores. A entrada é montada numa pasta temporária e renomeada no fim, então um
+    painel lendo ao mesmo tempo nunca vê uma entrada pela metade.
+    """
+    pasta = pasta_cache_analises(arquivo)
+    nome = _nome_entrada(impressao)
+    temporaria = os.path.join(pasta, f".{nome}.{os.getpid()}.tmp")
+    os.makedirs(temporaria, exist_ok=True)
+    resumo = dict(analises.resumo, inicio=analises.resumo['inicio'] and analises.resumo['inicio'].isoformat(),
+                  fim=analises.resumo['fim'] and analises.resumo['fim'].isoformat())
+    with open(os.path.join(temporaria, 'resumo.json'), 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False)
+    analises.anual.to_parquet(os.path.join(temporaria, 'anual.parquet'))
+    analises.regional.to_parquet(os.path.join(temporaria, 'regional.parquet'))
+    analises.diario.to_parquet(os.path.join(temporaria, 'diario.parquet'))
+    analises.medias.to_parquet(os.path.join(temporaria, 'medias.parquet'))
+    for antiga in os.listdir(pasta):
+        if antiga not in (nome, os.path.basename(temporaria), 'indice.json') and not antiga.endswith('.tmp'):
+            shutil.rmtree(os.path.join(pasta, antiga), ignore_errors=True)
+    if os.path.exists(os.path.join(pasta, nome)):
+        shutil.rmtree(temporaria, ignore_errors=True)  # outro processo gravou a mesma entrada
+    else:
+        os.replace(temporaria, os.path.join(pasta, nome))
+    _gravar_indice(arquivo, impressao)
+
+def calcular_analises(arquivo=CONSOLIDATED_FILE):
+    """
+    Calcula as Analises do consolidado: lê só os grãos 'ano' e 'dia' do cubo gravado pelo ETL
+    (alguns kilobytes); se o cubo não existe ou está desatualizado, calcula esses grãos a partir
+    do consolidado, em lotes.
+    """
+    if abrir_cubo(arquivo) is None:
+        cubo = montar_cubo(arquivo, ['ano', 'dia'])
+        cubo_anual, cubo_diario = cubo['ano'], cubo['dia']
+    else:
+        cubo_anual, cubo_diario = ler_cubo('ano', arquivo), ler_cubo('dia', arquivo)
+    resumo = _resumo_das_analises(arquivo, cubo_anual, cubo_diario)
+    anual, regional, diario = preparar_analises(cubo_anual, cubo_diario)
+    return Analises(resumo, anual, regional, diario, medias_moveis(diario))
+
+def atualizar_analises(arquivo=CONSOLIDATED_FILE, anos=None, versao_anterior=None):
+    """
+    Renova o cache em disco das análises depois que o ETL regravou os `anos` do consolidado (e
+    atualizou o cubo): parte das análises guardadas para a `versao_anterior` do consolidado (a de
+    antes da regravação, como devolvida por versao_dos_dados) e recalcula só a cauda a partir do
+    primeiro ano alterado (atualizar_cauda_analises). Sem `anos`, ou se o cache não tem as análises
+    daquela versão, calcula tudo. Devolve o primeiro ano recalculado, ou None quando recalculou tudo.
+    """
+    indice = _ler_indice(arquivo)
+    impressao = impressao_digital(arquivo)
+    if indice.get('sha256') == impressao['sha256'] and indice.get('versao_analises') == VERSAO_ANALISES:
+        return min(anos) if anos else None  # conteúdo igual ao já guardado
+    anteriores = None
+    if anos and indice.get('sha256') and [indice.get('mtime_ns'), indice.get('tamanho')] == versao_anterior:
+        anteriores = ler_cache_analises(arquivo, indice)
+    if anteriores is None or abrir_cubo(arquivo) is None:
+        analises, desde = calcular_analises(arquivo), None
+    else:
+        desde = min(anos)
+        cubo_anual, cubo_diario = ler_cubo('ano', arquivo), ler_cubo('dia', arquivo)
+        resumo = _resumo_das_analises(arquivo, cubo_anual, cubo_diario)
+        analises = atualizar_cauda_analises(anteriores, cubo_anual, cubo_diario, desde, resumo)
+    gravar_cache_analises(arquivo, impressao, analises)
+    return desde
+
+def carregar_analises(arquivo=CONSOLIDATED_FILE):
+    """
+    Devolve as Analises (resumo, anual, regional, diario) do arquivo consolidado, procurando em ordem:
+    - na memória deste processo, pela versão (mtime e tamanho) do arquivo: todos os painéis e
+      sessões servidos pelo mesmo servidor recebem os mesmos DataFrames;
+    - no cache em disco, pela impressão digital (sha256, mtime e versão do formato): um servidor
+      reiniciado não recalcula nada enquanto o consolidado não mudar;
+    - calculando de novo (calcular_analises), o que também renova o cache em disco.
+    Quando o ETL regrava o arquivo, a versão muda e as entradas antigas são descartadas.
+    Os DataFrames são compartilhados: quem precisar alterá-los deve trabalhar sobre uma cópia
+    (renomear colunas já devolve um objeto novo, sem duplicar os dados).
+    """
+    chave = os.path.abspath(arquivo)
+    with _trava_analises:
+        versao = versao_dos_dados(arquivo)
+        em_memoria = _analises_em_memoria.get(chave)
+        if em_memoria is not None and em_memoria[0] == versao:
+            return em_memoria[1]
+        _analises_em_memoria.pop(chave, None)  # libera a versão antiga antes de carregar a nova
+        impressao = impressao_digital(arquivo)
+        analises = ler_cache_analises(arquivo, impressao)
+        if analises is None:
+            analises = calcular_analises(arquivo)
+            try:
+                gravar_cache_analises(arquivo, impressao, analises)
+            except OSError as e:  # pasta sem permissão de escrita, disco cheio: segue só com a memória
+                print(f"AVISO: não foi possível guardar as análises em '{pasta_cache_analises(arquivo)}': {e}")
+        elif _ler_indice(arquivo) != impressao:
+            try:  # mesmo conteúdo com outro mtime (arquivo copiado ou tocado): não recalcula o hash da próxima vez
+                _gravar_indice(arquivo, impressao)
+            except OSError:
+                pass
+        _analises_em_memoria[chave] = (versao, analises)
+        return analises
+
+def carregar_regional(grao='ano', arquivo=CONSOLIDATED_FILE):
+    """
+    Métricas regionais (preparar_regional) no `grao` pedido ('ano', 'mes' ou 'dia'), lidas do grão
+    correspondente do cubo. Ficam na memória do processo por versão do arquivo, como as Analises;
+    o DataFrame é compartilhado e não deve ser alterado.
+    """
+    chave = (os.path.abspath(arquivo), grao)
+    with _trava_analises:
+        versao = versao_dos_dados(arquivo)
+        em_memoria = _regionais_em_memoria.get(chave)
+        if em_memoria is not None and em_memoria[0] == versao:
+            return em_memoria[1]
+        regional = preparar_regional(ler_cubo(grao, arquivo), grao)
+        _regionais_em_memoria[chave] = (versao, regional)
+        return regional
+
+def carregar_medias(janelas=JANELAS_MEDIAS, tipo='simples', arquivo=CONSOLIDATED_FILE, nomes=None):
+    """
+    Médias móveis (medias_moveis) da série diária das Analises nas `janelas` pedidas, em qualquer
+    combinação, com as colunas '<fonte>_<janela>d' na ordem das janelas. As médias simples de
+    JANELAS_MEDIAS já vêm prontas nas Analises; cada outra janela é calculada uma vez por versão do
+    arquivo e fica na memória do processo, de modo que trocar as janelas na página só monta a tabela.
+    `nomes` renomeia as fontes nas colunas (por exemplo NOMES_ACENTUADOS). Como nas Analises, os
+    dados são compartilhados e não devem ser alterados.
+    """
+    janelas = [int(janela) for janela in janelas]
+    if any(janela < 1 for janela in janelas):
+        raise ValueError(f"Janelas de média móvel precisam ter pelo menos 1 dia: {janelas}.")
+    analises = carregar_analises(arquivo)
+    chave = os.path.abspath(arquivo)
+    with _trava_analises:
+        versao = versao_dos_dados(arquivo)
+        em_memoria = _medias_em_memoria.get(chave)
+        if em_memoria is None or em_memoria[0] != versao:
+            em_memoria = (versao, {('simples', janela): analises.medias.filter(regex=f'_{janela}d$') for janela in JANELAS_MEDIAS})
+            _medias_em_memoria[chave] = em_memoria
+        calculadas = em_memoria[1]
+        faltando = list(dict.fromkeys(janela for janela in janelas if (tipo, janela) not in calculadas))
+        if faltando:
+            novas = medias_moveis(analises.diario, faltando, tipo)
+            for janela in faltando:
+                calculadas[(tipo, janela)] = novas.filter(regex=f'_{janela}d$')
+        partes = [calculadas[(tipo, janela)] for janela in dict.fromkeys(janelas)]
+    medias = pd.concat(partes, axis=1) if partes else pd.DataFrame(index=analises.diario.index)
+    if nomes:
+        medias = medias.rename(columns=lambda coluna: '_'.join([nomes.get(coluna.rsplit('_', 1)[0], coluna.rsplit('_', 1)[0]), coluna.rsplit('_', 1)[1]]))
+    return medias
+
+# ==============================================================================
+# DETALHE HORÁRIO SOB DEMANDA
+# ==============================================================================
+_janelas_horarias = OrderedDict()  # (arquivo, versão, início, fim, subsistema[, grão]) -> DataFrame, do menos ao mais recente
+_trava_janelas = threading.Lock()
+
+def grupos_na_janela(arquivo, inicio, fim, coluna='din_instante', candidatos=None):
+    """
+    Row groups de `arquivo` cujo intervalo de `coluna` (estatísticas do rodapé) cruza [inicio, fim],
+    entre os `candidatos` (por padrão, todos): no cubo, os row groups de um grão com o `periodo`.
+    """
+    metadados = pq.ParquetFile(arquivo).metadata
+    posicao = metadados.schema.to_arrow_schema().get_field_index(coluna)
+    grupos = []
+    for i in (range(metadados.num_row_groups) if candidatos is None else candidatos):
+        estatisticas = metadados.row_group(i).column(posicao).statistics
+        if estatisticas is None or not estatisticas.has_min_max:
+            grupos.append(i)  # sem estatísticas não dá para descartar
+        elif pd.Timestamp(estatisticas.min) <= fim and pd.Timestamp(estatisticas.max) >= inicio:
+            grupos.append(i)
+    return grupos
+
+def _ler_janela(arquivo, inicio, fim, subsistema):
+    """Linhas de `subsistema` com din_instante em [inicio, fim], como Table com a data e as fontes."""
+    colunas = ['din_instante'] + list(FONTES)
+    mapeado = abrir_ipc(arquivo)
+    if mapeado is not None and mapeado.column('din_instante').num_chunks == 1:
+        # Consolidado ordenado por instante: busca binária na coluna mapeada e fatia sem copiar
+        instantes = mapeado.column('din_instante').chunk(0).to_numpy()
+        primeira = np.searchsorted(instantes, np.datetime64(inicio), side='left')
+        ultima = np.searchsorted(instantes, np.datetime64(fim), side='right')
+        tabela = mapeado.slice(primeira, ultima - primeira)
+    else:
+        grupos = grupos_na_janela(arquivo, inicio, fim)
+        tabela = pq.ParquetFile(arquivo).read_row_groups(grupos, columns=colunas + ['nom_subsistema'])
+    filtro = (ds.field('nom_subsistema') == subsistema) & (ds.field('din_instante') >= inicio) & (ds.field('din_instante') <= fim)
+    return tabela.filter(filtro).select(colunas)
+
+def ler_horario(inicio, fim, subsistema=SIN, arquivo=CONSOLIDATED_FILE):
+    """
+    Geração hora a hora de `subsistema` entre `inicio` e `fim` (inclusive), indexada por din_instante,
+    com uma coluna por fonte (nomes curtos, como no diário). Só a janela pedida é lida: do espelho
+    IPC mapeado, por busca binária no instante; sem ele, só os row groups do consolidado cujas
+    estatísticas cruzam a janela. As janelas ficam num cache LRU limitado a MAX_JANELAS_HORARIAS
+    janelas e MAX_MB_JANELAS_HORARIAS MB, por versão dos dados. O DataFrame devolvido é compartilhado
+    com o cache: quem precisar alterá-lo deve trabalhar sobre uma cópia.
+    """
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    chave = (os.path.abspath(arquivo), tuple(versao_dos_dados(arquivo)), inicio, fim, subsistema)
+    with _trava_janelas:
+        if chave in _janelas_horarias:
+            _janelas_horarias.move_to_end(chave)
+            return _janelas_horarias[chave]
+
+    df = _ler_janela(arquivo, inicio, fim, subsistema).to_pandas()
+    df = df.set_index('din_instante').astype('float64').rename(columns=FONTES)
+    _guardar_janela(chave, df)
+    return df
+
+def _guardar_janela(chave, df):
+    """Guarda `df` no cache LRU das janelas, descartando as usadas há mais tempo além dos limites."""
+    with _trava_janelas:
+        _janelas_horarias[chave] = df
+        _janelas_horarias.move_to_end(chave)
+        limite = MAX_MB_JANELAS_HORARIAS * 1024 * 1024
+        while len(_janelas_horarias) > MAX_JANELAS_HORARIAS or (
+                len(_janelas_horarias) > 1 and sum(j.memory_usage().sum() for j in _janelas_horarias.values()) > limite):
+            _janelas_horarias.popitem(last=False)  # descarta a janela usada há mais tempo
+
+# ==============================================================================
+# SÉRIE POR JANELA, NO GRÃO QUE CABE NA TELA
+# ==============================================================================
+def escolher_grao_janela(inicio, fim, pontos=MAX_PERIODOS_JANELA):
+    """O grão mais fino de NIVEIS_JANELA com no máximo `pontos` períodos em [inicio, fim] ('mes' se nenhum couber)."""
+    duracao = pd.Timestamp(fim) - pd.Timestamp(inicio)
+    for grao, periodo in NIVEIS_JANELA.items():
+        if duracao / periodo + 1 <= pontos:
+            return grao
+    return 'mes'
+
+def _inicio_do_periodo(instante, grao):
+    """Início do período do `grao` que contém `instante` (semanas começam na segunda-feira)."""
+    if grao == 'hora':
+        return instante.floor('h')
+    dia = instante.normalize()
+    if grao == 'semana':
+        return dia - pd.Timedelta(days=dia.weekday())
+    return dia.replace(day=1) if grao == 'mes' else dia
+
+def _fim_do_periodo(instante, grao):
+    """Último instante do período do `grao` que contém `instante`."""
+    inicio = _inicio_do_periodo(instante, grao)
+    proximo = inicio + (pd.DateOffset(months=1) if grao == 'mes' else NIVEIS_JANELA[grao])
+    return proximo - pd.Timedelta(milliseconds=1)
+
+def _ler_cubo_na_janela(arquivo, grao, inicio, fim, subsistema):
+    """
+    Linhas do grão `grao` do cubo com período em [inicio, fim], só de `subsistema`: só os row groups
+    do grão cujo `periodo` cruza a janela são lidos. Sem cubo válido, agrega só os anos da janela.
+    """
+    aberto = abrir_cubo(arquivo)
+    if aberto is None:
+        df = montar_cubo(arquivo, [grao], [subsistema], anos=range(inicio.year, fim.year + 1))[grao]
+    else:
+        cubo, grupos = aberto
+        grupos = grupos_na_janela(caminho_cubo(arquivo), inicio, fim, 'periodo', grupos[grao])
+        df = cubo.read_row_groups(grupos, columns=['periodo', 'nom_subsistema', 'linhas'] + list(FONTES)).to_pandas()
+        df['nom_subsistema'] = df['nom_subsistema'].astype(str)
+    return df[(df['nom_subsistema'] == subsistema) & (df['periodo'] >= inicio) & (df['periodo'] <= fim)]
+
+def serie_na_janela(inicio, fim, subsistema=SIN, pontos=MAX_PERIODOS_JANELA, arquivo=CONSOLIDATED_FILE):
+    """
+    Geração média (MWmed) de `subsistema` por período entre `inicio` e `fim`, no grão mais fino em
+    que a janela cabe em `pontos` períodos (escolher_grao_janela): hora a hora numa janela de poucas
+    semanas, por dia, por semana ou por mês conforme ela aumenta. Devolve (grão, DataFrame indexado
+    pelo início de cada período, uma coluna por fonte com nomes curtos).
+    A consulta vai ao cubo de agregados (semanas somam os dias do cubo), lendo só os row groups que
+    cruzam a janela; como a média divide a soma pelas linhas somadas, a escala não muda com o grão.
+    Os períodos das pontas vêm inteiros: a janela é estendida ao início do período de `inicio` e ao
+    fim do período de `fim` (a última semana soma todos os seus dias). O resultado fica no mesmo
+    cache LRU do ler_horario e é compartilhado: quem precisar alterá-lo deve trabalhar sobre uma cópia.
+    """
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    grao = escolher_grao_janela(inicio, fim, pontos)
+    chave = (os.path.abspath(arquivo), tuple(versao_dos_dados(arquivo)), inicio, fim, subsistema, grao)
+    with _trava_janelas:
+        if chave in _janelas_horarias:
+            _janelas_horarias.move_to_end(chave)
+            return grao, _janelas_horarias[chave]
+
+    df = _ler_cubo_na_janela(arquivo, 'dia' if grao == 'semana' else grao, _inicio_do_periodo(inicio, grao),
+                             _fim_do_periodo(fim, grao), subsistema)
+    if grao == 'semana':
+        df = df.assign(periodo=df['periodo'] - pd.to_timedelta(df['periodo'].dt.weekday, unit='D'))
+    somas = df.groupby('periodo', sort=True)[list(FONTES) + ['linhas']].sum()
+    serie = somas[list(FONTES)].div(somas['linhas'].where(somas['linhas'] > 0), axis=0).astype('float64').rename(columns=FONTES)
+    _guardar_janela(chave, serie)
+    return grao, serie
+
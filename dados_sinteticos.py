@@ -0,0 +1,80 @@
+# Arquivo: dados_sinteticos.py
+# Gera arquivos anuais sintéticos no mesmo formato do balanço de energia por subsistema da ONS,
+# para rodar o ETL e os benchmarks sem depender do dados.ons.org.br.
+
+import os
+import numpy as np
+import pandas as pd
+
+PREFIXO_ARQUIVO = "BALANCO_ENERGIA_SUBSISTEMA_"
+SUBSISTEMAS = [
+    ('SE', 'SUDESTE'),
+    ('S', 'SUL'),
+    ('NE', 'NORDESTE'),
+    ('N', 'NORTE'),
+]
+SIN = ('SIN', 'SISTEMA INTERLIGADO NACIONAL')
+
+# Ordem de grandeza (MWmed) de cada fonte por subsistema: hidráulica, térmica, eólica, solar, carga
+ESCALAS = {
+    'SE': (25000, 6000, 50, 800, 38000),
+    'S': (9000, 1500, 300, 300, 12000),
+    'NE': (4000, 2000, 8000, 1500, 11000),
+    'N': (7000, 1000, 200, 100, 6000),
+}
+
+def gerar_ano_sintetico(ano, amostras_por_hora=1, virgula_decimal=False, semente=None):
+    """
+    Gera um DataFrame com um ano de dados no formato da ONS: uma linha por instante e subsistema,
+    mais a linha do SIN (soma dos subsistemas). `amostras_por_hora` aumenta o volume de linhas;
+    com `virgula_decimal=True` os valores saem como texto com vírgula, como nos arquivos antigos.
+    """
+    rng = np.random.default_rng(ano if semente is None else semente)
+    instantes = pd.date_range(f'{ano}-01-01', f'{ano + 1}-01-01', freq=pd.Timedelta(hours=1) / amostras_por_hora, inclusive='left')
+    n = len(instantes)
+    hora = instantes.hour.to_numpy()
+    dia_do_ano = instantes.dayofyear.to_numpy()
+
+    # Eólica e solar crescem ao longo dos anos; solar só gera de dia
+    fator_eolica = np.clip((ano - 2005) / 15, 0.01, 1.5)
+    fator_solar = np.clip((ano - 2016) / 6, 0.0, 2.0)
+    curva_solar = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None)
+    sazonalidade = 1 + 0.15 * np.sin(dia_do_ano / 365 * 2 * np.pi)
+
+    blocos = []
+    for sigla, nome in SUBSISTEMAS:
+        hidro, termica, eolica, solar, carga = ESCALAS[sigla]
+        blocos.append(pd.DataFrame({
+            'id_subsistema': sigla,
+            'nom_subsistema': nome,
+            'val_gerhidraulica': hidro * sazonalidade * rng.uniform(0.8, 1.2, n),
+            'val_gertermica': termica * (2 - sazonalidade) * rng.uniform(0.5, 1.5, n),
+            'val_gereolica': eolica * fator_eolica * rng.uniform(0.2, 1.8, n),
+            'val_gersolar': solar * fator_solar * curva_solar * rng.uniform(0.7, 1.0, n),
+            'val_carga': carga * rng.uniform(0.85, 1.15, n),
+            'val_intercambio': rng.normal(0, 500, n),
+        }, index=instantes))
+    colunas_valores = [c for c in blocos[0].columns if c.startswith('val_')]
+    sin = sum(b[colunas_valores] for b in blocos)
+    sin.insert(0, 'id_subsistema', SIN[0])
+    sin.insert(1, 'nom_subsistema', SIN[1])
+    blocos.append(sin)
+
+    # Ordena por instante e depois por subsistema, como nos arquivos publicados
+    df = pd.concat(blocos).rename_axis('din_instante').reset_index()
+    df = df.sort_values('din_instante', kind='stable', ignore_index=True)
+    df['din_instante'] = df['din_instante'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    if virgula_decimal:
+        for col in colunas_valores:
+            df[col] = df[col].map(lambda v: f'{v:.4f}'.replace('.', ','))
+    return df
+
+def gerar_espelho_sintetico(pasta, anos, amostras_por_hora=1, virgula_decimal=False):
+    """Grava um arquivo .parquet sintético por ano em `pasta`. Retorna os caminhos gerados."""
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = []
+    for ano in anos:
+        caminho = os.path.join(pasta, f'{PREFIXO_ARQUIVO}{ano}.parquet')
+        gerar_ano_sintetico(ano, amostras_por_hora, virgula_decimal).to_parquet(caminho, index=False)
+        caminhos.append(caminho)
+    return caminhos
@@ -0,0 +1,165 @@
+# Arquivo: graficos.py
+# Funções de apoio aos gráficos dos painéis: reduzir as séries longas a um orçamento de pontos
+# antes de mandá-las ao navegador. O Plotly desenha cada ponto recebido, e a série diária tem
+# ~9 mil dias por traço (mais as previsões até 2030); numa tela de ~1500 px a maior parte desses
+# pontos cai no mesmo pixel. A redução usa o LTTB (Largest-Triangle-Three-Buckets), que mantém o
+# formato visual da série (picos e vales) com poucos pontos.
+# Os traços longos podem ainda ser desenhados em WebGL (Scattergl) em vez de SVG: o navegador não
+# cria um elemento por ponto, e arrastar e dar zoom continua fluido com dezenas de milhares de pontos.
+# As figuras que só dependem da versão dos dados (matriz anual, análises regionais...) ficam guardadas
+# já serializadas (figura_em_cache): trocar de página ou mexer na barra lateral não as monta de novo.
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# --- Constantes ---
+PONTOS_POR_TRACO = 1500  # Orçamento de pontos por traço: cerca de um por pixel de um gráfico largo
+RENDERIZADORES = ['auto', 'svg', 'webgl']
+RENDERIZADOR = os.environ.get('RENDERIZADOR_GRAFICOS', 'auto')
+LIMITE_PONTOS_SVG = 1000  # No modo 'auto', traços com mais pontos vão para WebGL (o mesmo critério do plotly.express)
+MAX_FIGURAS_EM_MEMORIA = 32  # Figuras serializadas guardadas por processo (as menos usadas saem primeiro)
+TRACADOS_MEDIAS = ['solid', 'dash', 'dashdot', 'longdash', 'longdashdot']  # Um tracejado por janela de média móvel
+
+_figuras = OrderedDict()  # chave -> JSON da figura, da menos para a mais usada
+_trava_figuras = threading.Lock()
+
+def lttb(x, y, pontos):
+    """
+    Posições dos `pontos` de (x, y) escolhidos pelo LTTB: o primeiro e o último ponto, e um ponto
+    por balde entre eles, o que forma o maior triângulo com o ponto já escolhido no balde anterior
+    e a média do balde seguinte. `x` precisa estar em ordem crescente.
+    Cada escolha depende da anterior; com baldes de poucos pontos, como na série diária, o laço em
+    Python puro sobre listas sai bem mais rápido que uma operação do numpy por balde.
+    """
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    # Baldes [bordas[i], bordas[i + 1]) para os pontos internos; o último "balde" é o ponto final
+    bordas = np.append(np.linspace(1, n - 1, pontos - 1).astype(np.int64), n)
+    tamanhos = np.diff(bordas)
+    medias_x = (np.add.reduceat(x, bordas[:-1]) / tamanhos).tolist()
+    medias_y = (np.add.reduceat(y, bordas[:-1]) / tamanhos).tolist()
+    xs, ys, bordas = x.tolist(), y.tolist(), bordas.tolist()
+    escolhidos = [0]
+    xa, ya = xs[0], ys[0]
+    for i in range(pontos - 2):
+        # Área (em dobro) do triângulo entre o ponto anterior, o candidato j e a média do balde seguinte
+        alfa, beta = xa - medias_x[i + 1], medias_y[i + 1] - ya
+        melhor, maior_area = bordas[i], -1.0
+        for j in range(bordas[i], bordas[i + 1]):
+            area = abs(alfa * (ys[j] - ya) + beta * (xs[j] - xa))
+            if area > maior_area:
+                melhor, maior_area = j, area
+        escolhidos.append(melhor)
+        xa, ya = xs[melhor], ys[melhor]
+    escolhidos.append(n - 1)
+    return np.array(escolhidos, dtype=np.int64)
+
+def _eixo_numerico(indice):
+    """O índice da série como float64 (datas em nanossegundos), para as contas de área do LTTB."""
+    if isinstance(indice, pd.DatetimeIndex):
+        return indice.as_unit('ns').asi8.astype(np.float64)
+    return np.asarray(indice, dtype=np.float64)
+
+def reduzir_serie(serie, inicio=None, fim=None, pontos=PONTOS_POR_TRACO):
+    """
+    Recorta `serie` (índice ordenado) no intervalo [inicio, fim] e a reduz a no máximo `pontos`
+    pontos com o LTTB. Valores ausentes são descartados antes (o Plotly não os desenharia).
+    Quanto menor o intervalo, mais perto da série original: abaixo do orçamento ela vem inteira.
+    """
+    if inicio is not None or fim is not None:
+        serie = serie.loc[None if inicio is None else pd.Timestamp(inicio):None if fim is None else pd.Timestamp(fim)]
+    serie = serie.dropna()
+    if len(serie) <= pontos:
+        return serie
+    return serie.iloc[lttb(_eixo_numerico(serie.index), serie.to_numpy(dtype=np.float64), pontos)]
+
+def linha(x, y, renderizador=None, **propriedades):
+    """
+    Traço de linha do Plotly para (x, y) com as `propriedades` de go.Scatter (nome, legendgroup,
+    line, fill...), desenhado em SVG (go.Scatter) ou em WebGL (go.Scattergl), que aceitam as mesmas.
+    `renderizador`: 'svg', 'webgl' ou 'auto' (WebGL acima de LIMITE_PONTOS_SVG pontos); se None,
+    RENDERIZADOR (variável de ambiente RENDERIZADOR_GRAFICOS).
+    Traços em WebGL não aparecem na miniatura do rangeslider, que continua funcionando.
+    """
+    renderizador = renderizador or RENDERIZADOR
+    if renderizador not in RENDERIZADORES:
+        raise ValueError(f"Renderizador desconhecido: '{renderizador}' (use {', '.join(RENDERIZADORES)}).")
+    webgl = renderizador == 'webgl' or (renderizador == 'auto' and len(x) > LIMITE_PONTOS_SVG)
+    return (go.Scattergl if webgl else go.Scatter)(x=x, y=y, **propriedades)
+
+def tracado_media(posicao):
+    """Tracejado da linha da `posicao`-ésima janela de média móvel (a menor janela vem contínua)."""
+    return TRACADOS_MEDIAS[posicao % len(TRACADOS_MEDIAS)]
+
+# --- Cache de figuras serializadas ---
+def _chave_figura(funcao, versao, parametros):
+    """
+    Identifica a figura: a versão dos dados, a função (arquivo, nome e data de modificação do arquivo,
+    para que editar o painel não sirva figuras antigas) e os parâmetros que não são dados.
+    """
+    codigo = funcao.__code__
+    try:
+        modificado = os.stat(codigo.co_filename).st_mtime_ns
+    except OSError:
+        modificado = None
+    identidade = (versao, os.path.basename(codigo.co_filename), modificado, funcao.__qualname__, sorted(parametros.items()))
+    return hashlib.sha256(repr(identidade).encode('utf-8')).hexdigest()
+
+def _guardar_figura(chave, texto):
+    with _trava_figuras:
+        _figuras[chave] = texto
+        _figuras.move_to_end(chave)
+        while len(_figuras) > MAX_FIGURAS_EM_MEMORIA:
+            _figuras.popitem(last=False)
+
+def figura_em_cache(funcao, *dados, versao, pasta=None, **parametros):
+    """
+    A figura de funcao(*dados, **parametros), montada uma vez e guardada como JSON: na memória deste
+    processo (as MAX_FIGURAS_EM_MEMORIA mais usadas) e, com `pasta`, também em disco, para outros
+    processos e reinícios do servidor.
+    Os `dados` (DataFrames) não entram na chave: `versao` precisa identificá-los, como a impressão
+    digital do consolidado mais qualquer escolha da página que mude os dados passados (o grão, por
+    exemplo). Os `parametros` entram na chave pelo repr.
+    A `pasta` precisa estar dentro de uma pasta que já exista (ver dados_energia.cache_de_figuras);
+    senão a figura fica só na memória. Figuras sem traços não são guardadas (em geral são avisos de
+    falta de dados, que devem reaparecer). Cada chamada devolve uma figura nova, que pode ser alterada.
+    """
+    chave = _chave_figura(funcao, versao, parametros)
+    with _trava_figuras:
+        texto = _figuras.get(chave)
+        if texto is not None:
+            _figuras.move_to_end(chave)
+    arquivo = os.path.join(pasta, f'{chave}.json') if pasta else None
+    if texto is None and arquivo:
+        try:
+            with open(arquivo, encoding='utf-8') as f:
+                texto = f.read()
+            _guardar_figura(chave, texto)
+        except OSError:
+            pass
+    if texto is None:
+        figura = funcao(*dados, **parametros)
+        if not figura.data:
+            return figura
+        texto = figura.to_json()
+        _guardar_figura(chave, texto)
+        if arquivo and os.path.isdir(os.path.dirname(os.path.abspath(pasta))):
+            try:
+                os.makedirs(pasta, exist_ok=True)
+                temporario = f'{arquivo}.{os.getpid()}.tmp'
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    f.write(texto)
+                os.replace(temporario, arquivo)
+            except OSError:
+                pass  # sem disco, a figura continua na memória
+        return figura
+    # O JSON saiu do próprio Plotly: remontar a figura sem revalidar cada propriedade é várias vezes mais rápido
+    return go.Figure(json.loads(texto), _validate=False)
@@ -9,60 +9,28 @@ import pandas as pd
 import os
 import plotly.express as px
 import plotly.graph_objects as go
+from dados_energia import (JANELAS_MEDIAS, NOMES_ACENTUADOS, OPCOES_JANELAS_MEDIAS, SIN, TIPOS_MEDIAS, cache_de_figuras,
+                           carregar_analises, carregar_medias, carregar_regional, ler_horario, serie_na_janela)
+from graficos import LIMITE_PONTOS_SVG, PONTOS_POR_TRACO, RENDERIZADORES, figura_em_cache, linha, reduzir_serie, tracado_media
 
 # --- Constantes e Configuração da Página ---
 CONSOLIDATED_FILE = "balanco_energia_consolidado.parquet"
+GRAOS_REGIONAIS = {'Anual': 'ano', 'Mensal': 'mes', 'Diária': 'dia'}  # Granularidades da análise regional
+MAX_DIAS_DETALHE_HORARIO = 31  # Janela máxima do detalhe horário (as linhas são lidas sob demanda)
 st.set_page_config(layout="wide", page_title="Análise Energética do Brasil", page_icon="🇧🇷")
 
 # ==============================================================================
 # 2. CARREGAMENTO E PREPARAÇÃO DE DADOS
 # ==============================================================================
-@st.cache_data
 def load_and_prepare_data():
-    """Lê o arquivo local e prepara todos os DataFrames para as análises."""
-    df = pd.read_parquet(CONSOLIDATED_FILE)
-    df['ano'] = pd.to_datetime(df['din_instante']).dt.year
-
-    # Prepara dados do SIN
-    df_sin = df[df['nom_subsistema'] == 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    fontes_renovaveis = ['val_gerhidraulica', 'val_gereolica', 'val_gersolar']
-    df_sin['geracao_renovavel'] = df_sin[fontes_renovaveis].sum(axis=1)
-    df_sin['geracao_total'] = df_sin['geracao_renovavel'] + df_sin['val_gertermica']
-
-    # Agregação Anual Nacional
-    analise_nacional_anual = df_sin.groupby('ano').agg(
-        total_geral_brasil=('geracao_total', 'sum'),
-        total_renovavel_brasil=('geracao_renovavel', 'sum'),
-        Hidraulica=('val_gerhidraulica', 'sum'),
-        Termica=('val_gertermica', 'sum'),
-        Eolica=('val_gereolica', 'sum'),
-        Solar=('val_gersolar', 'sum')
-    ).reset_index()
-
-    # Prepara Análise Regional
-    df_regional = df[df['nom_subsistema'] != 'SISTEMA INTERLIGADO NACIONAL'].copy()
-    df_regional['geracao_renovavel'] = df_regional[fontes_renovaveis].sum(axis=1)
-    df_regional['geracao_total'] = df_regional['geracao_renovavel'] + df_regional['val_gertermica']
-    
-    analise_regional_anual = df_regional.groupby(['ano', 'nom_subsistema']).agg(
-        geracao_renovavel_regiao=('geracao_renovavel', 'sum'),
-        geracao_total_regiao=('geracao_total', 'sum')
-    ).reset_index()
-    
-    # Análise Relativa: % de renováveis DENTRO da própria região
-    mask = analise_regional_anual['geracao_total_regiao'] > 0
-    analise_regional_anual['perc_renovavel_interno'] = 0.0
-    analise_regional_anual.loc[mask, 'perc_renovavel_interno'] = (analise_regional_anual.loc[mask, 'geracao_renovavel_regiao'] / analise_regional_anual.loc[mask, 'geracao_total_regiao']) * 100
-
-    # Análise Absoluta: Contribuição de cada região para o total de energia renovável do BRASIL
-    analise_final_regional = pd.merge(analise_regional_anual, analise_nacional_anual[['ano', 'total_renovavel_brasil']], on='ano')
-    analise_final_regional['contribuicao_perc_nacional'] = ((analise_final_regional['geracao_renovavel_regiao'] / analise_final_regional['total_renovavel_brasil']) * 100)
-    
-    # Prepara dados diários
-    df_diario = df_sin.set_index('din_instante')[['val_gerhidraulica', 'val_gertermica', 'val_gereolica', 'val_gersolar']].resample('D').sum()
-    df_diario.columns = ['Hidráulica', 'Térmica', 'Eólica', 'Solar']
-    
-    return analise_nacional_anual, analise_final_regional, df_diario
+    """
+    Devolve as análises já prontas do módulo compartilhado (dados_energia), com os nomes de colunas
+    deste painel. O cálculo é feito uma vez por versão do arquivo e reaproveitado pelos outros painéis.
+    """
+    analises = carregar_analises(CONSOLIDATED_FILE)
+    analise_nacional_anual = analises.anual.rename(columns={'total_geral': 'total_geral_brasil', 'total_renovavel': 'total_renovavel_brasil'})
+    df_diario = analises.diario.rename(columns=NOMES_ACENTUADOS)
+    return analise_nacional_anual, analises.regional, df_diario
 
 # ==============================================================================
 # 3. FUNÇÕES DE PLOTAGEM
@@ -74,15 +42,15 @@ def plot_matriz_energetica(df_anual):
     fig.update_layout(barmode='stack', xaxis_title='Ano', yaxis_title='Geração (MWMED Somado)')
     return fig
 
-def plot_analise_regional_relativa(df_regional):
+def plot_analise_regional_relativa(df_regional, eixo_x='ano'):
     """Cria o gráfico da participação renovável DENTRO de cada subsistema, com eixos corrigidos."""
     fig = px.line(
-        df_regional, x='ano', y='perc_renovavel_interno',
+        df_regional, x=eixo_x, y='perc_renovavel_interno',
         facet_col='nom_subsistema', facet_col_wrap=2,
-        color='nom_subsistema', markers=True, height=700,
+        color='nom_subsistema', markers=(eixo_x == 'ano'), height=700,
         title='Análise Relativa: % de Renováveis na Matriz de CADA Subsistema'
     )
-    fig.for_each_xaxis(lambda axis: axis.update(showticklabels=True, title='Ano'))
+    fig.for_each_xaxis(lambda axis: axis.update(showticklabels=True, title='Ano' if eixo_x == 'ano' else 'Período'))
     fig.for_each_yaxis(lambda axis: axis.update(showticklabels=True, title='% Renovável Interno'))
     fig.update_layout(showlegend=False)
     return fig
@@ -97,19 +65,70 @@ def plot_analise_regional_absoluta(df_regional):
     fig.update_layout(barmode='stack')
     return fig
 
-def plot_serie_diaria(df_diario):
-    """Cria o gráfico de Série Diária com Médias Móveis."""
+def plot_fontes_regionais(df_regional, eixo_x='ano'):
+    """Cria o gráfico da fatia de cada fonte na geração de cada subsistema (áreas empilhadas por região)."""
+    colunas = {'perc_hidraulica': 'Hidráulica', 'perc_termica': 'Térmica', 'perc_eolica': 'Eólica', 'perc_solar': 'Solar'}
+    df_plot = df_regional.melt(id_vars=[eixo_x, 'nom_subsistema'], value_vars=list(colunas), var_name='Fonte', value_name='perc')
+    df_plot['Fonte'] = df_plot['Fonte'].map(colunas)
+    fig = px.area(
+        df_plot, x=eixo_x, y='perc', color='Fonte', facet_col='nom_subsistema', facet_col_wrap=2, height=700,
+        title='Fatia de Cada Fonte na Geração de CADA Subsistema',
+        color_discrete_map={'Hidráulica': 'blue', 'Térmica': 'red', 'Eólica': 'green', 'Solar': 'orange'}
+    )
+    fig.for_each_xaxis(lambda axis: axis.update(showticklabels=True, title='Ano' if eixo_x == 'ano' else 'Período'))
+    fig.for_each_yaxis(lambda axis: axis.update(showticklabels=True, title='% da Geração da Região'))
+    return fig
+
+def plot_serie_diaria(df_diario, df_medias, janelas=JANELAS_MEDIAS, inicio=None, fim=None, renderizador=None):
+    """
+    Cria o gráfico de Série Diária com Médias Móveis, no período [inicio, fim].
+    As médias das `janelas` já vêm prontas em `df_medias` (colunas '<fonte>_<janela>d', de
+    carregar_medias, calculadas sobre a série inteira) e cada traço é reduzido ao orçamento de pontos
+    (reduzir_serie): quanto menor o período, mais detalhe chega ao navegador. `renderizador` escolhe
+    entre SVG e WebGL para os traços (graficos.linha).
+    """
     fig = go.Figure()
     cores = {'Hidráulica': 'blue', 'Térmica': 'red', 'Eólica': 'green', 'Solar': 'orange'}
     for fonte in df_diario.columns:
-        media_30d = df_diario[fonte].rolling(window=30).mean()
-        media_90d = df_diario[fonte].rolling(window=90).mean()
-        fig.add_trace(go.Scatter(x=df_diario.index, y=df_diario[fonte], mode='lines', name=fonte, legendgroup=fonte, line=dict(width=1), opacity=0.3, marker_color=cores[fonte]))
-        fig.add_trace(go.Scatter(x=df_diario.index, y=media_30d, mode='lines', name=f'{fonte} Média 30d', legendgroup=fonte, line=dict(width=2), marker_color=cores[fonte]))
-        fig.add_trace(go.Scatter(x=df_diario.index, y=media_90d, mode='lines', name=f'{fonte} Média 90d', legendgroup=fonte, line=dict(width=2, dash='dash'), marker_color=cores[fonte]))
+        diario = reduzir_serie(df_diario[fonte], inicio, fim)
+        fig.add_trace(linha(x=diario.index, y=diario, renderizador=renderizador, mode='lines', name=fonte, legendgroup=fonte, line=dict(width=1), opacity=0.3, marker_color=cores[fonte]))
+        for posicao, janela in enumerate(janelas):
+            media = reduzir_serie(df_medias[f'{fonte}_{janela}d'], inicio, fim)
+            fig.add_trace(linha(x=media.index, y=media, renderizador=renderizador, mode='lines', name=f'{fonte} Média {janela}d', legendgroup=fonte, line=dict(width=2, dash=tracado_media(posicao)), marker_color=cores[fonte]))
     fig.update_layout(height=700, title_text='<b>Geração Diária com Tendências de Médias Móveis</b>', legend_title='<b>Fonte e Tendência</b>', xaxis_rangeslider_visible=True)
     return fig
 
+def plot_serie_na_janela(df_janela, grao, subsistema, renderizador=None):
+    """Cria o gráfico da geração média por período da janela, no grão escolhido por serie_na_janela."""
+    fig = go.Figure()
+    cores = {'Hidráulica': 'blue', 'Térmica': 'red', 'Eólica': 'green', 'Solar': 'orange'}
+    for fonte in df_janela.columns:
+        fig.add_trace(linha(x=df_janela.index, y=df_janela[fonte], renderizador=renderizador, mode='lines', name=fonte, line=dict(width=1.5), marker_color=cores[fonte]))
+    detalhe = {'hora': 'Hora a Hora', 'dia': 'por Dia', 'semana': 'por Semana', 'mes': 'por Mês'}[grao]
+    fig.update_layout(height=500, title_text=f'<b>Geração Média {detalhe} - {subsistema}</b>', xaxis_title='Período', yaxis_title='Geração Média (MWmed)', legend_title='<b>Fonte</b>')
+    return fig
+
+def plot_detalhe_horario(df_horario, subsistema):
+    """Cria o gráfico hora a hora da janela escolhida, com a hora de maior geração total destacada."""
+    fig = go.Figure()
+    cores = {'Hidráulica': 'blue', 'Térmica': 'red', 'Eólica': 'green', 'Solar': 'orange'}
+    for fonte in df_horario.columns:
+        fig.add_trace(go.Scatter(x=df_horario.index, y=df_horario[fonte], mode='lines', name=fonte, stackgroup='geracao', line=dict(width=0.5), marker_color=cores[fonte]))
+    total = df_horario.sum(axis=1)
+    if len(total):
+        fig.add_trace(go.Scatter(x=[total.idxmax()], y=[total.max()], mode='markers+text', name='Pico', marker=dict(size=10, color='black'),
+                                 text=[f"Pico: {total.max():,.0f} MW"], textposition='top center'))
+    fig.update_layout(height=500, title_text=f'<b>Geração Hora a Hora - {subsistema}</b>', xaxis_title='Instante', yaxis_title='Geração (MW)', legend_title='<b>Fonte</b>')
+    return fig
+
+def plot_perfil_horario(df_horario):
+    """Cria o perfil médio por hora do dia da janela escolhida (em que horas cada fonte gera mais)."""
+    perfil = df_horario.groupby(df_horario.index.hour).mean()
+    fig = px.line(perfil, x=perfil.index, y=perfil.columns, markers=True, title='Perfil Médio por Hora do Dia',
+                  labels={'x': 'Hora do Dia', 'value': 'Geração Média (MW)', 'variable': 'Fonte'})
+    fig.update_layout(xaxis=dict(dtick=1))
+    return fig
+
 # ==============================================================================
 # 4. INTERFACE PRINCIPAL DA APLICAÇÃO
 # ==============================================================================
@@ -122,6 +141,7 @@ def main():
         st.stop()
 
     analise_nacional, analise_regional, df_diario = load_and_prepare_data()
+    versao_dados, pasta_figuras = cache_de_figuras(CONSOLIDATED_FILE)  # Figuras prontas desta versão dos dados
 
     st.sidebar.title("Navegação")
     page_selection = st.sidebar.radio(
@@ -145,7 +165,7 @@ def main():
         **Análise:** O gráfico de barras empilhadas ilustra a forte dependência histórica da fonte hídrica, o papel complementar da geração térmica (frequentemente acionada para segurança do sistema) e, mais importante, a ascensão clara e exponencial das fontes eólica e solar na última década, diversificando a matriz.
         """)
         st.info("🎯 **Alinhamento Principal: ODS 7.2** (Manter elevada a participação de renováveis).")
-        figura_matriz = plot_matriz_energetica(analise_nacional)
+        figura_matriz = figura_em_cache(plot_matriz_energetica, analise_nacional, versao=versao_dados, pasta=pasta_figuras)
         st.plotly_chart(figura_matriz, use_container_width=True)
 
     elif page_selection == "Análise de Subsistemas":
@@ -159,9 +179,21 @@ def main():
         Este primeiro gráfico responde: **"Dentro de cada região, qual a porcentagem de energia gerada que é renovável?"**. Ele mostra o quão "verde" é a matriz de cada subsistema.
         """)
         st.info("🎯 **Alinhamento Principal: ODS 7.1** (Acesso universal e equidade regional).")
-        fig_relativa = plot_analise_regional_relativa(analise_regional)
+        granularidade = st.radio("Granularidade:", list(GRAOS_REGIONAIS), horizontal=True)
+        if GRAOS_REGIONAIS[granularidade] == 'ano':
+            regional_grao, eixo_x = analise_regional, 'ano'
+        else:
+            regional_grao, eixo_x = carregar_regional(GRAOS_REGIONAIS[granularidade], CONSOLIDATED_FILE), 'periodo'
+        versao_grao = (versao_dados, GRAOS_REGIONAIS[granularidade])
+        fig_relativa = figura_em_cache(plot_analise_regional_relativa, regional_grao, eixo_x=eixo_x, versao=versao_grao, pasta=pasta_figuras)
         st.plotly_chart(fig_relativa, use_container_width=True)
 
+        st.markdown("""
+        **De onde vem a energia de cada região?** A fatia de cada fonte na geração do próprio subsistema, na mesma granularidade.
+        """)
+        fig_fontes = figura_em_cache(plot_fontes_regionais, regional_grao, eixo_x=eixo_x, versao=versao_grao, pasta=pasta_figuras)
+        st.plotly_chart(fig_fontes, use_container_width=True)
+
         st.markdown("---")
 
         st.subheader("Visão 2: Contribuição de Cada Região para o Total Renovável do Brasil")
@@ -169,7 +201,7 @@ def main():
         Este segundo gráfico responde à pergunta mais profunda: **"Do total de energia renovável gerado no Brasil, qual a contribuição (o 'peso') de cada região?"**. Aqui vemos a importância absoluta de cada subsistema. Por exemplo, o Nordeste não só tem uma matriz interna muito renovável, como também é um contribuinte massivo para o total de energia limpa do país, graças à sua força eólica.
         """)
         st.info("🎯 **Alinhamento Principal: ODS 7.b** (Expansão de infraestrutura para integração nacional).")
-        fig_absoluta = plot_analise_regional_absoluta(analise_regional)
+        fig_absoluta = figura_em_cache(plot_analise_regional_absoluta, analise_regional, versao=versao_dados, pasta=pasta_figuras)
         st.plotly_chart(fig_absoluta, use_container_width=True)
 
     elif page_selection == "Análise de Série Temporal":
@@ -184,8 +216,60 @@ def main():
                 - **Média Móvel de 90 dias (Linha Tracejada):** Mostra a tendência de longo prazo, confirmando a ascensão estrutural da **Eólica** e **Solar** ao longo dos anos.
             """)
         
-        fig_diario = plot_serie_diaria(df_diario)
+        primeiro_dia, ultimo_dia = df_diario.index.min().date(), df_diario.index.max().date()
+        inicio, fim = st.slider("Período do gráfico:", min_value=primeiro_dia, max_value=ultimo_dia,
+                                value=(primeiro_dia, ultimo_dia), format="DD/MM/YYYY")
+        st.caption("Períodos menores trazem mais detalhe: cada linha é desenhada com no máximo "
+                   f"{PONTOS_POR_TRACO} pontos, escolhidos para manter os picos e vales da série.")
+        renderizador = st.radio("Desenho do gráfico:", RENDERIZADORES, horizontal=True,
+                                format_func={'auto': 'Automático', 'svg': 'SVG', 'webgl': 'WebGL'}.get,
+                                help=f"Automático usa WebGL nos traços com mais de {LIMITE_PONTOS_SVG} pontos: arrastar e dar zoom fica mais leve.")
+        col_janelas, col_tipo = st.columns(2)
+        janelas = sorted(col_janelas.multiselect("Médias móveis (dias):", OPCOES_JANELAS_MEDIAS, default=list(JANELAS_MEDIAS)))
+        tipo_media = col_tipo.radio("Tipo de média:", TIPOS_MEDIAS, horizontal=True,
+                                    format_func={'simples': 'Simples', 'centralizada': 'Centralizada', 'exponencial': 'Exponencial'}.get,
+                                    help="Simples: média dos dias até o dia. Centralizada: janela centrada no dia. Exponencial: mais peso aos dias recentes.")
+        df_medias = carregar_medias(janelas, tipo_media, CONSOLIDATED_FILE, nomes=NOMES_ACENTUADOS)
+        fig_diario = plot_serie_diaria(df_diario, df_medias, janelas, inicio, fim, renderizador)
         st.plotly_chart(fig_diario, use_container_width=True)
 
+        st.subheader("O Período Escolhido no Maior Detalhe que Cabe no Gráfico")
+        st.markdown("""
+        O período escolhido acima é consultado nos agregados já calculados, no grão mais fino em que cabe no gráfico: **hora a hora** em janelas de algumas semanas e, conforme o período aumenta, **por dia**, **por semana** ou **por mês**. Só os períodos da janela chegam ao navegador.
+        """)
+        subsistema_periodo = st.selectbox("Subsistema do período:", [SIN] + sorted(analise_regional['nom_subsistema'].unique()))
+        grao, df_janela = serie_na_janela(pd.Timestamp(inicio), pd.Timestamp(fim) + pd.Timedelta(hours=23), subsistema_periodo,
+                                          PONTOS_POR_TRACO, CONSOLIDATED_FILE)
+        if df_janela.empty:
+            st.info("Não há dados para esse período.")
+        else:
+            st.plotly_chart(plot_serie_na_janela(df_janela.rename(columns=NOMES_ACENTUADOS), grao, subsistema_periodo, renderizador), use_container_width=True)
+
+        st.markdown("---")
+        st.subheader("Detalhe Horário: Comportamento nas Horas de Pico")
+        st.markdown(f"""
+        Escolha um subsistema e uma janela de até {MAX_DIAS_DETALHE_HORARIO} dias para ver a geração **hora a hora**. Só as horas da janela escolhida são lidas do arquivo, no momento em que são pedidas.
+        """)
+        col_subsistema, col_janela = st.columns(2)
+        subsistemas = [SIN] + sorted(analise_regional['nom_subsistema'].unique())
+        subsistema = col_subsistema.selectbox("Subsistema:", subsistemas)
+        ultimo_dia = df_diario.index.max().date()
+        janela = col_janela.date_input(
+            "Janela (início e fim):", value=(ultimo_dia - pd.Timedelta(days=6), ultimo_dia),
+            min_value=df_diario.index.min().date(), max_value=ultimo_dia
+        )
+        if len(janela) == 2:
+            inicio, fim = janela
+            if (fim - inicio).days >= MAX_DIAS_DETALHE_HORARIO:
+                st.warning(f"Janela limitada a {MAX_DIAS_DETALHE_HORARIO} dias a partir do início escolhido.")
+                fim = inicio + pd.Timedelta(days=MAX_DIAS_DETALHE_HORARIO - 1)
+            df_horario = ler_horario(pd.Timestamp(inicio), pd.Timestamp(fim) + pd.Timedelta(hours=23, minutes=59), subsistema, CONSOLIDATED_FILE)
+            df_horario = df_horario.rename(columns=NOMES_ACENTUADOS)
+            if df_horario.empty:
+                st.info("Não há dados horários para essa janela.")
+            else:
+                st.plotly_chart(plot_detalhe_horario(df_horario, subsistema), use_container_width=True)
+                st.plotly_chart(plot_perfil_horario(df_horario), use_container_width=True)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,220 @@
+# Arquivo: servidor_espelho.py
+# Servidor HTTP local que faz o papel do dados.ons.org.br para exercitar o ETL sem rede.
+# Publica uma página de dataset no formato do CKAN (ul.resource-list a.resource-url-analytics), a
+# mesma que o Coletar_dados.buscar_links_parquet lê, e serve os .parquet de uma pasta (ou arquivos
+# sintéticos gerados na hora) com ETag/Last-Modified, GET condicional (304) e Range (206).
+# Latência, banda por conexão e falhas (respostas 503 e conexões cortadas no meio do arquivo)
+# são configuráveis, para benchmarks reprodutíveis.
+#
+# Uso: python servidor_espelho.py --pasta dados_ons_parquet --porta 8765
+#      python servidor_espelho.py --sintetico 26 --latencia 0.05 --banda 2000000 --taxa-erro 0.1
+# A página do dataset fica em http://127.0.0.1:8765/dataset/balanco-energia-subsistema
+# (use essa URL no --url do Coletar_dados.py).
+
+import argparse
+import html
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+TAMANHO_BLOCO = 64 * 1024
+CAMINHO_DATASET = '/dataset/balanco-energia-subsistema'
+# Recursos que não são .parquet também aparecem na página real; o ETL deve ignorá-los
+OUTROS_RECURSOS = ['DICIONARIO_DADOS_BALANCO_ENERGIA_SUBSISTEMA.pdf', 'BALANCO_ENERGIA_SUBSISTEMA_2000.csv']
+
+class ManipuladorEspelho(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, como o servidor real
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder_vazio(self, status, headers=None):
+        self.send_response(status)
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _faixa_pedida(self, tamanho, etag, last_modified):
+        """Início e fim (inclusivo) do Range pedido, ou None para mandar o arquivo inteiro."""
+        faixa = self.headers.get('Range', '')
+        if_range = self.headers.get('If-Range')
+        if not faixa.startswith('bytes=') or (if_range and if_range not in (etag, last_modified)):
+            return None
+        inicio, _, fim = faixa[len('bytes='):].partition('-')
+        if not inicio.isdigit() or int(inicio) >= tamanho:
+            return None
+        return int(inicio), min(int(fim), tamanho - 1) if fim.isdigit() else tamanho - 1
+
+    def _pagina_dataset(self):
+        """Página do dataset no formato do CKAN, com um item por arquivo da pasta."""
+        nomes = sorted(n for n in os.listdir(self.server.pasta) if n.endswith('.parquet')) + OUTROS_RECURSOS
+        itens = ''.join(
+            f'<li class="resource-item"><a class="heading" href="#">{html.escape(nome)}</a>'
+            f'<a class="resource-url-analytics" href="{CAMINHO_DATASET}/resource/{i}/download/{html.escape(nome)}">Baixar</a></li>'
+            for i, nome in enumerate(nomes)
+        )
+        corpo = (f'<html><head><meta charset="utf-8"><title>Balanço de Energia nos Subsistemas</title></head><body>'
+                 f'<section id="dataset-resources"><ul class="resource-list">{itens}</ul></section></body></html>').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        servidor = self.server
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        caminho_url = unquote(urlparse(self.path).path).rstrip('/')
+        if caminho_url in ('', CAMINHO_DATASET):
+            servidor.contar('pagina')
+            self._pagina_dataset()
+            return
+        caminho = os.path.join(servidor.pasta, os.path.basename(caminho_url))
+        if not caminho.endswith('.parquet') or not os.path.isfile(caminho):
+            servidor.contar('404')
+            self._responder_vazio(404)
+            return
+        if servidor.sortear(servidor.taxa_erro):
+            servidor.contar('erro_503')
+            self._responder_vazio(503)
+            return
+
+        info = os.stat(caminho)
+        etag = f'"{info.st_size:x}-{info.st_mtime_ns:x}"'
+        last_modified = formatdate(info.st_mtime, usegmt=True)
+        if self.headers.get('If-None-Match') == etag or (
+                not self.headers.get('If-None-Match') and self.headers.get('If-Modified-Since')
+                and parsedate_to_datetime(self.headers['If-Modified-Since']).timestamp() >= int(info.st_mtime)):
+            servidor.contar('304')
+            self._responder_vazio(304, {'ETag': etag, 'Last-Modified': last_modified})
+            return
+
+        faixa = self._faixa_pedida(info.st_size, etag, last_modified)
+        inicio, fim = faixa or (0, info.st_size - 1)
+        servidor.contar('206' if faixa else '200')
+        self.send_response(206 if faixa else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(fim - inicio + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        if faixa:
+            self.send_header('Content-Range', f'bytes {inicio}-{fim}/{info.st_size}')
+        self.end_headers()
+
+        # Corte injetado: manda só metade do corpo anunciado e derruba a conexão
+        restante = fim - inicio + 1
+        if servidor.sortear(servidor.taxa_corte):
+            servidor.contar('corte')
+            restante //= 2
+            self.close_connection = True
+        enviado, inicio_envio = 0, time.perf_counter()
+        with open(caminho, 'rb') as f:
+            f.seek(inicio)
+            while restante > 0:
+                bloco = f.read(min(TAMANHO_BLOCO, restante))
+                self.wfile.write(bloco)
+                restante -= len(bloco)
+                enviado += len(bloco)
+                if servidor.banda:
+                    # Limita a banda desta conexão: espera até o tempo que `enviado` bytes levariam
+                    atraso = enviado / servidor.banda - (time.perf_counter() - inicio_envio)
+                    if atraso > 0:
+                        time.sleep(atraso)
+        servidor.contar('bytes', enviado)
+
+class ServidorEspelho(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, pasta, taxa_erro=0.0, taxa_corte=0.0, semente=None, latencia=0.0, banda=None):
+        super().__init__(endereco, ManipuladorEspelho)
+        self.pasta = pasta
+        self.latencia = latencia  # Segundos antes de cada resposta
+        self.banda = banda        # Bytes por segundo, por conexão (None = sem limite)
+        self.taxa_erro = taxa_erro
+        self.taxa_corte = taxa_corte
+        self.estatisticas = Counter()
+        self._sorteio = random.Random(semente)
+        self._trava = threading.Lock()
+
+    def sortear(self, taxa):
+        with self._trava:
+            return taxa > 0 and self._sorteio.random() < taxa
+
+    def contar(self, evento, quantidade=1):
+        with self._trava:
+            self.estatisticas[evento] += quantidade
+
+    @property
+    def url_base(self):
+        host, porta = self.server_address[:2]
+        return f'http://{host}:{porta}/'
+
+    @property
+    def url_dataset(self):
+        """URL da página do dataset, para usar no lugar do ONS_URL."""
+        return self.url_base.rstrip('/') + CAMINHO_DATASET
+
+def iniciar_em_segundo_plano(pasta, porta=0, **opcoes):
+    """Sobe o servidor numa thread (porta 0 = porta livre qualquer) e o devolve; pare com `.shutdown()`."""
+    servidor = ServidorEspelho(('127.0.0.1', porta), pasta, **opcoes)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def _ponteiros_lfs(pasta):
+    """Arquivos da pasta que são só ponteiros do git-lfs (o conteúdo real não foi baixado)."""
+    ponteiros = []
+    for nome in os.listdir(pasta):
+        with open(os.path.join(pasta, nome), 'rb') as f:
+            if f.read(40).startswith(b'version https://git-lfs'):
+                ponteiros.append(nome)
+    return ponteiros
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a página e os arquivos da ONS.")
+    parser.add_argument('--pasta', default='dados_ons_parquet', help="Pasta com os .parquet a servir.")
+    parser.add_argument('--sintetico', type=int, metavar='ANOS', help="Serve ANOS arquivos sintéticos (a partir de 2000) em vez da pasta.")
+    parser.add_argument('--amostras-por-hora', type=int, default=1, help="Tamanho dos arquivos sintéticos.")
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=0.0, help="Segundos de espera antes de cada resposta.")
+    parser.add_argument('--banda', type=float, help="Limite de bytes por segundo em cada conexão.")
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help="Probabilidade de responder 503.")
+    parser.add_argument('--taxa-corte', type=float, default=0.0, help="Probabilidade de cortar a conexão no meio do arquivo.")
+    parser.add_argument('--semente', type=int, help="Semente do sorteio das falhas (reprodutível).")
+    args = parser.parse_args()
+
+    pasta, temporaria = args.pasta, None
+    if args.sintetico:
+        from dados_sinteticos import gerar_espelho_sintetico
+
+        pasta = temporaria = tempfile.mkdtemp(prefix='espelho_ons_')
+        print(f"Gerando {args.sintetico} arquivos sintéticos em '{pasta}'...")
+        gerar_espelho_sintetico(pasta, range(2000, 2000 + args.sintetico), args.amostras_por_hora, virgula_decimal=True)
+    elif _ponteiros_lfs(pasta):
+        print(f"AVISO: {len(_ponteiros_lfs(pasta))} arquivo(s) em '{pasta}' são ponteiros do git-lfs "
+              f"(rode `git lfs pull` ou use --sintetico).")
+
+    servidor = ServidorEspelho(('127.0.0.1', args.porta), pasta, args.taxa_erro, args.taxa_corte, args.semente,
+                               args.latencia, args.banda)
+    print(f"Servindo '{pasta}' em {servidor.url_dataset} (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        if temporaria:
+            shutil.rmtree(temporaria, ignore_errors=True)
+        print(f"Requisições: {dict(servidor.estatisticas)}")
+
+if __name__ == "__main__":
+    main()
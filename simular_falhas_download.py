@@ -0,0 +1,104 @@
+# Arquivo: simular_falhas_download.py
+# Exercita o download do ETL (Coletar_dados.sincronizar_espelho) contra o servidor_espelho local,
+# com falhas injetadas, e confere o resultado de cada cenário:
+#   instavel      - 503 e conexões cortadas: todos os arquivos chegam íntegros, retomando com Range;
+#   repeticao     - segunda execução sem mudanças: tudo 304, nada baixado de novo;
+#   retomada      - um .parcial deixado por uma execução anterior é completado com Range (206);
+#   fora_do_ar    - servidor sempre em 503, com cópias locais: o espelho anterior é mantido;
+#   sem_copia     - servidor sempre em 503, sem cópia local: RuntimeError com a lista dos arquivos.
+#
+# Uso: python simular_falhas_download.py --anos 6 --taxa-erro 0.3 --taxa-corte 0.3
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import Coletar_dados
+from Coletar_dados import (_caminhos_parciais, calcular_hash, carregar_manifesto, criar_sessao,
+                           sincronizar_espelho)
+from dados_sinteticos import gerar_espelho_sintetico
+from servidor_espelho import iniciar_em_segundo_plano
+
+def conferir_espelho(origem, espelho):
+    """Todos os arquivos da origem estão no espelho, com o mesmo sha256, e o manifesto bate."""
+    manifesto = carregar_manifesto(espelho)
+    for nome in os.listdir(origem):
+        hash_origem = calcular_hash(os.path.join(origem, nome))
+        if calcular_hash(os.path.join(espelho, nome)) != hash_origem or manifesto[nome]['sha256'] != hash_origem:
+            return False
+    return not any(nome.endswith(Coletar_dados.SUFIXO_PARCIAL) for nome in os.listdir(espelho))
+
+def sincronizar(servidor, origem, espelho):
+    urls = [servidor.url_base + nome for nome in sorted(os.listdir(origem))]
+    return sincronizar_espelho(urls, criar_sessao(4), espelho, max_workers=4)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cenários de falha do download do ETL contra um servidor local.")
+    parser.add_argument('--anos', type=int, default=6, help="Quantidade de arquivos anuais sintéticos.")
+    parser.add_argument('--amostras-por-hora', type=int, default=1)
+    parser.add_argument('--taxa-erro', type=float, default=0.3, help="Probabilidade de 503 no cenário instável.")
+    parser.add_argument('--taxa-corte', type=float, default=0.3, help="Probabilidade de corte no cenário instável.")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    # Esperas curtas, para o cenário não levar minutos; o formato do backoff é o mesmo
+    Coletar_dados.ESPERA_BASE_S = 0.05
+    Coletar_dados.TENTATIVAS_DOWNLOAD = 10
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        origem, espelho = os.path.join(tmp, 'origem'), os.path.join(tmp, 'espelho')
+        gerar_espelho_sintetico(origem, range(2000, 2000 + args.anos), args.amostras_por_hora)
+        servidor = iniciar_em_segundo_plano(origem, taxa_erro=args.taxa_erro, taxa_corte=args.taxa_corte, semente=args.semente)
+        try:
+            _, alterados = sincronizar(servidor, origem, espelho)
+            resultados.append(('instavel', conferir_espelho(origem, espelho) and len(alterados) == args.anos,
+                               dict(servidor.estatisticas)))
+
+            servidor.taxa_erro = servidor.taxa_corte = 0.0
+            servidor.estatisticas.clear()
+            _, alterados = sincronizar(servidor, origem, espelho)
+            resultados.append(('repeticao', not alterados and servidor.estatisticas['304'] == args.anos,
+                               dict(servidor.estatisticas)))
+
+            # Simula uma execução anterior interrompida no meio do primeiro arquivo
+            nome = sorted(os.listdir(origem))[0]
+            destino = os.path.join(espelho, nome)
+            parcial, arquivo_versao = _caminhos_parciais(destino)
+            with open(destino, 'rb') as f, open(parcial, 'wb') as p:
+                p.write(f.read(os.path.getsize(destino) // 3))
+            versao = carregar_manifesto(espelho)[nome]
+            with open(arquivo_versao, 'w', encoding='utf-8') as f:
+                json.dump({'etag': versao['etag'], 'last_modified': versao['last_modified']}, f)
+            os.remove(destino)
+            servidor.estatisticas.clear()
+            _, alterados = sincronizar(servidor, origem, espelho)
+            resultados.append(('retomada', conferir_espelho(origem, espelho) and alterados == [destino]
+                               and servidor.estatisticas['206'] == 1, dict(servidor.estatisticas)))
+
+            Coletar_dados.TENTATIVAS_DOWNLOAD = 3
+            servidor.taxa_erro = 1.0
+            os.utime(os.path.join(origem, nome))  # versão nova no servidor, que não consegue entregá-la
+            servidor.estatisticas.clear()
+            _, alterados = sincronizar(servidor, origem, espelho)
+            resultados.append(('fora_do_ar', not alterados and os.path.exists(destino), dict(servidor.estatisticas)))
+
+            shutil.rmtree(espelho)
+            servidor.estatisticas.clear()
+            try:
+                sincronizar(servidor, origem, espelho)
+                resultados.append(('sem_copia', False, dict(servidor.estatisticas)))
+            except RuntimeError:
+                resultados.append(('sem_copia', True, dict(servidor.estatisticas)))
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+    print(f"\n{'Cenário':<12}{'Resultado':<11}Requisições")
+    for cenario, ok, estatisticas in resultados:
+        print(f"{cenario:<12}{'OK' if ok else 'FALHOU':<11}{estatisticas}")
+
+if __name__ == "__main__":
+    main()